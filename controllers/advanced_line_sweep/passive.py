@@ -1,7 +1,12 @@
 from models.P_controller import *
+from controllers.line_sweep.passive import saturate_many, neighbour_control_many, scale_all_control_many, \
+    weighted_control_calc_many
 import numpy as np
 import warnings
 
+ALS_PASSIVE_GOAL_GAIN = [0, 1e-2]           # Gain of the goal-driven P controller of passive cooperation.
+ALS_SIMPLE_PASSIVE_GOAL_GAIN = [1e-1, 1e-1] # Gain of the goal-driven P controller of simple passive cooperation.
+
 def weighted_control_calc(rov):
     """
     Mean control of all the neighbouring velocities
@@ -76,7 +81,7 @@ def advanced_simple_passive_cooperation(rov, world, v_max, v_min):
         and (rov._goal_index < len(rov._waypoints)-1):   #if within offset of the y waypoint
         rov._goal_index += 1
 
-    goal_driven_controller = PController(ref=rov._current_goal, gain=[1e-1, 1e-1])
+    goal_driven_controller = PController(ref=rov._current_goal, gain=ALS_SIMPLE_PASSIVE_GOAL_GAIN)
     controlled_object = rov.pos_measurement
     control_input = goal_driven_controller.execute2(controlled_object)
     
@@ -151,7 +156,7 @@ def advanced_passive_cooperation(rov, world, v_max, v_min):
         and (rov._goal_index < len(rov._waypoints)-1):   #if within offset of the y waypoint
         rov._goal_index += 1
 
-    goal_driven_controller = PController(ref=rov._current_goal, gain=[0, 1e-2])
+    goal_driven_controller = PController(ref=rov._current_goal, gain=ALS_PASSIVE_GOAL_GAIN)
     controlled_object = rov.pos_measurement
     control_input = goal_driven_controller.execute2(controlled_object)
     
@@ -212,4 +217,64 @@ def advanced_passive_cooperation(rov, world, v_max, v_min):
     #     print('Resend old transmission as it failed. Or send new packet')
     rov._tx_buffer = [world.tn, controlled_object[0], controlled_object[1]]  
     rov._radio.reset_neighbour_register()
-    rov._radio.reset_buffer()
\ No newline at end of file
+    rov._radio.reset_buffer()
+
+
+def advanced_cooperation_many(rovers, world, v_max, v_min, gain, decay):
+    """
+    Apply advanced passive cooperative control to many rovers at once, the same as applying it to them one at a
+    time. With decay set, old info is scaled to be less relevant, neighbours' control is blended with the y speed
+    and the y speed floored at 0, otherwise with the goal-driven speed and floored at v_min.
+    """
+    for rov in rovers:
+        if(rov._pose[1] > rov.goal[1]-rov._goal_offset) \
+            and (rov._goal_index < len(rov._waypoints)-1):   #if within offset of the y waypoint
+            rov._goal_index += 1
+
+    positions = [rov.pos_measurement.copy() for rov in rovers]
+    # Squared with Python's float power, as the goal distance of execute2() is.
+    dist = np.sqrt([(x[0] - rov._current_goal[0])**2 + (x[1] - rov._current_goal[1])**2
+                    for rov, x in zip(rovers, positions)])
+    p_control = saturate_many(dist * gain[1], v_max, v_min)
+
+    for rov, control in zip(rovers, p_control.tolist()):
+        rov._control[2] = control
+        ratio_speeds(rov)
+
+    positions = np.array(positions, dtype=np.float64)
+    all_control = np.array([rov._all_control for rov in rovers], dtype=np.float64)
+    steps_not_updated = np.array([rov._steps_control_not_updated for rov in rovers], dtype=np.float64)
+    speeds = np.array([rov._control[1] for rov in rovers], dtype=np.float64)
+    all_control[:, 0] = speeds if decay else p_control
+
+    cooperating = neighbour_control_many(rovers, positions, all_control, steps_not_updated)
+    if decay and cooperating.any():
+        all_control[cooperating] = scale_all_control_many(rovers, all_control, steps_not_updated)[cooperating]
+    control_input = all_control[:, 0] * 1     # Take 100% portion of goal_driven control, until past initial control.
+    if cooperating.any():
+        control_input[cooperating] = weighted_control_calc_many(all_control[cooperating])
+
+    control = saturate_many(control_input, speeds, 0 if decay else v_min)
+    for i, rov in enumerate(rovers):
+        rov._all_control = all_control[i]
+        rov._steps_control_not_updated = steps_not_updated[i]
+        rov._control[1] = control[i]
+        rov.update_speeds(rov._control[0], rov._control[1])
+        rov._transmit = True
+        controlled_object = rov.pos_measurement
+        rov._tx_buffer = [world.tn, controlled_object[0], controlled_object[1]]
+        rov._radio.reset_neighbour_register()
+        rov._radio.reset_buffer()
+
+def advanced_passive_cooperation_many(rovers, world, v_max, v_min):
+    """
+    Apply advanced passive cooperative control to many rovers at once, see advanced_passive_cooperation().
+    """
+    advanced_cooperation_many(rovers, world, v_max, v_min, ALS_PASSIVE_GOAL_GAIN, decay=True)
+
+def advanced_simple_passive_cooperation_many(rovers, world, v_max, v_min):
+    """
+    Apply advanced simple passive cooperative control to many rovers at once,
+    see advanced_simple_passive_cooperation().
+    """
+    advanced_cooperation_many(rovers, world, v_max, v_min, ALS_SIMPLE_PASSIVE_GOAL_GAIN, decay=False)
@@ -1,6 +1,8 @@
 from models.P_controller import *
 import numpy as np
 
+LS_GOAL_GAIN = [0, 1e-2]        # Gain of the goal-driven P controller of (simple) passive cooperation.
+
 def weighted_control_calc(rov):
     """
     Mean control of all the neighbouring velocities
@@ -44,7 +46,7 @@ def passive_cooperation(rov, world, v_max, v_min):
     Slowly push all_control values that haven't been recieved to 0.
     """
 
-    goal_driven_controller = PController(ref=rov._waypoints[-1], gain=[0, 1e-2])
+    goal_driven_controller = PController(ref=rov._waypoints[-1], gain=LS_GOAL_GAIN)
     controlled_object = rov.pos_measurement
     control_input = goal_driven_controller.execute(controlled_object)
     
@@ -115,7 +117,7 @@ def simple_passive_cooperation(rov, world, v_max, v_min):
     Start with P controller then only change speed when neighbour info recieved again.
     """
         
-    goal_driven_controller = PController(ref=rov._waypoints[-1], gain=[0, 1e-2])
+    goal_driven_controller = PController(ref=rov._waypoints[-1], gain=LS_GOAL_GAIN)
     controlled_object = rov.pos_measurement
     control_input = goal_driven_controller.execute(controlled_object)
     
@@ -175,4 +177,131 @@ def simple_passive_cooperation(rov, world, v_max, v_min):
 
     rov._tx_buffer = [world.tn, controlled_object[0], controlled_object[1]]  
     rov._radio.reset_neighbour_register()
-    rov._radio.reset_buffer()
\ No newline at end of file
+    rov._radio.reset_buffer()
+
+def saturate_many(control_input, upper, lower):
+    """
+    Saturate the control inputs of many rovers between bounds, the upper bound first.
+    """
+    return np.where(control_input > upper, upper, np.where(control_input < lower, lower, control_input))
+
+def goal_control_many(positions, refs, gain):
+    """
+    Apply the proportional control effect of many rovers' P controllers, summed over the states in the same order.
+    """
+    u = 0.0
+    for j in range(positions.shape[1]):
+        u = u + gain[:, j] * (refs[:, j] - positions[:, j])
+    return u
+
+def neighbour_control_many(rovers, positions, all_control, steps_not_updated):
+    """
+    Update the control inferred from the neighbours of many rovers at once, given the arrays of their positions,
+    all_control and steps_control_not_updated, a row per rover.
+    The neighbour poses received are laid in an array over the neighbours of each rover, so that the P control
+    towards every neighbour heard of is applied in one pass.
+    Return a mask of the rovers past their initial control.
+    """
+    neighbour_poses = [rov.get_neighbour_pose() for rov in rovers]
+    num_neighbours = max(len(poses) for poses in neighbour_poses)
+    poses_array = np.full((len(rovers), num_neighbours, 2), np.nan)
+    heard = np.zeros((len(rovers), num_neighbours), dtype=bool)
+    for i, (rov, poses) in enumerate(zip(rovers, neighbour_poses)):
+        if poses.count(None) < rov._num_rovers:
+            rov._initial_control = False
+
+        rov.connectivity_reset()
+        rov.neighbour_connectivity(poses)
+
+        if not rov._initial_control and poses.count(None) < rov._num_rovers:
+            for k, pose in enumerate(poses):
+                if pose is not None:
+                    poses_array[i, k] = pose[:2]
+                    heard[i, k] = True
+                    rov._speed_controller.set_ref(pose)
+
+    steps_not_updated[:, 1:] += 1     # all incremented by 1
+    gain = np.array([rov._speed_controller._gain for rov in rovers], dtype=np.float64)
+    # P control of each rover towards each neighbour, (rovers, neighbours).
+    u = 0.0
+    for j in range(positions.shape[1]):
+        u = u + gain[:, j, None] * (poses_array[:, :, j] - positions[:, j, None])
+    neighbour_control = all_control[:, 1:num_neighbours + 1]
+    neighbour_control[heard] = u[heard]
+    steps_not_updated[:, 1:num_neighbours + 1][heard] = 0
+    return np.array([not rov._initial_control for rov in rovers])
+
+def time_decay_many(rovers, values):
+    """
+    Reduces inferred speed adjustments of many rovers, given by rows of values.
+    """
+    zero_crossing = np.array([rov._decay_zero_crossing for rov in rovers], dtype=np.float64)[:, None]
+    decay_type = np.array([rov._decay_type for rov in rovers], dtype=object)[:, None]
+    scale = np.ones(values.shape)
+    exp = np.broadcast_to(decay_type == 'exp', values.shape)
+    quad = np.broadcast_to(decay_type == 'quad', values.shape)
+    if exp.any():
+        scale = np.where(exp, (-1/np.exp(-values + zero_crossing)) + 1, scale)
+    if quad.any():
+        scale = np.where(quad, (-1/(zero_crossing**2)) * (values-zero_crossing) * (values + zero_crossing), scale)
+    return np.where(scale <= 0, 0, scale)
+
+def scale_all_control_many(rovers, all_control, steps_not_updated):
+    """
+    Scale all control variables of many rovers.
+    """
+    multiplier = np.ones(all_control.shape)
+    multiplier[:, 1:] = time_decay_many(rovers, steps_not_updated[:, 1:])
+    return all_control * multiplier
+
+def weighted_control_calc_many(all_control):
+    """
+    Mean control of all the neighbouring velocities of many rovers,
+    then summed with their P controller speeds.
+    """
+    return all_control[:, 0] + np.nanmean(all_control[:, 1:], axis=1)
+
+def line_sweep_cooperation_many(rovers, world, v_max, v_min, decay):
+    """
+    Apply passive cooperative control to many rovers at once, the same as applying it to them one at a time,
+    scaling old info to be less relevant if decay is set.
+    """
+    positions = np.array([rov.pos_measurement for rov in rovers], dtype=np.float64)
+    refs = np.array([rov._waypoints[-1][:2] for rov in rovers], dtype=np.float64)
+    control_input = goal_control_many(positions, refs, np.array([LS_GOAL_GAIN] * len(rovers)))
+    p_control = saturate_many(control_input, v_max, v_min)
+
+    all_control = np.array([rov._all_control for rov in rovers], dtype=np.float64)
+    steps_not_updated = np.array([rov._steps_control_not_updated for rov in rovers], dtype=np.float64)
+    all_control[:, 0] = p_control
+
+    cooperating = neighbour_control_many(rovers, positions, all_control, steps_not_updated)
+    if decay and cooperating.any():
+        all_control[cooperating] = scale_all_control_many(rovers, all_control, steps_not_updated)[cooperating]
+    control_input = p_control*1  # Take 100% portion of goal_driven control, until past initial control.
+    if cooperating.any():
+        control_input[cooperating] = weighted_control_calc_many(all_control[cooperating])
+
+    control = saturate_many(control_input, v_max, v_min)
+    for i, rov in enumerate(rovers):
+        rov._all_control = all_control[i]
+        rov._steps_control_not_updated = steps_not_updated[i]
+        rov._control[1] = control[i]
+        rov.update_speeds(0, rov._control[1])
+        rov._transmit = True
+        controlled_object = rov.pos_measurement
+        rov._tx_buffer = [world.tn, controlled_object[0], controlled_object[1]]
+        rov._radio.reset_neighbour_register()
+        rov._radio.reset_buffer()
+
+def passive_cooperation_many(rovers, world, v_max, v_min):
+    """
+    Apply passive cooperative control to many rovers at once, see passive_cooperation().
+    """
+    line_sweep_cooperation_many(rovers, world, v_max, v_min, decay=True)
+
+def simple_passive_cooperation_many(rovers, world, v_max, v_min):
+    """
+    Apply simple passive cooperative control to many rovers at once, see simple_passive_cooperation().
+    """
+    line_sweep_cooperation_many(rovers, world, v_max, v_min, decay=False)
@@ -0,0 +1,2 @@
+class EventSkipMismatch(Exception):
+    pass
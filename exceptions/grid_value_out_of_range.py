@@ -0,0 +1,2 @@
+class GridValueOutOfRange(Exception):
+    pass
@@ -0,0 +1,2 @@
+class TiledMapUnsupported(Exception):
+    pass
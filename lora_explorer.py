@@ -0,0 +1,197 @@
+import argparse
+import csv
+import os
+import time
+import numpy as np
+
+from models.world import *
+from models.radio import *
+from utils.load_map import *
+
+
+BW = [125, 250, 500]                    # Selectable bandwidth, in KHz.
+SF = [6, 7, 8, 9, 10, 11, 12]           # Selectable spreading factor.
+CR = [4 / 5, 4 / 6, 4 / 7, 4 / 8]       # Selectable coding rate.
+TX_PW = [2, 5, 8, 11, 14]               # Transmitting powers to explore, in dBm.
+
+chunk_size = 2048   # Links whose path loss is evaluated at once.
+
+
+def read_parameters(file_name):
+    """
+    Read the 'name = value' lines of a parameters log, e.g. 'SSS Parameters.txt'.
+    """
+    parameters = {}
+    with open(file_name, 'r') as file:
+        for line in file:
+            if '=' in line and '=>' not in line:
+                name, value = line.split('=', 1)
+                parameters[name.strip()] = value.strip()
+    return parameters
+
+
+def read_raw_log(file_name):
+    """
+    Read the logged positions of every rover from a raw data log, e.g. 'SSS Raw Data.txt',
+    as the log times (in minute) and an array of (easting, northing) of shape (times, rovers, 2).
+    """
+    times, positions = [], []
+    reached_data = False
+    with open(file_name, 'r') as file:
+        for line in file:
+            if line.startswith('Time\t'):
+                reached_data = True
+                continue
+            if not reached_data or '\t' not in line:
+                continue
+            t, data = line.rstrip('\n').split('\t', 1)
+            # Rovers are separated by '-' and followed by the formation error.
+            rovers = data.split('-')[:-1]
+            times.append(float(t))
+            positions.append([[float(v) for v in rover.split(',')[:2]] for rover in rovers])
+    return np.array(times), np.array(positions, dtype=float)
+
+
+def link_geometry(world, positions, f, ant_h=ANT_HEIGHT):
+    """
+    Calculate the path loss of the link between every ordered pair of rovers at every logged time, in dB,
+    as an array of shape (times, rovers, rovers). Links between rovers at the same position are left NaN.
+    """
+    n_times, n_rovers = positions.shape[:2]
+    tx, rx = np.meshgrid(np.arange(n_rovers), np.arange(n_rovers), indexing='ij')
+    tx_pos = positions[:, tx, :].reshape(-1, 2)
+    rx_pos = positions[:, rx, :].reshape(-1, 2)
+    path_loss = np.full(len(tx_pos), np.nan)
+    apart = np.flatnonzero(np.any(tx_pos != rx_pos, axis=1))
+    for start in range(0, len(apart), chunk_size):
+        links = apart[start:start + chunk_size]
+        path_loss[links] = path_loss_pairs(world, tx_pos[links], rx_pos[links], f, ant_h, ant_h)
+    return path_loss.reshape(n_times, n_rovers, n_rovers)
+
+
+def delivery_ratio(path_loss, tx_pw, sensitivity):
+    """
+    Calculate the ratio of links whose received power reaches the sensitivity, for every transmitting power
+    and every sensitivity, as an array of shape (tx powers, sensitivities). Received power is calculated as
+    by Radio.rx_power(), so a link is delivered exactly when the simulator would receive it.
+    """
+    path_loss = path_loss[~np.isnan(path_loss)]
+    if len(path_loss) == 0:
+        return np.full((len(tx_pw), len(sensitivity)), np.nan)
+    rx_power = np.sort(np.asarray(tx_pw, dtype=float)[:, None] + ANT_GAIN - path_loss[None, :] + ANT_GAIN, axis=1)
+    return np.array([len(path_loss) - np.searchsorted(rx_power[i], sensitivity, side='left')
+                     for i in range(len(tx_pw))]) / len(path_loss)
+
+
+def explore(path_loss, bw, sf, cr, tx_pw, dc, t_slot):
+    """
+    Evaluate every combination of bandwidth, spreading factor, coding rate and transmitting power
+    on the path losses of a mission's links, returning arrays of shape (bw, sf, cr, tx_pw) by name.
+    The duty cycle is in percent and the time slot in second, as configured in the simulator.
+    The simulator configures the silent time before the time slot, so the interval is counted in default time
+    slots of T_SLOT while transmissions are a time slot apart.
+    """
+    bw_grid, sf_grid, cr_grid = np.meshgrid(bw, sf, cr, indexing='ij')
+    airtime = airtime_many(bw_grid, sf_grid, cr_grid)
+    interval = interval_many(airtime, dc / 100, T_SLOT)
+    period = interval * t_slot
+    sensitivity = sensitivity_many(bw_grid[:, :, 0], sf_grid[:, :, 0])
+
+    n_rovers = path_loss.shape[1]
+    neighbours = np.abs(np.subtract.outer(np.arange(n_rovers), np.arange(n_rovers))) == 1
+    delivery = delivery_ratio(path_loss, tx_pw, sensitivity.ravel())
+    neighbour_delivery = delivery_ratio(path_loss[:, neighbours], tx_pw, sensitivity.ravel())
+
+    shape = (len(bw), len(sf), len(cr), len(tx_pw))
+    # Delivery depends on bandwidth & spreading factor through the sensitivity, not on the coding rate.
+    delivery = np.broadcast_to(delivery.T.reshape(len(bw), len(sf), 1, len(tx_pw)), shape)
+    neighbour_delivery = np.broadcast_to(neighbour_delivery.T.reshape(len(bw), len(sf), 1, len(tx_pw)), shape)
+    with np.errstate(divide='ignore'):
+        update_period = np.where(neighbour_delivery > 0, period[..., None] / neighbour_delivery, np.inf)
+    grids = np.meshgrid(bw, sf, cr, tx_pw, indexing='ij')
+    return {'bw': grids[0], 'sf': grids[1], 'cr': grids[2], 'tx_pw': grids[3],
+            'airtime': np.broadcast_to(airtime[..., None], shape),
+            'interval': np.broadcast_to(interval[..., None], shape),
+            'period': np.broadcast_to(period[..., None], shape),
+            'actual_dc': np.broadcast_to((airtime / (airtime + period))[..., None], shape),
+            'sensitivity': np.broadcast_to(sensitivity[:, :, None, None], shape),
+            'delivery': delivery, 'neighbour_delivery': neighbour_delivery, 'update_period': update_period}
+
+
+def main():
+    """
+    Explore the LoRa configurations of a recorded mission, calculating the path losses of its links once
+    and ranking every configuration by how often each rover hears its neighbours.
+    """
+    parser = argparse.ArgumentParser(description='Explore LoRa configurations on the trajectories of a logged run.')
+    parser.add_argument('run', help="Log directory of a run, or its 'SSS Raw Data.txt'.")
+    parser.add_argument('-a', '--area', default=None, help='Area of the run, read from its parameters if not given.')
+    parser.add_argument('-f', '--freq', type=float, default=None, help='Carrier center frequency, in MHz.')
+    parser.add_argument('--bw', type=int, nargs='+', default=BW, help='Bandwidths, in KHz.')
+    parser.add_argument('--sf', type=int, nargs='+', default=SF, help='Spreading factors.')
+    parser.add_argument('--cr', type=int, nargs='+', default=[5, 6, 7, 8],
+                        help='Coding rate denominators, e.g. 8 for 4/8.')
+    parser.add_argument('--txpw', type=float, nargs='+', default=TX_PW, help='Transmitting powers, in dBm.')
+    parser.add_argument('--dc', type=float, default=None, help='Duty cycle, in percent.')
+    parser.add_argument('--t-slot', type=float, default=None, help='Length of a time slot, in second.')
+    parser.add_argument('--top', type=int, default=20, help='Number of best configurations to print.')
+    parser.add_argument('--maps', default=MAPS_DIR, help='Directory of the maps.')
+    parser.add_argument('-o', '--output', default=None, help='CSV file to write every configuration to.')
+    args = parser.parse_args()
+
+    run_dir = args.run if os.path.isdir(args.run) else os.path.dirname(args.run)
+    raw_file = os.path.join(args.run, 'SSS Raw Data.txt') if os.path.isdir(args.run) else args.run
+    parameters_file = os.path.join(run_dir, 'SSS Parameters.txt')
+    parameters = read_parameters(parameters_file) if os.path.exists(parameters_file) else {}
+    area = args.area or parameters.get('Area')
+    if area is None:
+        parser.error('No area given and none found in ' + parameters_file)
+    f = args.freq if args.freq is not None else float(parameters.get('Frequency', 869.525))
+    dc = args.dc if args.dc is not None else float(parameters.get('Duty Cycle', 1))
+    t_slot = args.t_slot if args.t_slot is not None else float(parameters.get('Simpulation Sampling Period', 0.12))
+
+    times, positions = read_raw_log(raw_file)
+    if len(times) == 0:
+        parser.error('No logged positions found in ' + raw_file)
+    catalog = get_catalog(args.maps)
+    map_terrain = read_asc(catalog.locate(area + '_elevation' + '.asc'), dtype=ELEVATION_DTYPE)
+    map_landcover = read_asc(catalog.locate(area + '_landcover' + '.asc'), dtype=LANDCOVER_DTYPE)
+    world = World(map_terrain, map_landcover)
+
+    t_start = time.perf_counter()
+    path_loss = link_geometry(world, positions, f)
+    t_geometry = time.perf_counter() - t_start
+    t_start = time.perf_counter()
+    results = explore(path_loss, args.bw, args.sf, [4 / den for den in args.cr], args.txpw, dc, t_slot)
+    t_explore = time.perf_counter() - t_start
+
+    n_links = int(np.count_nonzero(~np.isnan(path_loss)))
+    n_configs = results['bw'].size
+    print('Run: {} ({} logged times, {} rovers, area {})'.format(raw_file, len(times), positions.shape[1], area))
+    print('Geometry: {} links in {} (s); {} configurations in {} (s).'.format(
+        str(n_links), str(round(t_geometry, 2)), str(n_configs), str(round(t_explore, 3))))
+    print()
+
+    columns = {name: results[name].ravel() for name in results}
+    # Best first: most frequent neighbour updates, then shortest airtime, then lowest power.
+    order = np.lexsort((columns['tx_pw'], columns['airtime'], columns['update_period']))
+    print('{:>4} {:>3} {:>4} {:>5} {:>11} {:>10} {:>9} {:>8} {:>9} {:>10} {:>11}'.format(
+        'BW', 'SF', 'CR', 'TxPW', 'Airtime (s)', 'Period (s)', 'DC (%)', 'Sens.', 'Delivery', 'Neighbour',
+        'Update (s)'))
+    for i in order[:args.top]:
+        print('{:>4d} {:>3d} {:>4} {:>5g} {:>11.4f} {:>10.2f} {:>9.3f} {:>8.1f} {:>9.3f} {:>10.3f} {:>11.2f}'.format(
+            int(columns['bw'][i]), int(columns['sf'][i]), '4/' + str(round(4 / columns['cr'][i])),
+            columns['tx_pw'][i], columns['airtime'][i], columns['period'][i], columns['actual_dc'][i] * 100,
+            columns['sensitivity'][i], columns['delivery'][i], columns['neighbour_delivery'][i],
+            columns['update_period'][i]))
+
+    if args.output is not None:
+        with open(args.output, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(list(columns))
+            for i in order:
+                writer.writerow([columns[name][i] for name in columns])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+
+class Channel:
+    """
+    A shared channel. Like the list of transmissions it replaces, it holds the packets sent in the current
+    time slot and is cleared every slot, while every packet stays indexed by the interval it is in the air,
+    [start, end), until it ends, so that the packets overlapping one can be found by a bisection over start times.
+    The received power of each packet at every radio can be recorded, to sum up the interference it suffers, and
+    its reception deferred until it ends, once every packet overlapping it has been sent.
+    """
+    def __init__(self):
+        self._slot = []                     # The packets sent in the current time slot.
+        self._packets = []                  # The packets in the air, by start time.
+        self._starts = []                   # Start of each packet in the air, in second.
+        self._ends = np.zeros(0)            # End of each packet in the air, in second.
+        self._tx_ids = np.zeros(0, dtype=np.intp)   # Radio ID of the transmitter of each packet in the air.
+        self._powers = np.zeros((0, 0))     # Received power of each packet in the air at each radio, by radio ID - 1,
+        # in mW, 0 where not recorded.
+        self._undecided = []                # The packets whose reception is deferred, in order sent, each with its
+        # received power at each radio, in dBm.
+
+    def __len__(self):
+        return len(self._slot)
+
+    def __getitem__(self, index):
+        return self._slot[index]
+
+    def __iter__(self):
+        return iter(self._slot)
+
+    @property
+    def in_air(self):
+        return list(self._packets)
+
+    @property
+    def num_undecided(self):
+        return len(self._undecided)
+
+    def append(self, packet):
+        """
+        Add a packet sent in the current time slot, indexing it by its interval in the air.
+        Packets are sent in time order, so the index stays sorted by start time.
+        """
+        self._slot.append(packet)
+        i = bisect_right(self._starts, packet.start)
+        self._packets.insert(i, packet)
+        self._starts.insert(i, packet.start)
+        self._ends = np.insert(self._ends, i, packet.end)
+        self._tx_ids = np.insert(self._tx_ids, i, packet.tx.radio_id)
+        self._powers = np.insert(self._powers, i, 0, axis=0)
+
+    def clear(self):
+        """
+        Empty the current time slot. Packets still in the air stay indexed.
+        """
+        self._slot.clear()
+
+    def prune(self, time):
+        """
+        Stop indexing the packets which ended by a time, in second, as they cannot overlap any packet sent later,
+        unless they overlap a packet whose reception is still deferred.
+        """
+        time = min([time] + [packet.start for packet, _ in self._undecided])
+        keep = self._ends > time
+        if not keep.all():
+            self._packets = [packet for packet, kept in zip(self._packets, keep) if kept]
+            self._starts = [start for start, kept in zip(self._starts, keep) if kept]
+            self._ends, self._tx_ids, self._powers = self._ends[keep], self._tx_ids[keep], self._powers[keep]
+
+    def index(self, packet):
+        """
+        Get the position of a packet in the index, None if it is not in the air.
+        """
+        for i in range(bisect_left(self._starts, packet.start), bisect_right(self._starts, packet.start)):
+            if self._packets[i] is packet:
+                return i
+        return None
+
+    def overlapping(self, packet):
+        """
+        Get a mask of the packets in the air overlapping a packet, other than itself.
+        """
+        # Only packets starting before it ends can overlap it.
+        n = bisect_left(self._starts, packet.end)
+        mask = np.zeros(len(self._packets), dtype=bool)
+        mask[:n] = self._ends[:n] > packet.start
+        i = self.index(packet)
+        if i is not None:
+            mask[i] = False
+        return mask
+
+    def transmitting(self, packet):
+        """
+        Get the radio IDs of the transmitters in the air at any time during a packet, its own included.
+        """
+        return set(self._tx_ids[self.overlapping(packet)].tolist()) | {packet.tx.radio_id}
+
+    def record_powers(self, packet, radio_ids, rx_powers):
+        """
+        Record the received powers of a packet at radios, in dBm.
+        """
+        radio_ids = np.asarray(radio_ids, dtype=np.intp)
+        if len(radio_ids) == 0:
+            return
+        n = int(radio_ids.max())
+        if n > self._powers.shape[1]:
+            self._powers = np.pad(self._powers, ((0, 0), (0, n - self._powers.shape[1])))
+        self._powers[self.index(packet), radio_ids - 1] = np.power(10, np.asarray(rx_powers, dtype=np.float64) / 10)
+
+    def interference(self, packet, radio_ids):
+        """
+        Sum the recorded received powers of the packets overlapping a packet at radios, in mW.
+        """
+        radio_ids = np.asarray(radio_ids, dtype=np.intp)
+        interference = np.zeros(len(radio_ids))
+        recorded = radio_ids <= self._powers.shape[1]
+        mask = self.overlapping(packet)
+        if mask.any() and recorded.any():
+            interference[recorded] = self._powers[mask][:, radio_ids[recorded] - 1].sum(axis=0)
+        return interference
+
+    def defer(self, packet, rx_powers):
+        """
+        Defer the reception of a packet until it ends, given its received power at each radio, in dBm.
+        """
+        self._undecided.append((packet, rx_powers))
+
+    def pop_ended(self, time):
+        """
+        Take the packets whose reception is deferred and which ended by a time, in second, in order sent, each with
+        its received power at each radio. No packet sent from then on can overlap them.
+        """
+        ended = [undecided for undecided in self._undecided if undecided[0].end <= time]
+        if ended:
+            self._undecided = [undecided for undecided in self._undecided if undecided[0].end > time]
+        return ended
@@ -0,0 +1,157 @@
+from collections import OrderedDict
+import numpy as np
+
+from models.map import *
+from models.radio import *
+
+
+class Coverage(Map):
+    """
+    A map of the power received from a transmitter at every (sampled) cell of an area, in dBm.
+    """
+    def __init__(self, n_cols, n_rows, x_llcorner, y_llcorner, resolution, data, tx_pos, sensitivity=None):
+        super().__init__(n_cols, n_rows, x_llcorner, y_llcorner, resolution, data)
+        self._tx_pos = tx_pos               # The transmitter position, (x, y).
+        self._sensitivity = sensitivity     # The receiving sensitivity coverage is judged by, in dBm.
+
+    @property
+    def tx_pos(self):
+        return self._tx_pos
+
+    @property
+    def sensitivity(self):
+        return self._sensitivity
+
+    def covered(self):
+        """
+        Flag the cells where the received power reaches the sensitivity.
+        """
+        return self._data >= self._sensitivity
+
+
+def coverage_map(world, tx_pos, f, tx_pw, tx_ant_h=ANT_HEIGHT, tx_ant_gain=ANT_GAIN, rx_ant_h=ANT_HEIGHT,
+                 rx_ant_gain=ANT_GAIN, step=1, d_max=None, sensitivity=None, chunk_size=256):
+    """
+    Calculate the power received from a transmitter at every step-th cell of the area, using the same
+    path loss model as the radios. Each cell is evaluated at its centre, and cells are laid out like the
+    terrain's data so that get_data() on the coverage looks up the same cell as on the terrain.
+    By default every cell is evaluated. A coarser step, e.g. 10, is much quicker but quantises receivers to
+    cells of step by step terrain cells, all of which are given the power at the centre of theirs.
+    The transmitter's own cell, if sampled, is left NaN.
+    """
+    terrain = world.terrain
+    resolution = terrain.resolution * step
+    n_cols, n_rows = -(-terrain.n_cols // step), -(-terrain.n_rows // step)
+    # get_data() reads column (easting index - 1), so column c holds easting index c + 1, wrapping around.
+    e_index = (np.arange(n_cols) + 1) % n_cols
+    n_index = n_rows - 1 - np.arange(n_rows)
+    eastings = terrain.x_llcorner + (e_index + 0.5) * resolution
+    northings = terrain.y_llcorner + (n_index + 0.5) * resolution
+    eastings = np.minimum(eastings, terrain.x_llcorner + terrain.x_range - terrain.resolution / 2)
+    northings = np.minimum(northings, terrain.y_llcorner + terrain.y_range - terrain.resolution / 2)
+    rx_pos = np.stack(np.broadcast_arrays(eastings[None, :], northings[:, None]), axis=-1).reshape(-1, 2)
+
+    data = np.full(len(rx_pos), np.nan)
+    apart = (rx_pos[:, 0] != tx_pos[0]) | (rx_pos[:, 1] != tx_pos[1])
+    targets = np.flatnonzero(apart)
+    for start in range(0, len(targets), chunk_size):
+        chunk = targets[start:start + chunk_size]
+        path_losses = path_loss_many(world, tx_pos, rx_pos[chunk], f, tx_ant_h, rx_ant_h, d_max)
+        data[chunk] = tx_pw + tx_ant_gain - path_losses + rx_ant_gain
+    return Coverage(n_cols, n_rows, terrain.x_llcorner, terrain.y_llcorner, resolution,
+                    data.reshape(n_rows, n_cols), tuple(tx_pos), sensitivity)
+
+
+class CoverageCache:
+    """
+    A bounded cache of coverage maps keyed by transmitter cell and radio configuration,
+    evicting the least recently used maps. Transmitters are placed at the centre of their cell, and receivers
+    are given the power at the centre of theirs, of step by step terrain cells if a coarser step is opted into.
+    """
+    def __init__(self, world, capacity=16, step=1, d_max=None):
+        self._physical_world = world    # A world object where the coverage is calculated.
+        self._capacity = capacity       # Maximum number of coverage maps cached.
+        self._step = step               # Cells of terrain between the sampled cells of coverage maps.
+        self._d_max = d_max             # The maximum distance above which path loss is assumed -inf, in meter.
+        self._maps = OrderedDict()      # Cached coverage maps, least recently used first.
+        self._num_hits = 0              # The number of lookups answered from a coverage map.
+        self._num_misses = 0            # The number of lookups from transmitters without a coverage map.
+        self._num_evictions = 0         # The number of coverage maps evicted.
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def step(self):
+        return self._step
+
+    @property
+    def maps(self):
+        return list(self._maps.values())
+
+    @property
+    def num_hits(self):
+        return self._num_hits
+
+    @property
+    def num_misses(self):
+        return self._num_misses
+
+    @property
+    def num_evictions(self):
+        return self._num_evictions
+
+    def cell_centre(self, pos):
+        """
+        Get the centre of the terrain cell a position lies in.
+        """
+        terrain = self._physical_world.terrain
+        resolution = terrain.resolution
+        return (terrain.x_llcorner + (int((pos[0] - terrain.x_llcorner) // resolution) + 0.5) * resolution,
+                terrain.y_llcorner + (int((pos[1] - terrain.y_llcorner) // resolution) + 0.5) * resolution)
+
+    def key(self, tx_pos, f, tx_pw, tx_ant_h, tx_ant_gain, rx_ant_h, rx_ant_gain):
+        """
+        Build the key of a coverage map.
+        """
+        return self.cell_centre(tx_pos), f, tx_pw, tx_ant_h, tx_ant_gain, rx_ant_h, rx_ant_gain
+
+    def add(self, tx_pos, f, tx_pw, tx_ant_h=ANT_HEIGHT, tx_ant_gain=ANT_GAIN, rx_ant_h=ANT_HEIGHT,
+            rx_ant_gain=ANT_GAIN, sensitivity=None):
+        """
+        Get the coverage map of a transmitter, calculating and caching it if needed.
+        """
+        key = self.key(tx_pos, f, tx_pw, tx_ant_h, tx_ant_gain, rx_ant_h, rx_ant_gain)
+        coverage = self._maps.get(key)
+        if coverage is None:
+            coverage = coverage_map(self._physical_world, key[0], f, tx_pw, tx_ant_h, tx_ant_gain, rx_ant_h,
+                                    rx_ant_gain, self._step, self._d_max, sensitivity)
+            self._maps[key] = coverage
+            while len(self._maps) > self._capacity:
+                self._maps.popitem(last=False)
+                self._num_evictions += 1
+        self._maps.move_to_end(key)
+        return coverage
+
+    def add_radio(self, radio):
+        """
+        Get the coverage map of a radio at its current position, calculating and caching it if needed.
+        """
+        return self.add(radio.pos, radio.f, radio.tx_pw, radio.ant_height, radio.ant_gain, radio.ant_height,
+                        radio.ant_gain, radio.sensitivity)
+
+    def rx_power(self, radio_tx, radio_rx):
+        """
+        Look up the received power between two radios if the transmitter's cell has a coverage map, else None.
+        """
+        key = self.key(radio_tx.pos, radio_tx.f, radio_tx.tx_pw, radio_tx.ant_height, radio_tx.ant_gain,
+                       radio_rx.ant_height, radio_rx.ant_gain)
+        coverage = self._maps.get(key)
+        if coverage is None:
+            self._num_misses += 1
+            return None
+        self._num_hits += 1
+        self._maps.move_to_end(key)
+        rx_pos = radio_rx.pos
+        return coverage.get_data(rx_pos[0], rx_pos[1])
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 # Names of different land categories.
 LCM2015_NAME = {0: 'Default',
                 1: 'Broadleaved Woodland',
@@ -70,3 +73,33 @@ LCM2015_CLUTTER_HEIGHT = {'Default': 0.0,
                           'Saltmarsh': 0.0,
                           'Urban': 15.0,
                           'Suburban': 10.0}
+
+# Land categories rovers cannot enter.
+LCM2015_IMPASSABLE = ['Saltwater', 'Freshwater']
+
+# Land categories modelled as dense clutter, all others being open areas.
+LCM2015_DENSE = ['Broadleaved Woodland', 'Coniferous Woodland', 'Urban', 'Suburban']
+
+CLUTTER_OPEN = 1   # Clutter type of open areas.
+CLUTTER_DENSE = 2  # Clutter type of dense areas.
+
+# Lookup tables indexed by land category ID, to be indexed with land cover data directly.
+LCM2015_PASSABLE_TABLE = np.array([LCM2015_NAME[i] not in LCM2015_IMPASSABLE for i in range(len(LCM2015_NAME))])
+LCM2015_CLUTTER_TYPE_TABLE = np.array([CLUTTER_DENSE if LCM2015_NAME[i] in LCM2015_DENSE else CLUTTER_OPEN
+                                       for i in range(len(LCM2015_NAME))], dtype=np.uint8)
+LCM2015_CLUTTER_HEIGHT_TABLE = np.array([LCM2015_CLUTTER_HEIGHT[LCM2015_NAME[i]] for i in range(len(LCM2015_NAME))])
+
+
+def build_impassable(data):
+    """
+    Flag the cells of land cover data rovers cannot enter.
+    """
+    return ~LCM2015_PASSABLE_TABLE[data.astype(np.intp)]
+
+
+def build_rgb(data, cmap=LCM2015_COLORMAP):
+    """
+    Colour the cells of land cover data using specified RGB colour scheme.
+    """
+    table = np.array([cmap.get(i, [0, 0, 0]) for i in range(max(cmap) + 1)], dtype=np.uint8)
+    return table[data.astype(np.intp)]
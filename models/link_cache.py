@@ -0,0 +1,85 @@
+from collections import OrderedDict
+
+
+class LinkCache:
+    """
+    A bounded cache of path losses between grid cells, evicting the least recently used links.
+    Path loss is treated as reciprocal, so a link and its reverse share one entry.
+    """
+    def __init__(self, capacity=4096, cell_size=5, origin=(0, 0)):
+        self._capacity = capacity       # Maximum number of links cached.
+        self._cell_size = cell_size     # Size of the cells positions are quantised to, in meter.
+        self._origin = origin           # Lower left corner of the cell grid, (x, y).
+        self._links = OrderedDict()     # Cached path losses, least recently used first.
+        self._num_hits = 0              # The number of lookups finding a cached link.
+        self._num_misses = 0            # The number of lookups not finding a cached link.
+        self._num_evictions = 0         # The number of links evicted.
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def cell_size(self):
+        return self._cell_size
+
+    @property
+    def num_links(self):
+        return len(self._links)
+
+    @property
+    def num_hits(self):
+        return self._num_hits
+
+    @property
+    def num_misses(self):
+        return self._num_misses
+
+    @property
+    def num_evictions(self):
+        return self._num_evictions
+
+    def cell(self, pos):
+        """
+        Quantise a position to the cell it lies in.
+        """
+        return (int((pos[0] - self._origin[0]) // self._cell_size),
+                int((pos[1] - self._origin[1]) // self._cell_size))
+
+    def key(self, tx_pos, rx_pos, f, tx_ant_h, rx_ant_h, max_dist=None):
+        """
+        Build the key of a link, the same for both of its directions.
+        """
+        tx_end = (self.cell(tx_pos), tx_ant_h)
+        rx_end = (self.cell(rx_pos), rx_ant_h)
+        if rx_end < tx_end:
+            tx_end, rx_end = rx_end, tx_end
+        return tx_end, rx_end, f, max_dist
+
+    def get(self, key):
+        """
+        Get the cached path loss of a link, None if not cached.
+        """
+        path_loss = self._links.get(key)
+        if path_loss is None:
+            self._num_misses += 1
+        else:
+            self._num_hits += 1
+            self._links.move_to_end(key)
+        return path_loss
+
+    def put(self, key, path_loss):
+        """
+        Cache the path loss of a link, evicting the least recently used link if full.
+        """
+        self._links[key] = path_loss
+        self._links.move_to_end(key)
+        while len(self._links) > self._capacity:
+            self._links.popitem(last=False)
+            self._num_evictions += 1
+
+    def clear(self):
+        """
+        Empty the cache, keeping the counters.
+        """
+        self._links.clear()
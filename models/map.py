@@ -1,7 +1,132 @@
+import os
+from math import *
+import numpy as np
+
 from exceptions.non_integer_indexes import *
 from exceptions.indexes_out_of_range import *
 
 
+HORIZON_BANDS = (1, 3, 5, 7)    # Pyramid levels whose reach bounds the range of each band of terrain horizons.
+HORIZON_REACH = 4               # Blocks of each pyramid level covered around a cell by terrain horizons.
+
+
+def build_block_max(data, block):
+    """
+    Compute the maxima of data over square blocks of cells, the last blocks covering what remains.
+    """
+    rows, cols = -(-data.shape[0] // block), -(-data.shape[1] // block)
+    padded = np.full((rows * block, cols * block), data.min(), dtype=data.dtype)
+    padded[:data.shape[0], :data.shape[1]] = data
+    return padded.reshape(rows, block, cols, block).max(axis=(1, 3))
+
+
+def build_pyramid_relief(data, max_level, q=99):
+    """
+    Compute how far the cells of each level of a max-pooled pyramid rise above the cells they cover,
+    as the q-th percentile over all cells, level 0 being the data itself.
+    """
+    relief = np.zeros(max_level + 1)
+    for level in range(1, max_level + 1):
+        block = 2 ** level
+        covering = np.repeat(np.repeat(build_block_max(data, block), block, axis=0), block, axis=1)
+        relief[level] = np.percentile(covering[:data.shape[0], :data.shape[1]] - data, q)
+    return relief
+
+
+def sector_of(angle, sectors):
+    """
+    Get the azimuth sectors of angles (counterclockwise from east, in radian), sector 0 starting due west.
+    """
+    return np.floor((np.asarray(angle) + pi) / (2 * pi / sectors)).astype(np.intp) % sectors
+
+
+def offset_sectors(o_e, o_n, sectors):
+    """
+    Get the sectors of every direction from a point of a square block to a point of the block o_e blocks east
+    and o_n blocks north of it, all of them if the two blocks touch.
+    """
+    if abs(o_e) <= 1 and abs(o_n) <= 1:
+        return list(range(sectors))
+    corners = [atan2(o_n + v, o_e + u) for u in (-1, 1) for v in (-1, 1)]
+    # The square of offsets does not contain the origin, so its directions span less than pi around its centre.
+    centre = atan2(o_n, o_e)
+    spread = [(c - centre + pi) % (2 * pi) - pi for c in corners]
+    low, high = centre + min(spread) - 1e-9, centre + max(spread) + 1e-9
+    width = 2 * pi / sectors
+    first = int(floor((low + pi) / width))
+    last = int(floor((high + pi) / width))
+    return sorted({s % sectors for s in range(first, last + 1)})
+
+
+def build_horizon(data, resolution, sectors=16, bands=HORIZON_BANDS, reach=HORIZON_REACH):
+    """
+    Compute upper bounds of the horizon slope from each cell in each azimuth sector, i.e. of
+    (height - height of the cell) / distance over the cells in the sector at least one resolution away,
+    within each band's range of reach * 2**band cells, as float16 rounded up, of shape (bands, sectors, rows, cols).
+    Cells are laid out by position, the data being read the same way as get_data() reads it (column e - 1 for
+    easting index e). Nearby cells are bounded cell by cell, farther ones by the maxima of ever larger blocks,
+    the blocks of level k covering up to reach blocks of 2**k cells away.
+    """
+    heights = np.roll(np.asarray(data, dtype=np.float32), 1, axis=1)    # Heights by position.
+    rows, cols = heights.shape
+    horizon = np.full((sectors, rows, cols), -np.inf, dtype=np.float32)
+    compact = np.empty((len(bands), sectors, rows, cols), dtype=np.float16)
+    for level in range(max(bands) + 1):
+        block = 2 ** level
+        maxima = build_block_max(heights, block)
+        padded = np.full((maxima.shape[0] + 2 * reach, maxima.shape[1] + 2 * reach), -np.inf, dtype=np.float32)
+        padded[reach:-reach, reach:-reach] = maxima
+        if level <= 1:
+            # Observers by cell, for the blocks next to them.
+            observers = heights
+            row_block, col_block = np.arange(rows) // block + reach, np.arange(cols) // block + reach
+            level_horizon = horizon
+        else:
+            # Observers by block, at the lowest cell of theirs, for blocks at least a block away.
+            observers = -build_block_max(-heights, block)
+            level_horizon = np.full((sectors,) + observers.shape, -np.inf, dtype=np.float32)
+        for o_n in range(-reach, reach + 1):
+            for o_e in range(-reach, reach + 1):
+                if level > 0 and abs(o_e) <= 1 and abs(o_n) <= 1:
+                    continue    # Covered by the level below.
+                if level <= 1:
+                    # Rows run southward.
+                    heights_to = padded[np.ix_(row_block - o_n, col_block + o_e)]
+                else:
+                    heights_to = padded[reach - o_n:reach - o_n + observers.shape[0],
+                                        reach + o_e:reach + o_e + observers.shape[1]]
+                dist_min = max(hypot(max(abs(o_e) - 1, 0), max(abs(o_n) - 1, 0)) * block * resolution, resolution)
+                dist_max = hypot(abs(o_e) + 1, abs(o_n) + 1) * block * resolution
+                rise = heights_to - observers
+                slope = np.where(rise >= 0, rise / dist_min, rise / dist_max)
+                for sector in offset_sectors(o_e, o_n, sectors):
+                    np.maximum(level_horizon[sector], slope, out=level_horizon[sector])
+        if level > 1:
+            row_index, col_index = np.arange(rows) // block, np.arange(cols) // block
+            for sector in range(sectors):
+                np.maximum(horizon[sector], level_horizon[sector][np.ix_(row_index, col_index)], out=horizon[sector])
+        for band in [i for i in range(len(bands)) if bands[i] == level]:
+            compact[band] = horizon
+            below = compact[band].astype(np.float32) < horizon
+            compact[band][below] = np.nextafter(compact[band][below], np.float16(np.inf))
+    return compact
+
+
+def block_slices(index_min, index_max, n, block):
+    """
+    Get the slices of blocks covering a range of indexes along an axis of n cells,
+    negative indexes wrapping around to the end.
+    """
+    slices = []
+    if index_min < 0:
+        slices.append(slice(max(n + index_min, 0) // block, (n - 1) // block + 1))
+        index_min = 0
+    index_max = min(index_max, n - 1)
+    if index_min <= index_max:
+        slices.append(slice(index_min // block, index_max // block + 1))
+    return slices
+
+
 class Map:
     """
     A map class.
@@ -15,6 +140,8 @@ class Map:
         self._x_range = self._n_cols * self._resolution  # Range of map. Notice: top & right-hand side boundaries
         self._y_range = self._n_rows * self._resolution  # are not included.
         self._data = data                                # Geo-spatial data for each grid point.
+        self._cache_prefix = None                        # Path prefix for caching rasters derived from data.
+        self._derived = {}                               # Rasters derived from data, by name.
 
     def __str__(self):
         return 'Map Specifications:' + '\n' + \
@@ -56,6 +183,52 @@ class Map:
     def data(self):
         return self._data
 
+    @property
+    def cache_prefix(self):
+        return self._cache_prefix
+
+    def config_cache(self, prefix):
+        """
+        Configure where rasters derived from the data are cached, None meaning in memory only.
+        """
+        self._cache_prefix = prefix
+
+    def is_tiled(self):
+        """
+        See if the map is stitched from tiles, whose derived rasters are built tile by tile.
+        """
+        return False
+
+    def derived(self, name, build, tile_build=None):
+        """
+        Get a raster derived from the data, e.g. slopes, building it with the given function only once.
+        If the map has a cache, the raster is saved there too and reused by later runs.
+        On a tiled map, tile_build, if given, builds the raster of each tile from the tile's map object instead.
+        """
+        raster = self._derived.get(name)
+        if raster is not None:
+            return raster
+
+        path = None
+        if self._cache_prefix is not None:
+            path = self._cache_prefix + '.' + name + '.npy'
+            try:
+                raster = np.load(path)
+            except (OSError, ValueError):
+                raster = None
+        if raster is None:
+            raster = build(self.data)
+            if path is not None:
+                try:
+                    temp_path = path + '.' + str(os.getpid()) + '.tmp'
+                    with open(temp_path, 'wb') as file:
+                        np.save(file, raster)
+                    os.replace(temp_path, path)
+                except OSError:
+                    pass
+        self._derived[name] = raster
+        return raster
+
     def is_valid_index(self, row, col):
         """
         See if an index-pair is valid.
@@ -68,6 +241,43 @@ class Map:
         else:
             return -1
 
+    def block_max(self, block=16):
+        """
+        Get the maxima of the data over square blocks of cells, built only once.
+        """
+        return self.derived('block_max' + str(block), lambda data: build_block_max(data, block))
+
+    def pyramid(self, level):
+        """
+        Get a level of the max-pooled pyramid of the data, each cell the maximum of 2**level by 2**level cells.
+        """
+        return self.data if level == 0 else self.block_max(2 ** level)
+
+    def pyramid_relief(self, max_level):
+        """
+        Get how far the cells of each pyramid level up to a maximum rise above the cells they cover, built only once.
+        This is a high percentile, not the largest rise, so the error budgets resting on it are approximate.
+        """
+        return self.derived('pyramid_relief' + str(max_level), lambda data: build_pyramid_relief(data, max_level))
+
+    def max_between(self, easting_min, easting_max, northing_min, northing_max, block=16):
+        """
+        Get an upper bound of the data get_data() returns within a rectangle, from the maxima of the blocks it
+        overlaps, including the blocks negative indexes wrap around to.
+        """
+        e_min, e_max = int((easting_min - self._x_llcorner) / self._resolution), \
+            int((easting_max - self._x_llcorner) / self._resolution)
+        n_min, n_max = int((northing_min - self._y_llcorner) / self._resolution), \
+            int((northing_max - self._y_llcorner) / self._resolution)
+        maxima = self.block_max(block)
+        bound = None
+        for rows in block_slices(self._n_rows - n_max - 1, self._n_rows - n_min - 1, self._n_rows, block):
+            for cols in block_slices(e_min - 1, e_max - 1, self._n_cols, block):
+                block_bound = maxima[rows, cols].max()
+                if bound is None or block_bound > bound:
+                    bound = block_bound
+        return bound
+
     def coordinate2index(self, easting, northing):
         """
         Change plane coordinates into array indexes.
@@ -101,10 +311,97 @@ class Map:
         """
         Get data at given coordinates.
         """
-        row, col = self.coordinate2index(easting, northing)
-        if self.is_valid_index(row, col):
-            return self._data[row, col]
-        elif self.is_valid_index(row, col) == -1:
-            raise NonIntegerIndexes()
-        elif self.is_valid_index(row, col) == -2:
+        row, col = self.coordinate2index(easting, northing)  # Indexes already checked.
+        return self._data[row, col]
+
+    def coordinate2index_many(self, eastings, northings, flag=False):
+        """
+        Change arrays of plane coordinates into arrays of indexes in one pass.
+        Indexes are resolved exactly as by coordinate2index, and those which get_data could not read
+        raise IndexesOutOfRange, unless flagged, in which case a mask of the valid ones is returned too.
+        """
+        eastings, northings = np.broadcast_arrays(np.asarray(eastings, dtype=np.float64),
+                                                  np.asarray(northings, dtype=np.float64))
+        e = np.trunc((eastings - self._x_llcorner) / self._resolution).astype(np.int64)
+        n = np.trunc((northings - self._y_llcorner) / self._resolution).astype(np.int64)
+        rows, cols = self._n_rows - n - 1, e - 1
+        valid = (rows >= -self._n_rows) & (rows < self._n_rows) & (cols >= -self._n_cols) & (cols < self._n_cols)
+        if flag:
+            return rows, cols, valid
+        elif not valid.all():
             raise IndexesOutOfRange()
+        return rows, cols
+
+    def get_data_many(self, eastings, northings, flag=False, fill=0):
+        """
+        Get data at arrays of coordinates with one gather, matching get_data point for point.
+        If flagged, out of range points are filled instead of raising and a mask of the valid ones is returned too.
+        """
+        if flag:
+            rows, cols, valid = self.coordinate2index_many(eastings, northings, flag=True)
+            data = np.full(rows.shape, fill, dtype=self._data.dtype)
+            data[valid] = self._data[rows[valid], cols[valid]]
+            return data, valid
+        rows, cols = self.coordinate2index_many(eastings, northings)
+        return self._data[rows, cols]
+
+    def get_pyramid_data_many(self, eastings, northings, level):
+        """
+        Get the data of a pyramid level at arrays of coordinates, i.e. the maximum of the block of cells
+        around the cell get_data() would read, negative indexes wrapping around as they do there.
+        """
+        if level == 0:
+            return self.get_data_many(eastings, northings)
+        rows, cols = self.coordinate2index_many(eastings, northings)
+        block = 2 ** level
+        return self.pyramid(level)[(rows % self._n_rows) // block, (cols % self._n_cols) // block]
+
+    def horizon(self, sectors=16):
+        """
+        Get upper bounds of the horizon slopes from each cell in azimuth sectors within each band's range,
+        built only once.
+        """
+        return self.derived('horizon' + str(sectors) + '_' + '_'.join(str(band) for band in HORIZON_BANDS),
+                            lambda data: build_horizon(data, self._resolution, sectors))
+
+    def horizon_range(self, band):
+        """
+        Get how far from a cell its terrain horizons of a band reach at least, in meter.
+        """
+        return HORIZON_REACH * 2 ** HORIZON_BANDS[band] * self._resolution
+
+    def get_horizon_many(self, eastings, northings, angles, bands, sectors=16):
+        """
+        Get the horizon slope bounds at arrays of coordinates in the sectors of given azimuths, in radian,
+        and in given bands.
+        """
+        rows, cols = self.coordinate2index_many(eastings, northings)
+        # The horizon is laid out by position, easting index e being column e - 1 of the data.
+        return self.horizon(sectors)[bands, sector_of(angles, sectors), rows % self._n_rows, (cols + 1) % self._n_cols]
+
+
+class MappedMap(Map):
+    """
+    A map class whose data is memory-mapped from a .npy file rather than held in memory.
+    Only the cells actually read are paged in, and processes mapping the same file share the OS page cache.
+    """
+    def __init__(self, n_cols, n_rows, x_llcorner, y_llcorner, resolution, data_path):
+        super().__init__(n_cols, n_rows, x_llcorner, y_llcorner, resolution, np.load(data_path, mmap_mode='r'))
+        self._data_path = data_path                      # The .npy file backing the data.
+
+    @property
+    def data_path(self):
+        return self._data_path
+
+    def __getstate__(self):
+        """
+        Pickle without the data, e.g. when sent to a worker process, which maps the file again instead.
+        """
+        state = self.__dict__.copy()
+        state['_data'] = None
+        state['_derived'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._data = np.load(self._data_path, mmap_mode='r')
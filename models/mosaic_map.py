@@ -0,0 +1,365 @@
+from collections import OrderedDict
+import numpy as np
+
+from models.map import *
+from exceptions.map_not_aligned import *
+from exceptions.tiled_map_unsupported import *
+
+
+class TiledRaster:
+    """
+    A raster derived from the data of a mosaic tile by tile, read like an array of the same layout as the data,
+    i.e. indexed by (..., row, col), rows and columns being integers or arrays and negative ones wrapping around.
+    The part of each tile is built from the tile alone when first read, and is kept with the tile while loaded,
+    and in the tile's cache on disk if it has one and caching is set.
+    """
+    def __init__(self, mosaic, name, build, cache=True):
+        self._mosaic = mosaic       # The mosaic the raster is derived from.
+        self._name = name           # The name of the raster, that of each tile's part.
+        self._build = build         # Function building the part of a tile from the tile's map object.
+        self._cache = cache         # Whether the part of each tile is cached on disk with the tile.
+
+    @property
+    def shape(self):
+        return self.tile(0, 0).shape[:-2] + (self._mosaic.n_rows, self._mosaic.n_cols)
+
+    @property
+    def dtype(self):
+        return self.tile(0, 0).dtype
+
+    def tile(self, tile_row, tile_col):
+        """
+        Get the part of the raster covering a tile, building it if needed.
+        """
+        return self._mosaic.tile_derived(tile_row, tile_col, self._name, self._build, self._cache)
+
+    def __getitem__(self, key):
+        """
+        Gather the raster at rows and columns, with one gather per tile touched. Leading slices, e.g. of
+        stacked rasters, are applied to every tile's part.
+        """
+        if not isinstance(key, tuple):
+            key = (key,)
+        mosaic = self._mosaic
+        n_slices = 0
+        while n_slices < len(key) - 2 and isinstance(key[n_slices], slice):
+            n_slices += 1
+        indexes = np.broadcast_arrays(*[np.asarray(index, dtype=np.intp) for index in key[n_slices:]])
+        rows = np.where(indexes[-2] < 0, indexes[-2] + mosaic.n_rows, indexes[-2]).ravel()
+        cols = np.where(indexes[-1] < 0, indexes[-1] + mosaic.n_cols, indexes[-1]).ravel()
+        if ((rows < 0) | (rows >= mosaic.n_rows) | (cols < 0) | (cols >= mosaic.n_cols)).any():
+            raise IndexesOutOfRange()
+        num_tile_cols = mosaic.n_cols // mosaic.tile_cols
+        tile_keys = (rows // mosaic.tile_rows) * num_tile_cols + cols // mosaic.tile_cols
+        local = [index.ravel() for index in indexes[:-2]] + [rows % mosaic.tile_rows, cols % mosaic.tile_cols]
+        raster = None
+        for tile_key in np.unique(tile_keys).tolist():
+            selected = np.flatnonzero(tile_keys == tile_key)
+            part = self.tile(tile_key // num_tile_cols, tile_key % num_tile_cols)[
+                key[:n_slices] + tuple(index[selected] for index in local)]
+            if raster is None:
+                raster = np.empty(part.shape[:-1] + (len(rows),), dtype=part.dtype)
+            raster[..., selected] = part
+        if raster is None:
+            raster = self.tile(0, 0)[key[:n_slices] + tuple(index[:0] for index in local)]
+        raster = raster.reshape(raster.shape[:-1] + indexes[-1].shape)
+        return raster[()] if raster.ndim == 0 else raster
+
+    def __array__(self, dtype=None, copy=None):
+        """
+        Assemble the parts of all tiles, which loads every tile, so avoid on large mosaics.
+        """
+        num_tile_rows, num_tile_cols = self._mosaic.n_rows // self._mosaic.tile_rows, \
+            self._mosaic.n_cols // self._mosaic.tile_cols
+        raster = np.concatenate([np.concatenate([self.tile(tile_row, tile_col) for tile_col in range(num_tile_cols)],
+                                                axis=-1) for tile_row in range(num_tile_rows)], axis=-2)
+        return raster if dtype is None else raster.astype(dtype)
+
+
+class MosaicMap(Map):
+    """
+    A map class stitching adjacent, equally sized tiles (e.g. neighbouring OS grid squares) into one map.
+    Tiles are only loaded when first accessed, and the least recently used ones are evicted
+    once the loaded tiles, with the rasters derived from them, exceed the memory budget.
+    Rasters are derived tile by tile, each tile's part from the tile alone, so that no tile is loaded unless read.
+    """
+    def __init__(self, tiles, loader, memory_budget=None):
+        # Each tile is a (header, source) pair, the header holding the same fields as a map's specifications
+        # and the source being whatever the loader needs to load the tile as a map object.
+        first = tiles[0][0]
+        self._tile_cols = first['n_cols']                # Columns of each tile.
+        self._tile_rows = first['n_rows']                # Rows of each tile.
+        resolution = first['resolution']
+        tile_width = self._tile_cols * resolution
+        tile_height = self._tile_rows * resolution
+        x_llcorner = min(header['x_llcorner'] for header, _ in tiles)
+        y_llcorner = min(header['y_llcorner'] for header, _ in tiles)
+        x_tiles = max(header['x_llcorner'] for header, _ in tiles) - x_llcorner + tile_width
+        y_tiles = max(header['y_llcorner'] for header, _ in tiles) - y_llcorner + tile_height
+        x_tiles, y_tiles = x_tiles // tile_width, y_tiles // tile_height
+
+        # Tiles are arranged like the cells of a map, i.e. the top row of tiles first.
+        self._sources = [[None] * x_tiles for _ in range(y_tiles)]
+        for header, source in tiles:
+            if (header['n_cols'], header['n_rows'], header['resolution']) != \
+                    (self._tile_cols, self._tile_rows, resolution):
+                raise MapNotAligned()
+            x_offset = header['x_llcorner'] - x_llcorner
+            y_offset = header['y_llcorner'] - y_llcorner
+            if x_offset % tile_width != 0 or y_offset % tile_height != 0:
+                raise MapNotAligned()
+            tile_row, tile_col = y_tiles - y_offset // tile_height - 1, x_offset // tile_width
+            if self._sources[tile_row][tile_col] is not None:
+                raise MapNotAligned()
+            self._sources[tile_row][tile_col] = source
+        if any(source is None for sources in self._sources for source in sources):
+            raise MapNotAligned()  # Tiles must cover a complete rectangle.
+
+        super().__init__(self._tile_cols * x_tiles, self._tile_rows * y_tiles, x_llcorner, y_llcorner,
+                         resolution, None)
+        self._loader = loader                            # Function loading a tile's source as a map object.
+        self._memory_budget = memory_budget              # Maximum bytes of loaded tiles, None means unlimited.
+        self._tiles = OrderedDict()                      # Loaded tiles, least recently used first.
+        self._loaded_bytes = 0                           # Bytes of the loaded tiles, data and derived rasters.
+        self._tile_bytes = {}                            # Bytes of each loaded tile, data and derived rasters.
+        self._num_loads = 0                              # The number of tiles loaded.
+        self._num_evictions = 0                          # The number of tiles evicted.
+
+    @property
+    def data(self):
+        """
+        Assemble the data of all tiles, which loads every tile, so avoid on large mosaics.
+        """
+        rows = []
+        for tile_row in range(len(self._sources)):
+            rows.append(np.hstack([self.get_tile(tile_row, tile_col).data
+                                   for tile_col in range(len(self._sources[tile_row]))]))
+        return np.vstack(rows)
+
+    @property
+    def tile_cols(self):
+        return self._tile_cols
+
+    @property
+    def tile_rows(self):
+        return self._tile_rows
+
+    @property
+    def memory_budget(self):
+        return self._memory_budget
+
+    @property
+    def loaded_tiles(self):
+        return list(self._tiles.keys())
+
+    @property
+    def loaded_bytes(self):
+        return self._loaded_bytes
+
+    @property
+    def num_loads(self):
+        return self._num_loads
+
+    @property
+    def num_evictions(self):
+        return self._num_evictions
+
+    def get_tile(self, tile_row, tile_col):
+        """
+        Get a tile as a map object, loading it if needed.
+        """
+        key = (tile_row, tile_col)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            return tile
+
+        tile = self._loader(self._sources[tile_row][tile_col])
+        self._tiles[key] = tile
+        self._tile_bytes[key] = 0
+        self._num_loads += 1
+        self.charge(key, tile.data.nbytes)
+        return tile
+
+    def charge(self, key, nbytes):
+        """
+        Count bytes held by a loaded tile, evicting the least recently used tiles while over the memory budget.
+        """
+        self._tile_bytes[key] += nbytes
+        self._loaded_bytes += nbytes
+        if self._memory_budget is not None:
+            # Always keep the tile last used, even if it alone exceeds the budget.
+            while len(self._tiles) > 1 and self._loaded_bytes > self._memory_budget:
+                evicted, _ = self._tiles.popitem(last=False)
+                self._loaded_bytes -= self._tile_bytes.pop(evicted)
+                self._num_evictions += 1
+
+    def is_tiled(self):
+        """
+        See if the map is stitched from tiles, which it is.
+        """
+        return True
+
+    def derived(self, name, build, tile_build=None):
+        """
+        Get a raster derived from the data tile by tile, each tile's part built with the given function from the
+        tile's data, or with tile_build from the tile's map object, when first read.
+        Tiles cached on disk keep their parts there too, e.g. those pre-warmed for their area alone.
+        """
+        raster = self._derived.get(name)
+        if raster is None:
+            if tile_build is None:
+                raster = TiledRaster(self, name, lambda tile: build(tile.data))
+            else:
+                raster = TiledRaster(self, name + '_tiled', tile_build)
+            self._derived[name] = raster
+        return raster
+
+    def tile_derived(self, tile_row, tile_col, name, build, cache=True):
+        """
+        Get a raster derived from a tile, building it from the tile's map object if needed, and caching it on disk
+        with the tile if the tile has a cache and caching is set.
+        """
+        key = (tile_row, tile_col)
+        tile = self.get_tile(tile_row, tile_col)
+        raster = tile._derived.get(name)
+        if raster is None:
+            if cache:
+                raster = tile.derived(name, lambda data: build(tile))
+            else:
+                raster = tile._derived[name] = build(tile)
+            self.charge(key, raster.nbytes)
+        return raster
+
+    def block_max(self, block=16):
+        """
+        Block maxima are kept by tile, not as one array over the mosaic, and so are pyramid levels above 0.
+        """
+        raise TiledMapUnsupported('Block maxima of a mosaic are kept by tile, '
+                                  'use max_between() or get_pyramid_data_many().')
+
+    def max_between(self, easting_min, easting_max, northing_min, northing_max, block=16):
+        """
+        Get an upper bound of the data get_data() returns within a rectangle, from the maxima of the blocks of
+        each tile it overlaps, including the tiles negative indexes wrap around to.
+        """
+        e_min, e_max = int((easting_min - self._x_llcorner) / self._resolution), \
+            int((easting_max - self._x_llcorner) / self._resolution)
+        n_min, n_max = int((northing_min - self._y_llcorner) / self._resolution), \
+            int((northing_max - self._y_llcorner) / self._resolution)
+        bound = None
+        for rows in block_slices(self._n_rows - n_max - 1, self._n_rows - n_min - 1, self._n_rows, 1):
+            for cols in block_slices(e_min - 1, e_max - 1, self._n_cols, 1):
+                for tile_row in range(rows.start // self._tile_rows, (rows.stop - 1) // self._tile_rows + 1):
+                    row_first = max(rows.start - tile_row * self._tile_rows, 0)
+                    row_last = min(rows.stop - tile_row * self._tile_rows, self._tile_rows) - 1
+                    for tile_col in range(cols.start // self._tile_cols, (cols.stop - 1) // self._tile_cols + 1):
+                        col_first = max(cols.start - tile_col * self._tile_cols, 0)
+                        col_last = min(cols.stop - tile_col * self._tile_cols, self._tile_cols) - 1
+                        maxima = self.tile_derived(tile_row, tile_col, 'block_max' + str(block),
+                                                   lambda tile: build_block_max(tile.data, block))
+                        block_bound = maxima[row_first // block:row_last // block + 1,
+                                             col_first // block:col_last // block + 1].max()
+                        if bound is None or block_bound > bound:
+                            bound = block_bound
+        return bound
+
+    def pyramid_relief(self, max_level):
+        """
+        Get how far the cells of each pyramid level up to a maximum rise above the cells they cover, the largest of
+        the tiles' reliefs, built only once, loading every tile once.
+        """
+        name = 'pyramid_relief' + str(max_level)
+        relief = self._derived.get(name)
+        if relief is None:
+            relief = np.max([self.tile_derived(tile_row, tile_col, name,
+                                               lambda tile: build_pyramid_relief(tile.data, max_level))
+                             for tile_row in range(len(self._sources))
+                             for tile_col in range(len(self._sources[tile_row]))], axis=0)
+            self._derived[name] = relief
+        return relief
+
+    def get_pyramid_data_many(self, eastings, northings, level):
+        """
+        Get the data of a pyramid level at arrays of coordinates, i.e. the maximum of the block of cells of its tile
+        around the cell get_data() would read, with one gather per tile touched.
+        """
+        if level == 0:
+            return self.get_data_many(eastings, northings)
+        block = 2 ** level
+        rows, cols = self.coordinate2index_many(eastings, northings)
+        rows, cols = rows % self._n_rows, cols % self._n_cols
+        num_tile_cols = len(self._sources[0])
+        keys = (rows // self._tile_rows) * num_tile_cols + cols // self._tile_cols
+        data = None
+        for key in np.unique(keys).tolist():
+            maxima = self.tile_derived(key // num_tile_cols, key % num_tile_cols, 'block_max' + str(block),
+                                       lambda tile: build_block_max(tile.data, block))
+            if data is None:
+                data = np.empty(rows.shape, dtype=maxima.dtype)
+            selected = keys == key
+            data[selected] = maxima[(rows[selected] % self._tile_rows) // block,
+                                    (cols[selected] % self._tile_cols) // block]
+        if data is None:
+            data = np.empty(rows.shape)
+        return data
+
+    def horizon(self, sectors=16):
+        """
+        Terrain horizons would stop at the edges of tiles, so they are not built for mosaics.
+        """
+        raise TiledMapUnsupported('Terrain horizons are not built for mosaics.')
+
+    def horizon_range(self, band):
+        """
+        Without terrain horizons, none reaches any distance, so no path is classified clear by them.
+        """
+        return 0
+
+    def get_data(self, easting, northing):
+        """
+        Get data at given coordinates.
+        """
+        row, col = self.coordinate2index(easting, northing)
+        # Negative indexes wrap around the whole mosaic, as they would on a single map's data.
+        if row < 0:
+            row += self._n_rows
+        if col < 0:
+            col += self._n_cols
+        tile = self.get_tile(row // self._tile_rows, col // self._tile_cols)
+        return tile.data[row % self._tile_rows, col % self._tile_cols]
+
+    def get_data_many(self, eastings, northings, flag=False, fill=0):
+        """
+        Get data at arrays of coordinates, with one gather per tile touched.
+        """
+        rows, cols, valid = self.coordinate2index_many(eastings, northings, flag=True)
+        if not flag and not valid.all():
+            raise IndexesOutOfRange()
+        rows = np.where(rows < 0, rows + self._n_rows, rows)
+        cols = np.where(cols < 0, cols + self._n_cols, cols)
+        tile_rows, tile_cols = rows // self._tile_rows, cols // self._tile_cols
+        keys = np.where(valid, tile_rows * len(self._sources[0]) + tile_cols, -1)
+        data = None
+        for key in np.unique(keys[valid]).tolist():
+            tile = self.get_tile(key // len(self._sources[0]), key % len(self._sources[0]))
+            if data is None:
+                data = np.full(rows.shape, fill, dtype=tile.data.dtype)
+            selected = keys == key
+            data[selected] = tile.data[rows[selected] % self._tile_rows, cols[selected] % self._tile_cols]
+        if data is None:
+            data = np.full(rows.shape, fill)
+        if flag:
+            return data, valid
+        return data
+
+    def __getstate__(self):
+        """
+        Pickle without the loaded tiles, which are loaded again on demand.
+        """
+        state = self.__dict__.copy()
+        state['_tiles'] = OrderedDict()
+        state['_loaded_bytes'] = 0
+        state['_tile_bytes'] = {}
+        state['_derived'] = {}
+        return state
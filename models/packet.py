@@ -5,6 +5,8 @@ class Packet:
     def __init__(self, tx, payload):
         self._tx = tx               # The transmitter, a radio object.
         self._payload = payload     # The payload, a list.
+        self._start = None          # The time it goes on air, in second.
+        self._end = None            # The time its airtime ends, in second.
 
     @property
     def tx(self):
@@ -13,3 +15,18 @@ class Packet:
     @property
     def payload(self):
         return self._payload
+
+    @property
+    def start(self):
+        return self._start
+
+    @property
+    def end(self):
+        return self._end
+
+    def set_interval(self, start, end):
+        """
+        Set the interval the packet is on air, in second.
+        """
+        self._start = start
+        self._end = end
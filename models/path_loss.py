@@ -1,7 +1,9 @@
+from functools import lru_cache
 import numpy as np
 from math import *
 
 from models.landcover_spec import *
+from models.map import HORIZON_BANDS
 
 # T_pc = 0.5  # Percentage of average year for which the predicted basic tx loss is not exceeded, set to 50% hereby.
 # N_d1km50 = -45  # The refractivity gradient from the surface to 1 km above not exceeded for 50% of an average year.
@@ -12,6 +14,382 @@ W_s = 27  # Street width, set to 27 if local info is unknown, in meter.
 LIGHT_SPEED = 2.998 * pow(10, 8)  # Light speed, in m/s.
 
 
+def knife_edge_loss(diff_param):
+    """
+    Calculate the knife edge diffraction loss given diffraction parameter.
+    """
+    if diff_param > -0.78:
+        return 6.9 + 20 * log10(sqrt((diff_param - 0.1) ** 2 + 1) + diff_param - 0.1)  # dB
+    else:
+        return 0
+
+
+@lru_cache(maxsize=None)
+def clutter_loss_table(f, ant_h):
+    """
+    Calculate the clutter loss of an antenna in every land category, indexed by land category ID.
+    Radios share a few frequencies and antenna heights, so each table is only calculated once.
+    """
+    table = np.zeros(len(LCM2015_CLUTTER_HEIGHT_TABLE))
+    for i in range(len(table)):
+        clutter_height = LCM2015_CLUTTER_HEIGHT_TABLE[i]
+        if ant_h >= clutter_height:
+            continue
+        if LCM2015_CLUTTER_TYPE_TABLE[i] == CLUTTER_OPEN:
+            k_h2 = 21.8 + 6.2 * log10(f / 1000)
+            table[i] = -k_h2 * log10(ant_h / clutter_height)
+        elif LCM2015_CLUTTER_TYPE_TABLE[i] == CLUTTER_DENSE:
+            k_nu = 0.342 * sqrt(f / 1000)
+            dh = clutter_height - ant_h
+            theta = degrees(atan(dh / W_s))
+            diff_param = k_nu * sqrt(dh * theta)
+            table[i] = knife_edge_loss(diff_param) - 6.03
+    table.flags.writeable = False  # Shared between all callers.
+    return table
+
+
+def batch_path_loss(radio_tx, radios_rx, world, d_max=None):
+    """
+    Calculate the path losses from one transmitter to many receivers at once, the same as PathLoss does for each.
+    """
+    return path_loss_many(world, radio_tx.pos, [radio_rx.pos for radio_rx in radios_rx], radio_tx.f,
+                          radio_tx.ant_height, [radio_rx.ant_height for radio_rx in radios_rx], d_max)
+
+
+def path_loss_many(world, tx_pos, rx_pos, f, tx_ant_h, rx_ant_h, d_max=None):
+    """
+    Calculate the path losses from a transmitter position to an array of receiver positions,
+    the same as PathLoss does for each. Receiver antenna heights can be one for all or one for each.
+    """
+    rx_pos = np.asarray(rx_pos, dtype=np.float64).reshape(-1, 2)
+    return path_loss_pairs(world, np.broadcast_to(np.asarray(tx_pos[:2], dtype=np.float64), rx_pos.shape), rx_pos,
+                           f, tx_ant_h, rx_ant_h, d_max)
+
+
+def path_loss_pairs(world, tx_pos, rx_pos, f, tx_ant_h, rx_ant_h, d_max=None):
+    """
+    Calculate the path losses between arrays of transmitter and receiver positions, pair by pair,
+    the same as PathLoss does for each. Antenna heights can be one for all or one for each.
+    If the world has an error budget for multi-resolution sampling, long paths are sampled from coarser terrain,
+    and if it has terrain horizons, paths they show clear of the terrain are not sampled at all.
+    """
+    terrain = world.terrain
+    tx_pos = np.asarray(tx_pos, dtype=np.float64).reshape(-1, 2)
+    rx_pos = np.asarray(rx_pos, dtype=np.float64).reshape(-1, 2)
+    tx_ant_h = np.broadcast_to(np.asarray(tx_ant_h, dtype=np.float64), len(tx_pos)).tolist()
+    rx_ant_h = np.broadcast_to(np.asarray(rx_ant_h, dtype=np.float64), len(rx_pos)).tolist()
+    d = np.sqrt((tx_pos[:, 0] - rx_pos[:, 0]) ** 2 + (tx_pos[:, 1] - rx_pos[:, 1]) ** 2)  # Path lengths, in meter.
+    h_tx = np.array([float(h + ant_h)
+                     for h, ant_h in zip(terrain.get_data_many(tx_pos[:, 0], tx_pos[:, 1]), tx_ant_h)])
+    h_rx = np.array([float(h + ant_h)
+                     for h, ant_h in zip(terrain.get_data_many(rx_pos[:, 0], rx_pos[:, 1]), rx_ant_h)])
+    tx_classes = world.landcover.get_data_many(tx_pos[:, 0], tx_pos[:, 1]).astype(np.intp)
+    rx_classes = world.landcover.get_data_many(rx_pos[:, 0], rx_pos[:, 1]).astype(np.intp)
+
+    # Only paths with intermediate samples which the horizons of their ends leave in doubt need terrain profiles.
+    n_samples = (d / terrain.resolution).astype(np.intp)
+    principal_diff_params = np.full(len(d), -np.inf)
+    paths = n_samples >= 3
+    if world.horizon_sectors is not None:
+        paths &= ~line_of_sight_clear(terrain, tx_pos, rx_pos, d, h_tx, h_rx, f, world.horizon_sectors)
+    paths = np.flatnonzero(paths)
+    if len(paths) > 0:
+        if world.error_budget is None:
+            principal_diff_params[paths] = principal_diff_params_many(terrain, tx_pos[paths], rx_pos[paths], d[paths],
+                                                                      h_tx[paths], h_rx[paths], f)[0]
+        else:
+            principal_diff_params[paths] = multi_resolution_diff_params(terrain, tx_pos[paths], rx_pos[paths],
+                                                                        d[paths], h_tx[paths], h_rx[paths], f,
+                                                                        world.error_budget, world.max_level)[0]
+
+    path_losses = np.empty(len(rx_pos))
+    for i in range(len(rx_pos)):
+        if d_max is not None and d[i] >= d_max:
+            path_losses[i] = float('-inf')
+            continue
+        free_space_loss = 20 * log10(d[i]) + 20 * log10(f) - 27.55
+        diff_loss = knife_edge_loss(principal_diff_params[i]) if n_samples[i] >= 3 else 0
+        clutter_loss = clutter_loss_table(f, tx_ant_h[i])[tx_classes[i]] + \
+            clutter_loss_table(f, rx_ant_h[i])[rx_classes[i]]
+        path_losses[i] = free_space_loss + diff_loss + clutter_loss
+    return path_losses
+
+
+def principal_diff_params_many(terrain, tx_pos, rx_pos, d, h_tx, h_rx, f):
+    """
+    Calculate the diffraction parameters of the principal edges of paths at full resolution, the same as
+    PathLoss.principal_diff_param() does for each, with the number of samples of each path's terrain profile.
+    The terrain profiles of all paths are sampled in one gather and padded to the longest one.
+    """
+    # Sample each path the same way as np.linspace, padding the shorter profiles.
+    n_samples = (d / terrain.resolution).astype(np.intp)
+    n_max = max(int(n_samples.max(initial=0)), 1)
+    steps = np.arange(n_max, dtype=np.float64)
+    within = steps < n_samples[:, None]
+    div = np.maximum(n_samples - 1, 1)[:, None]
+    pos_x = steps * ((rx_pos[:, 0] - tx_pos[:, 0])[:, None] / div) + tx_pos[:, 0, None]
+    pos_y = steps * ((rx_pos[:, 1] - tx_pos[:, 1])[:, None] / div) + tx_pos[:, 1, None]
+    last = n_samples > 1
+    pos_x[last, n_samples[last] - 1] = rx_pos[last, 0]
+    pos_y[last, n_samples[last] - 1] = rx_pos[last, 1]
+    profiles = np.full(pos_x.shape, np.nan)
+    profiles[within] = terrain.get_data_many(pos_x[within], pos_y[within])
+
+    # Diffraction parameters of the intermediate samples, as in PathLoss.principal_diff_param().
+    d_km = (d / 1000)[:, None]
+    d_sample = terrain.resolution / 1000
+    wavelength = LIGHT_SPEED / (f * pow(10, 6))
+    h_i = profiles[:, 1:]
+    d_ai = np.arange(1, n_max) * d_sample
+    d_ib = d_km - d_ai
+    h = h_i + (d_ai * d_ib) / (2 * R_eff) - (h_tx[:, None] * d_ib + h_rx[:, None] * d_ai) / d_km
+    with np.errstate(divide='ignore', invalid='ignore'):
+        diff_params = h * np.sqrt(2 * d_km / (wavelength * d_ai * d_ib))
+    diff_params[~(np.arange(1, n_max) < (n_samples - 1)[:, None])] = -np.inf
+    return diff_params.max(axis=1, initial=-np.inf), n_samples
+
+
+def line_of_sight_clear(terrain, tx_pos, rx_pos, d, h_tx, h_rx, f, sectors=16):
+    """
+    Classify the paths whose intermediate samples all certainly lie far enough below the line of sight for their
+    knife edge loss to be 0, from the terrain horizons at either end alone, without terrain profiles.
+    Seen from an end, no sample rises above the end's horizon towards the other, so the profile lies below the
+    lower of two lines, and the largest margin of the knife edge condition under it is found in closed form.
+    """
+    resolution = terrain.resolution
+    n_samples = (d / resolution).astype(np.intp)
+    clear = np.zeros(len(d), dtype=bool)
+    # Each end's horizons must reach the other end.
+    ranges = [terrain.horizon_range(band) for band in range(len(HORIZON_BANDS))]
+    bands = np.searchsorted(ranges, d)
+    paths = np.flatnonzero((n_samples >= 3) & (bands < len(ranges)))
+    if len(paths) == 0:
+        return clear
+    n, bands = n_samples[paths], bands[paths]
+    d_m, d_km = d[paths], d[paths] / 1000
+    d_sample = resolution / 1000
+    wavelength = LIGHT_SPEED / (f * pow(10, 6))
+    x_a, y_a, x_b, y_b = tx_pos[paths, 0], tx_pos[paths, 1], rx_pos[paths, 0], rx_pos[paths, 1]
+    angle = np.arctan2(y_b - y_a, x_b - x_a)
+    slope_a = terrain.get_horizon_many(x_a, y_a, angle, bands, sectors).astype(np.float64)
+    slope_b = terrain.get_horizon_many(x_b, y_b, angle + pi, bands, sectors).astype(np.float64)
+    z_a = terrain.get_data_many(x_a, y_a).astype(np.float64)
+    z_b = terrain.get_data_many(x_b, y_b).astype(np.float64)
+    h_a, h_b = h_tx[paths], h_rx[paths]
+
+    # Sample i lies i * d / (n - 1) meters along the path, but at d_ai = i * d_sample km in the diffraction
+    # parameter, which is at most -0.78 where h + 0.78 * sqrt(wavelength * d_ai * d_ib / (2 * d)) <= 0.
+    stretch = d_m / ((n - 1) * d_sample)    # Meters along the path per km of d_ai.
+    los_slope = (h_b - h_a) / d_km
+    c = 0.78 * sqrt(wavelength / 2)
+    bulge = d_km ** 2 / (8 * R_eff)
+    lo, hi = np.full(len(n), d_sample), (n - 2) * d_sample
+    # The profile lies below the transmitter's line up to d_ai = cross and below the receiver's beyond it,
+    # or the other way round where the receiver's line rises faster.
+    rate = (slope_a + slope_b) * stretch
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cross = np.where(rate != 0, (z_b + slope_b * d_m - z_a) / rate, hi)
+    before = (rate >= 0) | ((rate == 0) & (z_a <= z_b + slope_b * d_m))
+    pieces = [(z_a - h_a, slope_a * stretch - los_slope,
+               np.where(before, lo, np.maximum(lo, cross)), np.where(before, np.minimum(hi, cross), hi)),
+              (z_b + slope_b * d_m - h_a, -slope_b * stretch - los_slope,
+               np.where(before, np.maximum(lo, cross), lo), np.where(before, hi, np.minimum(hi, cross)))]
+    margin = np.full(len(n), -np.inf)
+    for k_0, k_1, piece_lo, piece_hi in pieces:
+        # k_1 * x + c * sqrt(x * (d - x) / d) is concave, largest at d * (1 - cos(theta)) / 2.
+        theta = np.arctan2(c, -k_1 * np.sqrt(d_km))
+        x = np.clip(d_km * (1 - np.cos(theta)) / 2, piece_lo, piece_hi)
+        piece_margin = k_0 + k_1 * x + c * np.sqrt(x * (d_km - x) / d_km) + bulge
+        margin = np.where(piece_lo <= piece_hi, np.maximum(margin, piece_margin), margin)
+    clear[paths] = margin <= -1e-6     # Covers rounding of sample positions and diffraction parameters.
+    return clear
+
+
+def sample_diff_params(h_i, i, d_km, d_sample, h_a, h_b, wavelength):
+    """
+    Calculate the diffraction parameters of the i-th samples of paths, as in PathLoss.principal_diff_param().
+    """
+    d_ai = i * d_sample
+    d_ib = d_km - d_ai
+    h = h_i + (d_ai * d_ib) / (2 * R_eff) - (h_a * d_ib + h_b * d_ai) / d_km
+    return h * np.sqrt(2 * d_km / (wavelength * d_ai * d_ib))
+
+
+def segment_counts(seg_start, seg_stop, seg_step):
+    """
+    Count the samples every seg_step within segments [seg_start, seg_stop] of paths, given as arrays of shape
+    (paths, segments), returning the index of the first sample of each segment and the counts.
+    """
+    seg_first = -(-seg_start // seg_step) * seg_step
+    return seg_first, np.maximum((seg_stop - seg_first) // seg_step + 1, 0)
+
+
+def segment_samples(seg_first, seg_count, seg_step):
+    """
+    Lay out the samples of segments of paths counted by segment_counts() flat, segment by segment,
+    returning the path and index of each sample.
+    """
+    flat_first, flat_count = seg_first.T.ravel(), seg_count.T.ravel()
+    seg = np.repeat(np.arange(len(flat_count)), flat_count)
+    within = np.arange(len(seg)) - np.repeat(np.cumsum(flat_count) - flat_count, flat_count)
+    index = flat_first[seg] + within * np.repeat(np.broadcast_to(seg_step, seg_count.shape[1]), seg_count.shape[0])[seg]
+    return seg % seg_count.shape[0], index
+
+
+def segment_max(values, seg_count, initial):
+    """
+    Get the maximum of the values of each path laid out by segment_samples(), the initial one if it has none.
+    """
+    flat_count = seg_count.T.ravel()
+    maxima = np.full(len(flat_count), -np.inf)
+    sampled = flat_count > 0
+    if sampled.any():
+        maxima[sampled] = np.maximum.reduceat(values, (np.cumsum(flat_count) - flat_count)[sampled])
+    return np.maximum(initial, maxima.reshape(seg_count.shape[1], -1).max(axis=0))
+
+
+def multi_resolution_diff_params(terrain, tx_pos, rx_pos, d, h_tx, h_rx, f, error_budget, max_level=4):
+    """
+    Calculate the diffraction parameters of the principal edges of paths like principal_diff_params_many(),
+    but sample each part of a path from the coarsest level of the terrain's max-pooled pyramid whose height
+    error keeps the diffraction loss within an error budget, in dB.
+    A height error shifts a diffraction parameter in proportion to sqrt(d / (d_a * d_b)), i.e. inversely to the
+    Fresnel zone radius at the sample, so the ends of every path and short paths keep full resolution while
+    the middle of long paths is sampled every 2**level cells.
+    The height error of each level is a high percentile of its relief, not its largest, so the budget is
+    approximate rather than a guarantee.
+    """
+    resolution = terrain.resolution
+    n_samples = (d / resolution).astype(np.intp)
+    principal_diff_params = np.full(len(d), -np.inf)
+    paths = np.flatnonzero(n_samples >= 3)
+    if len(paths) == 0:
+        return principal_diff_params, n_samples
+    n = n_samples[paths]
+    d_km = d[paths] / 1000
+    d_sample = resolution / 1000
+    wavelength = LIGHT_SPEED / (f * pow(10, 6))
+    h_a, h_b = h_tx[paths], h_rx[paths]
+    x_0, y_0 = tx_pos[paths, 0], tx_pos[paths, 1]
+    x_step = (rx_pos[paths, 0] - x_0) / (n - 1)
+    y_step = (rx_pos[paths, 1] - y_0) / (n - 1)
+
+    # The samples next to either end and every 2**max_level-th one, read at full resolution, bound the principal
+    # diffraction parameter from below, and so how steep the knife edge loss can be around it.
+    ones = np.ones_like(n)
+    seg_step = np.array([1, 2 ** max_level, 1])
+    seg_first, seg_count = segment_counts(np.stack([ones, 2 * ones, n - 2], axis=1),
+                                          np.stack([ones, n - 3, n - 2], axis=1), seg_step)
+    path, index = segment_samples(seg_first, seg_count, seg_step)
+    h_i = terrain.get_data_many(index * x_step[path] + x_0[path], index * y_step[path] + y_0[path])
+    diff_params = sample_diff_params(h_i.astype(np.float64), index, d_km[path], d_sample, h_a[path], h_b[path],
+                                     wavelength)
+    diff_param_min = segment_max(diff_params, seg_count, np.full(len(n), -np.inf))
+    slope = (20 / log(10)) / np.sqrt((np.maximum(diff_param_min, 0.1) - 0.1) ** 2 + 1)   # dB per unit.
+    diff_param_error = error_budget / slope
+
+    # Level k may be sampled where d_a * d_b >= c_k, i.e. between a_k and d - a_k from the transmitter,
+    # each level's interval nested in the one below, empty ones placed at the upper end of it.
+    relief = terrain.pyramid_relief(max_level)
+    lo, hi = [ones], [n - 2]
+    for level in range(1, max_level + 1):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            c = 2 * d_km * relief[level] ** 2 / (wavelength * diff_param_error ** 2)
+            a = (d_km - np.sqrt(d_km ** 2 - 4 * c)) / 2
+        level_lo = np.maximum(np.ceil(a / d_sample), lo[-1])
+        level_hi = np.minimum(np.floor((d_km - a) / d_sample), hi[-1])
+        empty = ~(level_lo <= level_hi)     # Also where a is NaN, no part of the path is far enough from its ends.
+        lo.append(np.where(empty, hi[-1] + 1, level_lo).astype(np.intp))
+        hi.append(np.where(empty, hi[-1], level_hi).astype(np.intp))
+
+    # Each level covers what the interval above leaves of its own, one segment on either side.
+    seg_level = np.repeat(np.arange(max_level + 1), 2)[:-1]
+    seg_step = 2 ** seg_level
+    seg_first, seg_count = segment_counts(
+        np.stack([x for pair in zip(lo[:-1], [h + 1 for h in hi[1:]]) for x in pair] + [lo[-1]], axis=1),
+        np.stack([x for pair in zip([l - 1 for l in lo[1:]], hi[:-1]) for x in pair] + [hi[-1]], axis=1), seg_step)
+    # Sampling the coarse parts only pays off once it leaves a third of the samples or less.
+    coarse = 3 * seg_count.sum(axis=1) <= n - 2
+    principal = np.empty(len(n))
+    fine = np.flatnonzero(~coarse)
+    if len(fine) > 0:
+        principal[fine] = principal_diff_params_many(terrain, tx_pos[paths[fine]], rx_pos[paths[fine]],
+                                                     d[paths[fine]], h_a[fine], h_b[fine], f)[0]
+    coarse = np.flatnonzero(coarse)
+    if len(coarse) > 0:
+        seg_count = seg_count[coarse]
+        path, index = segment_samples(seg_first[coarse], seg_count, seg_step)
+        path = coarse[path]
+        pos_x = index * x_step[path] + x_0[path]
+        pos_y = index * y_step[path] + y_0[path]
+        # Samples are laid out segment by segment, so each level's samples are contiguous.
+        level_end = np.cumsum(np.bincount(seg_level, weights=seg_count.sum(axis=0), minlength=max_level + 1))
+        level_end = level_end.astype(np.intp)
+        h_i = np.empty(len(index))
+        start = 0
+        for level in range(max_level + 1):
+            end = level_end[level]
+            if end > start:
+                h_i[start:end] = terrain.get_pyramid_data_many(pos_x[start:end], pos_y[start:end], level)
+            start = end
+        diff_params = sample_diff_params(h_i, index, d_km[path], d_sample, h_a[path], h_b[path], wavelength)
+        principal[coarse] = segment_max(diff_params, seg_count, diff_param_min[coarse])
+    principal_diff_params[paths] = principal
+    return principal_diff_params, n_samples
+
+
+def path_loss_bounds(world, tx_pos, rx_pos, f, tx_ant_h, rx_ant_h):
+    """
+    Calculate lower and upper bounds of the path losses path_loss_many() returns, without terrain profiles.
+    Free space and clutter loss are exact, and the diffraction loss lies between 0 and the knife edge loss
+    of an edge as high as the highest terrain around the path, or is 0 if the terrain horizons show it clear.
+    """
+    terrain = world.terrain
+    rx_pos = np.asarray(rx_pos, dtype=np.float64).reshape(-1, 2)
+    rx_ant_h = np.broadcast_to(np.asarray(rx_ant_h, dtype=np.float64), len(rx_pos)).tolist()
+    d = np.sqrt((tx_pos[0] - rx_pos[:, 0]) ** 2 + (tx_pos[1] - rx_pos[:, 1]) ** 2)  # Path lengths, in meter.
+    h_tx = float(terrain.get_data(tx_pos[0], tx_pos[1]) + tx_ant_h)
+    h_rx = [float(h + ant_h) for h, ant_h in zip(terrain.get_data_many(rx_pos[:, 0], rx_pos[:, 1]), rx_ant_h)]
+    tx_class = int(world.landcover.get_data(tx_pos[0], tx_pos[1]))
+    rx_classes = world.landcover.get_data_many(rx_pos[:, 0], rx_pos[:, 1]).astype(np.intp)
+    wavelength = LIGHT_SPEED / (f * pow(10, 6))
+    d_sample = terrain.resolution / 1000
+    margin = 1e-6   # Covers rounding of sample positions and diffraction parameters.
+    if world.error_budget is not None:
+        # Coarser samples read the maxima of blocks reaching beyond the cells around the path.
+        margin += terrain.resolution * 2 ** world.max_level
+
+    clear = np.zeros(len(rx_pos), dtype=bool)
+    if world.horizon_sectors is not None:
+        # Paths the horizons show clear of the terrain have no diffraction loss.
+        clear = line_of_sight_clear(terrain, np.broadcast_to(np.asarray(tx_pos[:2], dtype=np.float64), rx_pos.shape),
+                                    rx_pos, d, np.full(len(rx_pos), h_tx), np.array(h_rx), f, world.horizon_sectors)
+
+    tx_clutter_loss = clutter_loss_table(f, tx_ant_h)[tx_class]
+    lower, upper = np.empty(len(rx_pos)), np.empty(len(rx_pos))
+    for i in range(len(rx_pos)):
+        free_space_loss = 20 * log10(d[i]) + 20 * log10(f) - 27.55
+        clutter_loss = tx_clutter_loss + clutter_loss_table(f, rx_ant_h[i])[rx_classes[i]]
+        lower[i] = free_space_loss + 0 + clutter_loss
+        n_samples = int(d[i] / terrain.resolution)
+        if n_samples < 3 or clear[i]:
+            upper[i] = lower[i]
+            continue
+        h_max = float(terrain.max_between(min(tx_pos[0], rx_pos[i, 0]) - margin, max(tx_pos[0], rx_pos[i, 0]) + margin,
+                                          min(tx_pos[1], rx_pos[i, 1]) - margin, max(tx_pos[1], rx_pos[i, 1]) + margin))
+        d_km = d[i] / 1000
+        # The edge height above the line of sight, with the earth bulge at its largest in the middle.
+        h = h_max + d_km ** 2 / (8 * R_eff) - min(h_tx, h_rx[i])
+        if h > 0:
+            # Closest to either end, the intermediate samples are one sample away from it.
+            d_ab = min(d_sample * (d_km - d_sample), (n_samples - 2) * d_sample * (d_km - (n_samples - 2) * d_sample))
+            diff_param = h * sqrt(2 * d_km / (wavelength * d_ab))
+        else:
+            diff_param = h * sqrt(8 / (wavelength * d_km))
+        upper[i] = free_space_loss + knife_edge_loss(diff_param + margin) + clutter_loss
+    return lower, upper
+
+
 class PathLoss:
     """
     A class to model path loss for emitted signal during propagation.
@@ -30,13 +408,14 @@ class PathLoss:
                      self._tx.ant_height  # Tx height, in meter.
         self._h_rx = self._physical_world.terrain.get_data(self._rx_pos[0], self._rx_pos[1]) + \
                      self._rx.ant_height  # Rx height, in meter.
-        self._tx_surrounding = LCM2015_NAME[int(self._physical_world.landcover.
-                                                get_data(self._tx_pos[0],
-                                                         self._tx_pos[1]))]  # The transmitter's surrounding category.
-        self._rx_surrounding = LCM2015_NAME[int(self._physical_world.landcover.
-                                                get_data(self._rx_pos[0],
-                                                         self._rx_pos[1]))]  # The receiver's surrounding category.
-                                                                            
+        self._tx_class = int(self._physical_world.landcover.
+                             get_data(self._tx_pos[0],
+                                      self._tx_pos[1]))  # The transmitter's surrounding land category ID.
+        self._rx_class = int(self._physical_world.landcover.
+                             get_data(self._rx_pos[0],
+                                      self._rx_pos[1]))  # The receiver's surrounding land category ID.
+
+        self._profile = None  # Terrain profile along the path, sampled on first use.
         self._f = self._tx.f  # Carrier wave frequency, in MHz.
         self._wavelength = LIGHT_SPEED / (self._f * pow(10, 6))  # Carrier wave wavelength, in meter.
 
@@ -47,11 +426,11 @@ class PathLoss:
                'Transmitter Coordinates: ' + str([round(self._tx_pos[0], 6), round(self._tx_pos[1], 6)]) + '\n' + \
                'Transmitter Altitude: ' + str(round(self._h_tx, 2)) + ' (m)' + '\n' + \
                'Transmitter Antenna Height: ' + str(self._tx.ant_height) + ' (m)' + '\n' + \
-               "Transmitter's Surrounding: " + self._tx_surrounding + '\n' + \
+               "Transmitter's Surrounding: " + LCM2015_NAME[self._tx_class] + '\n' + \
                'Receiver Coordinates: ' + str([round(self._rx_pos[0], 6), round(self._rx_pos[1], 6)]) + '\n' + \
                'Receiver Altitude: ' + str(round(self._h_rx, 2)) + ' (m)' + '\n' + \
                'Receiver Antenna Height: ' + str(self._rx.ant_height) + ' (m)' + '\n' + \
-               "Receiver's Surrounding: " + self._rx_surrounding + '\n' + \
+               "Receiver's Surrounding: " + LCM2015_NAME[self._rx_class] + '\n' + \
                'Carrier Frequency: ' + str(self._f) + ' (MHz)' + '\n' + \
                '-' * 50 + '\n' + \
                'Free Space Loss: ' + str(round(self.free_space_loss(), 6)) + ' (dB)' + '\n' + \
@@ -96,89 +475,23 @@ class PathLoss:
         Calculate clutter loss due to the surrounding where the transmitter or receiver is located.
         """
         f = self._f
-        tx_ant_h = self._tx.ant_height
-        rx_ant_h = self._rx.ant_height
-        tx_surrounding = self._tx_surrounding
-        rx_surrounding = self._rx_surrounding
-
-        tx_clutter_type = None
-        rx_clutter_type = None
-        tx_loss = None
-        rx_loss = None
-        if (tx_surrounding == 'Default') \
-                or (tx_surrounding == 'Arable and Horticulture') or (tx_surrounding == 'Improved Grassland') \
-                or (tx_surrounding == 'Neutral Grassland') or (tx_surrounding == 'Calcareous Grassland') \
-                or (tx_surrounding == 'Acid Grassland') or (tx_surrounding == 'Fen, Marsh and Swamp') \
-                or (tx_surrounding == 'Heather') or (tx_surrounding == 'Heather Grassland') \
-                or (tx_surrounding == 'Bog') or (tx_surrounding == 'Inland Rock') \
-                or (tx_surrounding == 'Saltwater') or (tx_surrounding == 'Freshwater') \
-                or (tx_surrounding == 'Supra-littoral Rock') or (tx_surrounding == 'Supra-littoral Sediment') \
-                or (tx_surrounding == 'Littoral Rock') or (tx_surrounding == 'Littoral Sediment') \
-                or (tx_surrounding == 'Saltmarsh'):
-            tx_clutter_type = 1  # Open area
-        elif (tx_surrounding == 'Broadleaved Woodland') or (tx_surrounding == 'Coniferous Woodland') \
-                or (tx_surrounding == 'Urban') or (tx_surrounding == 'Suburban'):
-            tx_clutter_type = 2  # Dense area
-
-        if (rx_surrounding == 'Default') \
-                or (rx_surrounding == 'Arable and Horticulture') or (rx_surrounding == 'Improved Grassland') \
-                or (rx_surrounding == 'Neutral Grassland') or (rx_surrounding == 'Calcareous Grassland') \
-                or (rx_surrounding == 'Acid Grassland') or (rx_surrounding == 'Fen, Marsh and Swamp') \
-                or (rx_surrounding == 'Heather') or (rx_surrounding == 'Heather Grassland') \
-                or (rx_surrounding == 'Bog') or (rx_surrounding == 'Inland Rock') \
-                or (rx_surrounding == 'Saltwater') or (rx_surrounding == 'Freshwater') \
-                or (rx_surrounding == 'Supra-littoral Rock') or (rx_surrounding == 'Supra-littoral Sediment') \
-                or (rx_surrounding == 'Littoral Rock') or (rx_surrounding == 'Littoral Sediment') \
-                or (rx_surrounding == 'Saltmarsh'):
-            rx_clutter_type = 1  # Open area
-        elif (rx_surrounding == 'Broadleaved Woodland') or (rx_surrounding == 'Coniferous Woodland') \
-                or (rx_surrounding == 'Urban') or (rx_surrounding == 'Suburban'):
-            rx_clutter_type = 2  # Dense area
-
-        tx_clutter_height = LCM2015_CLUTTER_HEIGHT[tx_surrounding]
-        if tx_ant_h >= tx_clutter_height:
-            tx_loss = 0
-        else:
-            if tx_clutter_type == 1:  # Open area
-                k_h2 = 21.8 + 6.2 * log10(f / 1000)
-                tx_loss = -k_h2 * log10(tx_ant_h / tx_clutter_height)
-            elif tx_clutter_type == 2:  # Dense area
-                k_nu = 0.342 * sqrt(f / 1000)
-                dh = tx_clutter_height - tx_ant_h
-                theta = degrees(atan(dh / W_s))
-                diff_param = k_nu * sqrt(dh * theta)
-                tx_loss = self.knife_edge_loss(diff_param) - 6.03
-
-        rx_clutter_height = LCM2015_CLUTTER_HEIGHT[rx_surrounding]
-        if rx_ant_h >= rx_clutter_height:
-            rx_loss = 0
-        else:
-            if rx_clutter_type == 1:  # Open area
-                k_h2 = 21.8 + 6.2 * log10(f / 1000)
-                rx_loss = -k_h2 * log10(rx_ant_h / rx_clutter_height)
-            elif rx_clutter_type == 2:  # Dense area
-                k_nu = 0.342 * sqrt(f / 1000)
-                dh = rx_clutter_height - rx_ant_h
-                theta = degrees(atan(dh / W_s))
-                diff_param = k_nu * sqrt(dh * theta)
-                rx_loss = self.knife_edge_loss(diff_param) - 6.03
-
+        tx_loss = clutter_loss_table(f, self._tx.ant_height)[self._tx_class]
+        rx_loss = clutter_loss_table(f, self._rx.ant_height)[self._rx_class]
         return tx_loss + rx_loss  # dB
 
     def terrain_profile(self):
         """
         Get a series of samples along the propagation path, including the tx and rx.
         """
-        terrain = self._physical_world.terrain
-        d = self._d
-        d_sample = self._physical_world.terrain.resolution
-        n_samples = int(d / d_sample)
-        pos_x = np.linspace(self._tx_pos[0], self._rx_pos[0], n_samples)
-        pos_y = np.linspace(self._tx_pos[1], self._rx_pos[1], n_samples)
-        profile = []
-        for i in range(n_samples):
-            profile.append(terrain.get_data(pos_x[i], pos_y[i]))
-        return profile
+        if self._profile is None:
+            terrain = self._physical_world.terrain
+            d = self._d
+            d_sample = self._physical_world.terrain.resolution
+            n_samples = int(d / d_sample)
+            pos_x = np.linspace(self._tx_pos[0], self._rx_pos[0], n_samples)
+            pos_y = np.linspace(self._tx_pos[1], self._rx_pos[1], n_samples)
+            self._profile = terrain.get_data_many(pos_x, pos_y)
+        return self._profile
 
     def intermediate_profile(self):
         """
@@ -196,30 +509,21 @@ class PathLoss:
         """
         d = self._d / 1000
         d_sample = self._physical_world.terrain.resolution / 1000
-        h_a = self._h_tx
-        h_b = self._h_rx
+        h_a = float(self._h_tx)
+        h_b = float(self._h_rx)
         wavelength = self._wavelength
-        inter_profile = self.intermediate_profile()
-        n_samples = len(inter_profile)
-        diff_params = []
-        for i in range(n_samples):
-            h_i = inter_profile[i]
-            d_ai = (i + 1) * d_sample
-            d_ib = d - d_ai
-            h = h_i + (d_ai * d_ib) / (2 * R_eff) - (h_a * d_ib + h_b * d_ai) / d
-            v_i = h * sqrt(2 * d / (wavelength * d_ai * d_ib))
-            diff_params.append(v_i)
-        principal_diff_param = max(diff_params)
-        return principal_diff_param
+        h_i = self.intermediate_profile().astype(np.float64)
+        d_ai = np.arange(1, len(h_i) + 1) * d_sample
+        d_ib = d - d_ai
+        h = h_i + (d_ai * d_ib) / (2 * R_eff) - (h_a * d_ib + h_b * d_ai) / d
+        diff_params = h * np.sqrt(2 * d / (wavelength * d_ai * d_ib))
+        return float(diff_params.max())
 
     def knife_edge_loss(self, diff_param):
         """
         Calculate the knife edge diffraction loss given diffraction parameter.
         """
-        if diff_param > -0.78:
-            return 6.9 + 20 * log10(sqrt((diff_param - 0.1) ** 2 + 1) + diff_param - 0.1)  # dB
-        else:
-            return 0
+        return knife_edge_loss(diff_param)
 
 
 '''
@@ -1,6 +1,7 @@
 from models.packet import *
 from models.path_loss import *
 import math
+import numpy as np
 
 PS = 8                              # Preamble symbol(s).
 CRC = 1                             # Presence of cyclic redundancy check, default 1, meaning present.
@@ -9,6 +10,7 @@ DE = 0                              # Presence of low data rate optimisation, de
 ANT_GAIN = 2.15                     # Antenna gain, in dBi.
 ANT_HEIGHT = 0.17                   # Antenna height, in meter.
 NF = 6                              # Noise figure, in dB.
+T_SLOT = 0.1                        # Default length of a time slot, in sec.
 SENSITIVITY = {125: {6: -122,
                      7: -124.5,
                      8: -127,
@@ -33,6 +35,112 @@ SENSITIVITY = {125: {6: -122,
 # Sensitivity for each bandwidth & spreading factor, in dBm.
 
 
+def de_many(bw, sf):
+    """
+    Get the presence of low data rate optimisation for arrays of bandwidths and spreading factors,
+    the same as Radio.config_de() for each.
+    """
+    bw, sf = np.asarray(bw), np.asarray(sf)
+    return ((bw <= 125) & ((sf == 11) | (sf == 12))).astype(int)
+
+
+def airtime_many(bw, sf, cr, de=None, pl=10, ps=PS, crc=CRC, hd=HD):
+    """
+    Calculate the airtime of a packet for arrays of bandwidths, spreading factors and coding rates broadcast
+    together, the same as Radio.airtime() for each. Low data rate optimisation is set as by config_de() if not given.
+    """
+    bw, sf, cr = np.broadcast_arrays(np.asarray(bw, dtype=float), np.asarray(sf), np.asarray(cr, dtype=float))
+    if de is None:
+        de = de_many(bw, sf)
+    t_symbol = np.power(2.0, sf) / (bw * 1000)
+    t_preamble = (ps + 4.25) * t_symbol
+    term = np.trunc((8 * pl - 4 * sf + 28 + 16 * crc - 20 * hd) / (4 * (sf - 2 * de))) * (1 / cr * 4)
+    term = np.maximum(term, 0)
+    n_payload = 8 + term
+    t_payload = n_payload * t_symbol
+    return t_preamble + t_payload
+
+
+def interval_many(airtime, dc, t_slot):
+    """
+    Calculate the time slot interval between transmissions for arrays of airtimes and duty cycles (in fraction),
+    the same as Radio.config_silent_time() for each.
+    """
+    silent_time = (airtime / dc) - airtime
+    return np.ceil(silent_time / t_slot).astype(int)
+
+
+def sensitivity_many(bw, sf):
+    """
+    Look up the receiving sensitivity for arrays of bandwidths and spreading factors, in dBm.
+    """
+    bw, sf = np.broadcast_arrays(np.asarray(bw), np.asarray(sf))
+    return np.array([SENSITIVITY[b][s] for b, s in zip(bw.ravel().tolist(), sf.ravel().tolist())],
+                    dtype=float).reshape(bw.shape)
+
+
+def rx_power_many(packet, radios, world, max_dist=None, early_out=False):
+    """
+    Calculate the received power of an incoming packet at many radios at once, the same as Radio.rx_power() for each.
+    With early out, radios whose path loss bounds already decide whether their sensitivity is reached skip the
+    full path loss calculation and get the deciding bound of their received power instead.
+    If the world has a shadowing layer, every link's shadow loss comes on top of its path loss.
+    """
+    rx_powers = [None] * len(radios)
+    shadow_losses = [0] * len(radios)
+    if world.shadowing is not None:
+        shadow_losses = world.shadowing.loss_many(packet.tx, radios, world).tolist()
+    if world.coverage_cache is not None:
+        for i, radio in enumerate(radios):
+            rx_powers[i] = world.coverage_cache.rx_power(packet.tx, radio)
+            if rx_powers[i] is not None:
+                rx_powers[i] -= shadow_losses[i]
+    link_cache = world.link_cache
+    path_losses = [None] * len(radios)
+    keys = [None] * len(radios)
+    if max_dist is None:
+        for i, radio in enumerate(radios):
+            if rx_powers[i] is None:
+                path_losses[i] = radio.reused_path_loss(packet.tx)
+    if link_cache is not None:
+        for i, radio in enumerate(radios):
+            if rx_powers[i] is None and path_losses[i] is None:
+                keys[i] = link_cache.key(packet.tx.pos, radio.pos, packet.tx.f, packet.tx.ant_height,
+                                         radio.ant_height, max_dist)
+                path_losses[i] = link_cache.get(keys[i])
+                if path_losses[i] is not None and max_dist is None:
+                    radio.remember_link(packet.tx, path_losses[i])
+    missing = [i for i in range(len(radios)) if rx_powers[i] is None and path_losses[i] is None]
+    if early_out and max_dist is None and len(missing) > 0:
+        lower, upper = path_loss_bounds(world, packet.tx.pos, [radios[i].pos for i in missing], packet.tx.f,
+                                        packet.tx.ant_height, [radios[i].ant_height for i in missing])
+        undecided = []
+        for i, path_loss_min, path_loss_max in zip(missing, lower, upper):
+            rx_power_max = packet.tx.tx_pw + packet.tx.ant_gain - path_loss_min + radios[i].ant_gain - shadow_losses[i]
+            rx_power_min = packet.tx.tx_pw + packet.tx.ant_gain - path_loss_max + radios[i].ant_gain - shadow_losses[i]
+            if rx_power_max < radios[i].sensitivity:
+                rx_powers[i] = rx_power_max
+                radios[i].skip_evaluation()
+            elif rx_power_min >= radios[i].sensitivity:
+                rx_powers[i] = rx_power_min
+                radios[i].skip_evaluation()
+            else:
+                undecided.append(i)
+        missing = undecided
+    if len(missing) > 0:
+        batch = batch_path_loss(packet.tx, [radios[i] for i in missing], world, max_dist)
+        for i, path_loss in zip(missing, batch):
+            path_losses[i] = path_loss
+            if link_cache is not None:
+                link_cache.put(keys[i], path_loss)
+            if max_dist is None:
+                radios[i].remember_link(packet.tx, path_loss)
+    for i in range(len(radios)):
+        if rx_powers[i] is None:
+            rx_powers[i] = packet.tx.tx_pw + packet.tx.ant_gain - path_losses[i] + radios[i].ant_gain - shadow_losses[i]
+    return rx_powers
+
+
 class Radio:
     """
     A radio class.
@@ -44,7 +152,7 @@ class Radio:
     ant_height = ANT_HEIGHT     # The antenna height, in meter.
     pl = 10                      # The length of payload, in byte.
 
-    def __init__(self, rover, f, bw, sf, cr, dc, tx_pw, t_slot=0.1):
+    def __init__(self, rover, f, bw, sf, cr, dc, tx_pw, t_slot=T_SLOT):
         self._rover = rover                     # A rover object which the radio is attached to.
         self._radio_id = self._rover.rov_id     # Unique id for each radio, same as the rover's id.
         self._total_radios = 1                  # Number of all the radios in operation, including self.
@@ -67,10 +175,21 @@ class Radio:
         self._num_transmitted = 0       # The number of transmitted packets.
         self._num_received = 0          # The number of received packets.
         self._num_discarded = 0         # The number of discarded packets.
+        self._num_skipped = 0           # The number of packets decided without a full path loss calculation.
+        self._link_reuse_dist = None    # The distance either end of a link may move before its path loss is
+        # calculated again, in meter, None meaning always calculated.
+        self._link_reuse_exact = False  # Whether reusable path losses are calculated anyway, recording their error.
+        self._links = {}                # The last path loss from each transmitter and the positions it was for.
+        self._num_reused = 0            # The number of path losses reused, or reusable if exact.
+        self._max_reuse_error = 0       # The largest error of a reusable path loss found when exact, in dB.
         self._receiver_buffer = None    # The buffer to store the most recent packet received.
         self._neighbour_register = [None, None]
         # The memory to store the most packets received from neighbours.
 
+    @property
+    def rover(self):
+        return self._rover
+
     @property
     def radio_id(self):
         return self._radio_id
@@ -131,6 +250,22 @@ class Radio:
     def num_disc(self):
         return self._num_discarded
 
+    @property
+    def num_skipped(self):
+        return self._num_skipped
+
+    @property
+    def link_reuse_dist(self):
+        return self._link_reuse_dist
+
+    @property
+    def num_reused(self):
+        return self._num_reused
+
+    @property
+    def max_reuse_error(self):
+        return self._max_reuse_error
+
     @property
     def receiver_buffer(self):
         return self._receiver_buffer
@@ -205,9 +340,25 @@ class Radio:
 
     def set_next_tx(self, world):
         """
-        Set the next transmission time for rover
+        Set the next transmission time for rover, and schedule it in the world.
         """
         self._next_tx = world.tn + self._interval
+        world.schedule_tx(self)
+
+    def next_tx_after(self, start, end):
+        """
+        Get the next transmission time after the slots from time step start until end pass without transmitting.
+        """
+        if start <= self._next_tx < end and self._interval > 0:
+            return self._next_tx + math.ceil((end - self._next_tx) / self._interval) * self._interval
+        return self._next_tx
+
+    def skip_slots(self, world, end):
+        """
+        Pass the slots from now until time step end without transmitting, and schedule the next transmission.
+        """
+        self._next_tx = self.next_tx_after(world.tn, end)
+        world.schedule_tx(self)
 
     def transmit(self, world):
         """
@@ -220,14 +371,21 @@ class Radio:
         world.add_packet(packet)
         self._rover._tx_status = 1          # Transmission always successful
 
-    def receive(self, world):
+    def receive(self, world, rx_power=None, packet=None, interference=0):
         """
-        Receive a packet which can be successfully demodulated from the channel.
+        Receive a packet which can be successfully demodulated from the channel, by default the last one sent.
+        Its received power can be given if already calculated, e.g. by rx_power_many(). Given the interference of
+        the packets overlapping it on air, in mW, its signal to interference and noise ratio must also reach the
+        world's capture threshold.
         """
         threshold = self._sensitivity
-        if len(world.channel) > 0:
+        if packet is None and len(world.channel) > 0:
             packet = world.channel[-1]
-            if self.rx_power(packet, world) >= threshold:
+        if packet is not None:
+            if rx_power is None:
+                rx_power = rx_power_many(packet, [self], world, early_out=world.early_out)[0]
+            if rx_power >= threshold and (interference == 0 or self.sinr(rx_power, interference) >=
+                                          world.capture_threshold):
                 self._num_received += 1
                 self._receiver_buffer = packet
                 self.update_neighbour_register()
@@ -236,14 +394,101 @@ class Radio:
         else:
             pass
 
+    def noise_power(self):
+        """
+        Calculate the thermal noise power within the bandwidth, with the receiver's noise figure, in dBm.
+        """
+        return -174 + 10 * math.log10(self._bw * 1000) + NF
+
+    def sinr(self, rx_power, interference):
+        """
+        Calculate the signal to interference and noise ratio of a received power, in dBm, given the interference,
+        in mW, in dB.
+        """
+        return rx_power - 10 * math.log10(interference + math.pow(10, self.noise_power() / 10))
+
     def rx_power(self, packet, world, max_dist=None):
         """
         Calculate the received power of an incoming packet from the channel.
         A maximum distance can be set beyond which the path loss is assumed -inf. This is
         optionally and should be used carefully.
         """
-        path_loss = PathLoss(packet.tx, self, world, max_dist).total_loss()
-        return packet.tx.tx_pw + packet.tx.ant_gain - path_loss + self.ant_gain
+        shadow_loss = 0
+        if world.shadowing is not None:
+            shadow_loss = float(world.shadowing.loss_many(packet.tx, [self], world)[0])
+        if world.coverage_cache is not None:
+            rx_power = world.coverage_cache.rx_power(packet.tx, self)
+            if rx_power is not None:
+                return rx_power - shadow_loss
+        link_cache = world.link_cache
+        if link_cache is None:
+            path_loss = self.path_loss(packet.tx, world, max_dist)
+        else:
+            key = link_cache.key(packet.tx.pos, self.pos, packet.tx.f, packet.tx.ant_height, self.ant_height,
+                                 max_dist)
+            path_loss = link_cache.get(key)
+            if path_loss is None:
+                path_loss = self.path_loss(packet.tx, world, max_dist)
+                link_cache.put(key, path_loss)
+        return packet.tx.tx_pw + packet.tx.ant_gain - path_loss + self.ant_gain - shadow_loss
+
+    def path_loss(self, radio_tx, world, max_dist=None):
+        """
+        Calculate the path loss from a transmitter, sampling long paths from coarser terrain if the world allows,
+        and skipping the terrain of paths its horizons show clear.
+        """
+        if world.error_budget is None and world.horizon_sectors is None:
+            return PathLoss(radio_tx, self, world, max_dist).total_loss()
+        return batch_path_loss(radio_tx, [self], world, max_dist)[0]
+
+    def config_link_reuse(self, distance, exact=False):
+        """
+        Configure the reuse of a link's last path loss until either end has moved more than a distance.
+        For validation, exact still calculates every path loss and records the largest error reuse would have made.
+        """
+        self._link_reuse_dist = distance
+        self._link_reuse_exact = exact
+        self._links = {}
+
+    def is_link_reusable(self, radio_tx):
+        """
+        See if neither end of the link from a transmitter has moved too far since its last path loss.
+        """
+        link = self._links.get(radio_tx.radio_id)
+        if link is None:
+            return False
+        tx_pos, rx_pos, _ = link
+        return math.sqrt((radio_tx.pos[0] - tx_pos[0]) ** 2 + (radio_tx.pos[1] - tx_pos[1]) ** 2) <= \
+            self._link_reuse_dist and \
+            math.sqrt((self.pos[0] - rx_pos[0]) ** 2 + (self.pos[1] - rx_pos[1]) ** 2) <= self._link_reuse_dist
+
+    def reused_path_loss(self, radio_tx):
+        """
+        Get the last path loss of the link from a transmitter if it can be reused, else None.
+        """
+        if self._link_reuse_dist is None or self._link_reuse_exact or not self.is_link_reusable(radio_tx):
+            return None
+        self._num_reused += 1
+        return self._links[radio_tx.radio_id][2]
+
+    def remember_link(self, radio_tx, path_loss):
+        """
+        Remember the path loss of the link from a transmitter, with the positions it was calculated for.
+        """
+        if self._link_reuse_dist is None:
+            return
+        if self._link_reuse_exact and self.is_link_reusable(radio_tx):
+            # Keep the path loss reuse would have kept, to measure its error.
+            self._num_reused += 1
+            self._max_reuse_error = max(self._max_reuse_error, abs(path_loss - self._links[radio_tx.radio_id][2]))
+            return
+        self._links[radio_tx.radio_id] = ((radio_tx.pos[0], radio_tx.pos[1]), (self.pos[0], self.pos[1]), path_loss)
+
+    def skip_evaluation(self):
+        """
+        Count a packet decided without a full path loss calculation.
+        """
+        self._num_skipped += 1
 
     def update_neighbour_register(self):
         """
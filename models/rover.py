@@ -2,10 +2,13 @@ from random import *
 import numpy as np
 
 from models.radio import *
+from models.swarm_state import *
 from controllers.line_sweep.goal_driven import move2goal 
-from controllers.line_sweep.passive import passive_cooperation, simple_passive_cooperation
+from controllers.line_sweep.passive import passive_cooperation, simple_passive_cooperation, \
+    passive_cooperation_many, simple_passive_cooperation_many
 from controllers.advanced_line_sweep.goal_driven import advanced_move2goal 
-from controllers.advanced_line_sweep.passive import advanced_passive_cooperation, advanced_simple_passive_cooperation
+from controllers.advanced_line_sweep.passive import advanced_passive_cooperation, advanced_simple_passive_cooperation, \
+    advanced_passive_cooperation_many, advanced_simple_passive_cooperation_many
 from controllers.adaptive_sampling.independent_AS import independent_sampler
 from controllers.adaptive_sampling.co_operative_AS import co_op_sampler
 
@@ -13,17 +16,33 @@ STARTING_SPEED = 0.2            # m/s
 MAXIMUM_SPEED = 0.5             # m/s, which CAN be exceeded due to the effect of slope.
 MINIMUM_SPEED = 0.05               # m/s, which depicts the worst scenario and CAN NOT be decreased any more.
 
+MOTION_MANY_MIN_ROVERS = 12     # Rovers moving at once from which their motion is calculated in one pass over arrays.
+SWARM_CONTROL_MIN_ROVERS = 12   # Rovers under a policy from which they are controlled by its swarm-level controller.
+
 MAXIMUM_SAMPLE_DIST = 1000      # m, which comes from the measurements made/received, CAN NOT be exceeded
 MINIMUM_SAMPLE_DIST = 100       # m, which comes from the measurements made/received, CAN NOT be exceeded
 
+# Controllers applied to all the rovers of a swarm sharing a policy at once, by mission and control policy.
+SWARM_CONTROLLERS = {
+    ('LS', 'Passive-cooperative'): passive_cooperation_many,
+    ('LS', 'Simple Passive-cooperative'): simple_passive_cooperation_many,
+    ('ALS', 'Passive-cooperative'): advanced_passive_cooperation_many,
+    ('ALS', 'Simple Passive-cooperative'): advanced_simple_passive_cooperation_many
+}
+
 
 class Rover:
     """
     A rover class.
+    It has a row in a swarm state shared with the other rovers, which its pose and control input are copied into
+    to move them all at once.
     decay_type = 'quad'
     zero_cross = 1200 #Decay = 0 at 2 minutes of silence from that rover.
     """
-    def __init__(self, rov_id, easting, northing, rov_waypoints, q_noise=None, r_noise=None, num_rovers=10):
+    def __init__(self, rov_id, easting, northing, rov_waypoints, q_noise=None, r_noise=None, num_rovers=10,
+                 swarm=None):
+        self._swarm = SwarmState(1) if swarm is None else swarm     # The swarm state the rover has a row in.
+        self._swarm_index = self._swarm.add()                       # The rover's row in the swarm state.
         self._rov_id = rov_id                 # Unique id for each rover.
         self._pose = [easting, northing]      # Pose: (x (m), y (m)).
         self._angle = 0
@@ -72,6 +91,14 @@ class Rover:
         self._landcover_termination = False                                     # Flag to terminate mission if rover on invalid land(e.g. water)
         self.pose_logger = None                                                 # The logger to record pose, a motion logger object.
 
+    @property
+    def swarm(self):
+        return self._swarm
+
+    @property
+    def swarm_index(self):
+        return self._swarm_index
+
     @property
     def rov_id(self):
         return self._rov_id
@@ -331,8 +358,7 @@ class Rover:
         Flag to terminate program if rover entered water.
         """
         p = self._pose
-        surrounding = LCM2015_NAME[int(world.landcover.get_data(p[0], p[1]))]
-        if(surrounding == 'Saltwater') or (surrounding == 'Freshwater'):
+        if not LCM2015_PASSABLE_TABLE[int(world.landcover.get_data(p[0], p[1]))]:
             self._landcover_termination = True
 
     def motion(self, world, dt):
@@ -342,15 +368,10 @@ class Rover:
         """
         p = self._pose
         u = self._control
-        slope_y = world.dynamics_engine.northing_slope(p[0], p[1])
-        a_y = world.dynamics_engine.generate_acceleration(slope_y)
-        a_yf = world.dynamics_engine.generate_friction(slope_y)
+        a_x, a_xf, a_y, a_yf = world.dynamics_engine.accelerations(p[0], p[1])
         v_y = u[1] + a_y * dt + a_yf * dt
 
         if(world.mission != 'LS'):
-            slope_x = world.dynamics_engine.easting_slope(p[0], p[1])
-            a_x = world.dynamics_engine.generate_acceleration(slope_x)
-            a_xf = world.dynamics_engine.generate_friction(slope_x)
             v_x = u[0] + a_x * dt + a_xf * dt
         else:
             v_x = 0
@@ -408,6 +429,28 @@ class Rover:
                 self.motion(world, dt)                
  
 
+    def quiet_steps(self, world):
+        """
+        Count the time steps from now the rover is certain to stand still doing nothing but sampling, until its
+        sample completes. None if it is terminated, 0 if it may move or act sooner.
+        """
+        if self.is_mission_terminated():
+            return None
+        if world.mission != 'AS' or not self._is_sampling or self._speed_controller is None or \
+                self._control_policy not in ('Independent Adaptive Sampling', 'Co-op Adaptive Sampling'):
+            return 0
+        if self.is_final_condition_achieved():
+            return 0
+        if self._pose[1] > self.goal[1] - self._goal_offset and self._goal_index < len(self._waypoints) - 1:
+            return 0        # The next waypoint is to be taken.
+        return max(self._req_sampling_steps - self._sampling_steps_passed, 0)
+
+    def skip_sampling(self, steps):
+        """
+        Count a number of time steps spent sampling at once.
+        """
+        self._sampling_steps_passed += steps
+
     def halt(self):
         """
         Discard any ongoing action and halt immediately.
@@ -563,3 +606,114 @@ class Rover:
         Get swarm size from radio.
         """
         return self._radio.total_radios
+
+
+def motion_many(rovers, world, dt):
+    """
+    Move many rovers of a swarm state through the given time interval in one pass over its arrays, after dynamics
+    of environment have been added. Speeds are floored and the first map boundary crossed clamped, then noise is
+    drawn for the noisy rovers, state noise before measurement noise, in the same order as moving them one at a time.
+    """
+    if len(rovers) == 0:
+        return
+    swarm = rovers[0].swarm
+    index = swarm.gather(rovers)
+    p, u = swarm.pose[index], swarm.control[index]
+    a_x, a_xf, a_y, a_yf = world.dynamics_engine.accelerations_many(p[:, 0], p[:, 1])
+    v_y = u[:, 1] + a_y * dt + a_yf * dt
+
+    if(world.mission != 'LS'):
+        v_x = u[:, 0] + a_x * dt + a_xf * dt
+    else:
+        v_x = np.zeros(len(rovers))
+
+    # Assume in the worst scenario rover can still maintain a minimum speed.
+    v_y = np.where(v_y < MINIMUM_SPEED, MINIMUM_SPEED, v_y)
+    h_x, h_y = p[:, 0] + dt * v_x, p[:, 1] + dt * v_y     # State transition.
+
+    # Only the first boundary crossed, in this order, is clamped.
+    x_min, y_min = world.terrain.x_llcorner, world.terrain.y_llcorner
+    x_max, y_max = x_min + world.terrain.x_range, y_min + world.terrain.y_range
+    behind = h_y < y_min
+    beyond = ~behind & (h_y >= y_max)
+    right = ~(behind | beyond) & (h_x < x_min)
+    left = ~(behind | beyond | right) & (h_x >= x_max)
+    crossed = behind | beyond | right | left
+    if crossed.any():
+        h_y = np.where(behind, y_min, np.where(beyond, y_max - 1e-6, h_y))
+        h_x = np.where(right, x_min, np.where(left, x_max - 1e-6, h_x))
+        for i in np.flatnonzero(crossed).tolist():
+            if behind[i]:
+                print('Cannot back off behind the baseline.')
+            elif beyond[i]:
+                print('Cannot move beyond the upper boundary.')
+            elif right[i]:
+                print('Cannot go off right side of map.')
+            else:
+                print('Cannot go off left side of map')
+
+    x, y = h_x.tolist(), h_y.tolist()
+    v_x = v_x.tolist() if world.mission != 'LS' else [0] * len(rovers)
+    v_y = v_y.tolist()
+    for i, rover in enumerate(rovers):
+        pose = rover._pose
+        if rover._q_noise is None:
+            pose[0] = x[i]
+            pose[1] = y[i]  # Noiseless motion.
+        else:
+            # Noisy motion is kept on the map, or else noiseless.
+            noise = rover.generate_noise(rover._q_noise)
+            new_pose = [x[i] + noise[0], y[i] + noise[1]]
+            pose[1] = new_pose[1] if y_min < new_pose[1] < y_max else y[i]
+            pose[0] = new_pose[0] if x_min < new_pose[0] < x_max else x[i]
+        rover.update_speeds(v_x[i], v_y[i])
+        rover.measure_pos()
+
+    positions = np.array([rover._pose[:2] for rover in rovers])
+    passable = LCM2015_PASSABLE_TABLE[world.landcover.get_data_many(positions[:, 0],
+                                                                    positions[:, 1]).astype(np.intp)]
+    if not passable.all():
+        for i in np.flatnonzero(~passable).tolist():
+            rovers[i]._landcover_termination = True
+
+
+def apply_control_many(rovers, world):
+    """
+    Apply control effect to many rovers, the same as applying it to them one at a time. The rovers still going
+    under a policy with a swarm-level controller are controlled together, after the others, if there are at least
+    SWARM_CONTROL_MIN_ROVERS of them.
+    """
+    if len(rovers) < SWARM_CONTROL_MIN_ROVERS:
+        for rover in rovers:
+            rover.apply_control(world)
+        return
+    mission = world.mission
+    groups = {}
+    for rover in rovers:
+        key = (mission, rover._control_policy)
+        if key in SWARM_CONTROLLERS and rover._speed_controller is not None \
+                and not rover.is_mission_terminated() and not rover.is_final_condition_achieved():
+            groups.setdefault(key, []).append(rover)
+        else:
+            rover.apply_control(world)
+    for key, group in groups.items():
+        if len(group) < SWARM_CONTROL_MIN_ROVERS:
+            for rover in group:
+                rover.apply_control(world)
+        else:
+            SWARM_CONTROLLERS[key](group, world, MAXIMUM_SPEED, MINIMUM_SPEED)
+
+
+def step_motion_many(rovers, world, dt):
+    """
+    Simulate the motion of many rovers of a swarm state through the given time interval, moving those not
+    terminated, nor sampling in adaptive sampling. As the arrays of motion_many() cost a fixed overhead per call,
+    fewer rovers than MOTION_MANY_MIN_ROVERS are moved one at a time instead, with the same result.
+    """
+    sampling_stops = world.mission == 'AS'
+    moving = [rover for rover in rovers if not rover._termination_flag and not (sampling_stops and rover._is_sampling)]
+    if len(moving) < MOTION_MANY_MIN_ROVERS:
+        for rover in moving:
+            rover.motion(world, dt)
+    else:
+        motion_many(moving, world, dt)
@@ -161,8 +161,8 @@ if __name__ == '__main__':
     from utils.load_map import *
     from utils.render import *
     area = 'SU20NE'
-    map_terrain = read_asc(locate_map(area + '_elevation' + '.asc'))
-    map_landcover = read_asc(locate_map(area + '_landcover' + '.asc'))
+    map_terrain = read_asc(locate_map(area + '_elevation' + '.asc'), dtype=ELEVATION_DTYPE)
+    map_landcover = read_asc(locate_map(area + '_landcover' + '.asc'), dtype=LANDCOVER_DTYPE)
     x_min, x_max = map_terrain.x_llcorner, map_terrain.x_llcorner + map_terrain.x_range
     y_min, y_max = map_terrain.y_llcorner, map_terrain.y_llcorner + map_terrain.y_range
 
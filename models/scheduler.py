@@ -0,0 +1,44 @@
+import heapq
+from itertools import count
+
+
+class Scheduler:
+    """
+    A priority queue of events, each due at a time step, so that only the events due are visited each step.
+    Events due at the same step come out by their order key, e.g. a radio ID, then by when they were scheduled.
+    """
+    def __init__(self):
+        self._events = []           # Heap of the events scheduled, (time step, order key, sequence, item).
+        self._sequence = count()    # Scheduling sequence number, breaking ties without comparing items.
+
+    def __len__(self):
+        return len(self._events)
+
+    @property
+    def next_tn(self):
+        """
+        The time step of the earliest event scheduled, None if there is none.
+        """
+        return self._events[0][0] if self._events else None
+
+    def schedule(self, tn, order, item):
+        """
+        Schedule an item at a time step.
+        """
+        heapq.heappush(self._events, (tn, order, next(self._sequence), item))
+
+    def pop_due(self, tn):
+        """
+        Remove the items scheduled at or before a time step and get them with their time steps, in due order.
+        """
+        due = []
+        while self._events and self._events[0][0] <= tn:
+            event = heapq.heappop(self._events)
+            due.append((event[0], event[3]))
+        return due
+
+    def clear(self):
+        """
+        Remove every event.
+        """
+        self._events.clear()
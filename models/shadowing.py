@@ -0,0 +1,140 @@
+from math import *
+import numpy as np
+
+from models.mosaic_map import TiledRaster
+
+
+def build_shadow_field(shape, resolution, corr_dist, seed):
+    """
+    Generate a Gaussian random field of unit variance over a grid, whose correlation decays exponentially with
+    distance as in Gudmundson's model, by filtering white noise with the square root of its spectrum.
+    The grid is padded by a few correlation distances, so that opposite edges of the area are not correlated.
+    """
+    pad = int(ceil(3 * corr_dist / resolution))
+    rows, cols = shape[0] + pad, shape[1] + pad
+    dist_y = np.minimum(np.arange(rows), rows - np.arange(rows)) * resolution
+    dist_x = np.minimum(np.arange(cols), cols - np.arange(cols)) * resolution
+    correlation = np.exp(-np.hypot(dist_y[:, None], dist_x[None, :]) / corr_dist)
+    # The spectrum of a valid correlation is real and non-negative, but for rounding.
+    filter_gain = np.sqrt(np.maximum(np.fft.rfft2(correlation).real, 0))
+    noise = np.random.default_rng(seed).standard_normal((rows, cols))
+    field = np.fft.irfft2(np.fft.rfft2(noise) * filter_gain, s=(rows, cols))
+    return field[:shape[0], :shape[1]].astype(np.float32)
+
+
+class Shadowing:
+    """
+    A shadow fading layer adding a log-normal loss to each link, in dB: a spatially correlated part read from a
+    random field over the area at both ends of the link, and a time-correlated AR(1) part kept for each link.
+    Links are reciprocal, so a link and its reverse fade alike. The spatial part has the layer's standard deviation
+    whatever the length of the link, the ends being as correlated as the field.
+    On a mosaic, each tile has a field of its own, seeded by the tile's position, so that no tile is loaded
+    unless read; fields are then not correlated across the edges of tiles.
+    """
+    def __init__(self, terrain, sigma=4, corr_dist=50, sigma_t=0, corr_time=10, seed=None):
+        self._terrain = terrain             # The map whose cells the field covers.
+        self._sigma = sigma                 # Standard deviation of the spatial part, in dB.
+        self._corr_dist = corr_dist         # Distance the spatial part decorrelates over by 1/e, in meter.
+        self._sigma_t = sigma_t             # Standard deviation of the temporal part, in dB.
+        self._corr_time = corr_time         # Time the temporal part decorrelates over by 1/e, in second.
+        self._seed = seed                   # Seed of the field and the temporal part, None for a random one.
+        self._rng = np.random.default_rng(None if seed is None else seed + 1)
+        self._states = np.zeros((0, 0))     # Temporal part of each link, by the radio IDs of its ends.
+        self._last = np.zeros((0, 0))       # Time of each link's last temporal update, in second, NaN if never.
+        shape = (terrain.n_rows, terrain.n_cols)
+        if sigma == 0:
+            self._field = None
+        elif terrain.is_tiled():
+            tile_seed = seed if seed is not None else int(np.random.default_rng().integers(2 ** 32))
+            build = lambda tile: build_shadow_field((tile.n_rows, tile.n_cols), tile.resolution, corr_dist,
+                                                    [tile_seed, int(tile.x_llcorner), int(tile.y_llcorner)])
+            if seed is None:
+                # Unseeded fields are drawn again every run, so they are not cached with the tiles.
+                self._field = TiledRaster(terrain, 'shadow' + str(corr_dist) + '_unseeded' + str(tile_seed), build,
+                                          cache=False)
+            else:
+                self._field = terrain.derived('shadow' + str(corr_dist) + '_' + str(seed), None, tile_build=build)
+        elif seed is None:
+            self._field = build_shadow_field(shape, terrain.resolution, corr_dist, None)
+        else:
+            # Seeded fields are the same for every run, so they are cached with the map.
+            self._field = terrain.derived('shadow' + str(corr_dist) + '_' + str(seed),
+                                          lambda data: build_shadow_field(shape, terrain.resolution, corr_dist, seed))
+
+    @property
+    def sigma(self):
+        return self._sigma
+
+    @property
+    def corr_dist(self):
+        return self._corr_dist
+
+    @property
+    def sigma_t(self):
+        return self._sigma_t
+
+    @property
+    def corr_time(self):
+        return self._corr_time
+
+    @property
+    def seed(self):
+        return self._seed
+
+    @property
+    def field(self):
+        """
+        The spatial field of unit variance by cell, None if the spatial part is disabled.
+        """
+        return self._field
+
+    def spatial_many(self, tx_pos, rx_pos):
+        """
+        Get the spatial part of the shadow loss of links between a transmitter position and an array of receiver
+        positions. The field at both ends is summed and divided by the standard deviation of the sum, sqrt(2 + 2 rho)
+        for the correlation rho of the field between their cells, so that it has the layer's standard deviation
+        on short links as on long ones. On a mosaic, ends in different tiles are not correlated, so links across
+        the edge of a tile have a slightly lower one.
+        """
+        rx_pos = np.asarray(rx_pos, dtype=np.float64).reshape(-1, 2)
+        if self._field is None:
+            return np.zeros(len(rx_pos))
+        rows, cols = self._terrain.coordinate2index_many(np.append(rx_pos[:, 0], tx_pos[0]),
+                                                          np.append(rx_pos[:, 1], tx_pos[1]))
+        values = self._field[rows, cols].astype(np.float64)
+        # Negative indexes wrap around as they are read.
+        rows, cols = rows % self._terrain.n_rows, cols % self._terrain.n_cols
+        cell_dist = np.hypot(rows[:-1] - rows[-1], cols[:-1] - cols[-1]) * self._terrain.resolution
+        rho = np.exp(-cell_dist / self._corr_dist)
+        return (values[:-1] + values[-1]) * (self._sigma / np.sqrt(2 + 2 * rho))
+
+    def temporal_many(self, tx_id, rx_ids, time):
+        """
+        Advance the temporal part of the links between a transmitter and receivers, given by radio ID, to a time
+        in second, and get it. Links are only updated when used, their AR(1) step spanning the time since the last
+        one, so that it is the same as stepping them all every time step.
+        """
+        rx_ids = np.asarray(rx_ids, dtype=np.intp)
+        if self._sigma_t == 0 or len(rx_ids) == 0:
+            return np.zeros(len(rx_ids))
+        low, high = np.minimum(tx_id, rx_ids), np.maximum(tx_id, rx_ids)
+        n = int(high.max()) + 1
+        if n > len(self._states):
+            states, last = np.zeros((n, n)), np.full((n, n), np.nan)
+            states[:len(self._states), :len(self._states)] = self._states
+            last[:len(self._last), :len(self._last)] = self._last
+            self._states, self._last = states, last
+        # Links never updated are drawn from the stationary distribution.
+        rho = np.nan_to_num(np.exp(-(time - self._last[low, high]) / self._corr_time), nan=0.0)
+        states = rho * self._states[low, high] + \
+            np.sqrt(1 - rho ** 2) * self._sigma_t * self._rng.standard_normal(len(rx_ids))
+        self._states[low, high] = states
+        self._last[low, high] = time
+        return states
+
+    def loss_many(self, radio_tx, radios_rx, world):
+        """
+        Calculate the shadow losses of the links from a transmitter to many receivers at the world's time, in dB.
+        """
+        return self.spatial_many(radio_tx.pos, [radio_rx.pos for radio_rx in radios_rx]) + \
+            self.temporal_many(radio_tx.radio_id, [radio_rx.radio_id for radio_rx in radios_rx], world.time)
@@ -1,4 +1,5 @@
 from math import *
+import numpy as np
 
 
 GRAVITY = 9.8  # m/s^2
@@ -8,7 +9,7 @@ class SlopePhysics:
     """
     A slope physics class.
     """
-    def __init__(self, world):
+    def __init__(self, world, mu=0.1, precompute=True):
         self._physical_world = world                       # A world object.
         self._terrain = world.terrain                      # The terrain info, a map object.
         self._resolution = self._terrain.resolution        # The resolution of map.
@@ -16,6 +17,62 @@ class SlopePhysics:
         self._y_min = self._terrain.y_llcorner             # Lower left northing.
         self._x_max = self._x_min + self._terrain.x_range  # Upper right easting.
         self._y_max = self._y_min + self._terrain.y_range  # Upper right northing.
+        self._mu = mu                                      # Friction coefficient.
+        self._rasters = None                               # Gravity and friction accelerations per grid point.
+        # Slopes span the edges of a mosaic's tiles, so mosaics always work them out per point.
+        if precompute and not self._terrain.is_tiled():
+            self._rasters = self._terrain.derived('slope_mu' + str(mu), self.build_rasters)
+
+    @property
+    def mu(self):
+        return self._mu
+
+    @property
+    def rasters(self):
+        return self._rasters
+
+    def build_rasters(self, data):
+        """
+        Compute the easting gravity, easting friction, northing gravity and northing friction accelerations
+        of every grid point, in the same way as the slope methods do for a single point.
+        """
+        resolution = self._resolution
+        # A point's easting neighbour is one column right, wrapping like get_data at the first column.
+        e_slope = (np.roll(data, -1, axis=1) - data) / resolution
+        e_slope[:, -2] = 0  # Points within a resolution of the east edge.
+        # A point's northing neighbour is one row up.
+        n_slope = (np.roll(data, 1, axis=0) - data) / resolution
+        n_slope[0, :] = 0   # Points within a resolution of the north edge.
+
+        rasters = np.empty((4,) + data.shape)
+        for i, slope in enumerate([e_slope, n_slope]):
+            angle = np.arctan(slope.astype(np.float64))
+            rasters[2 * i] = -GRAVITY * np.sin(angle)
+            rasters[2 * i + 1] = -self._mu * GRAVITY * np.abs(np.cos(angle))
+        return rasters
+
+    def accelerations(self, easting, northing):
+        """
+        Get the easting gravity, easting friction, northing gravity and northing friction accelerations at a point.
+        """
+        if self._rasters is not None:
+            row, col = self._terrain.coordinate2index(easting, northing)
+            return self._rasters[:, row, col]
+        e_slope = self.easting_slope(easting, northing)
+        n_slope = self.northing_slope(easting, northing)
+        return (self.generate_acceleration(e_slope), self.generate_friction(e_slope, self._mu),
+                self.generate_acceleration(n_slope), self.generate_friction(n_slope, self._mu))
+
+    def accelerations_many(self, eastings, northings):
+        """
+        Get the accelerations at arrays of points, stacked in the same order as accelerations().
+        """
+        if self._rasters is not None:
+            rows, cols = self._terrain.coordinate2index_many(eastings, northings)
+            return self._rasters[:, rows, cols]
+        return np.array([self.accelerations(easting, northing)
+                         for easting, northing in zip(np.ravel(eastings), np.ravel(northings))]).T.reshape(
+            (4,) + np.shape(eastings))
 
     def easting_slope(self, easting, northing):
         """
@@ -0,0 +1,50 @@
+import numpy as np
+
+
+class SwarmState:
+    """
+    The state of a swarm's rovers in contiguous arrays, a row per rover, for the kernels moving them all at once.
+    Rovers keep their own state as plain Python values, which controllers read and write fastest, so the rows are
+    synced from them once per kernel call by gather(), and the kernels write their results back to the rovers.
+    """
+    def __init__(self, capacity=16):
+        self._num_rovers = 0
+        self.pose = np.zeros((capacity, 2))                 # Pose of each rover: (x (m), y (m)).
+        self.control = np.zeros((capacity, 3))              # Control input of each rover: (vx, vy, v) in m/s.
+
+    @property
+    def num_rovers(self):
+        return self._num_rovers
+
+    @property
+    def capacity(self):
+        return len(self.pose)
+
+    def add(self):
+        """
+        Add a row for a rover and get its index.
+        """
+        index = self._num_rovers
+        if index == len(self.pose):
+            self.grow(max(2 * index, 1))
+        self._num_rovers += 1
+        return index
+
+    def grow(self, capacity):
+        """
+        Reallocate the arrays with room for a number of rovers, keeping the rows filled so far.
+        """
+        for name in ('pose', 'control'):
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def gather(self, rovers):
+        """
+        Copy the poses and control inputs of rovers into their rows, returning the array of their row indexes.
+        """
+        index = np.array([rover.swarm_index for rover in rovers], dtype=np.intp)
+        self.pose[index] = [rover.pose[:2] for rover in rovers]
+        self.control[index] = [rover.control[:3] for rover in rovers]
+        return index
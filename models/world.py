@@ -1,5 +1,10 @@
 from exceptions.map_not_aligned import *
+from exceptions.event_skip_mismatch import *
 from models.rover import *
+from models.link_cache import *
+from models.shadowing import *
+from models.channel import *
+from models.scheduler import *
 
 
 class World:
@@ -15,8 +20,26 @@ class World:
             self._dt = dt                                   # Step time, in second.
             self._mission = mission
             self._rovers = []                               # List of existing rovers.
-            self.channel = []                               # List of existing transmissions.
+            self._swarm = SwarmState()                      # State of the rovers, which they are views of.
+            self.channel = Channel()                        # List of existing transmissions, and those on air.
+            self._tx_schedule = Scheduler()                 # Next transmission of each radio, by time step.
+            self._num_scheduled = None                      # Number of rovers whose radios were scheduled.
+            self._quiet = False                             # Whether nothing was sent in the last time step.
+            self._event_driven = False                      # Skip quiet time steps straight to the next event.
+            self._validate_events = False                   # Step through quiet time steps anyway, checking that
+            # skipping them would have given the same state.
             self._dynamics_engine = None                    # Dynamics engine.
+            self._link_cache = None                         # Cache of path losses, None meaning disabled.
+            self._coverage_cache = None                     # Cache of coverage maps, None meaning disabled.
+            self._early_out = True                          # Decide receptions by path loss bounds when possible.
+            self._error_budget = None                       # Diffraction loss error allowed for sampling long paths
+            # from coarser terrain, in dB, None meaning always sampled at full resolution.
+            self._max_level = 4                             # The coarsest terrain pyramid level sampled.
+            self._horizon_sectors = None                    # Azimuth sectors of the terrain horizons showing paths
+            # clear of the terrain, None meaning every path's terrain is sampled.
+            self._shadowing = None                          # Shadow fading layer, None meaning no fading.
+            self._capture_threshold = None                  # Signal to interference and noise ratio a packet needs
+            # over the packets overlapping it on air, in dB, None meaning only the last packet of a slot is received.
             self._completed_rovers = 0                      # Number of rovers that have completed their tasks.
         else:
             raise MapNotAligned()
@@ -29,6 +52,13 @@ class World:
     def landcover(self):
         return self._landcover
 
+    @property
+    def impassable(self):
+        """
+        Flags of the land cover cells rovers cannot enter, built on first use.
+        """
+        return self._landcover.derived('impassable', build_impassable)
+
     @property
     def sample_metric(self):
         return self._sample_metric
@@ -53,6 +83,14 @@ class World:
     def rovers(self):
         return self._rovers
 
+    @property
+    def swarm(self):
+        return self._swarm
+
+    @property
+    def tx_schedule(self):
+        return self._tx_schedule
+
     @property
     def dynamics_engine(self):
         return self._dynamics_engine
@@ -61,12 +99,122 @@ class World:
     def completed_rovers(self):
         return self._completed_rovers
 
+    @property
+    def link_cache(self):
+        return self._link_cache
+
+    @property
+    def coverage_cache(self):
+        return self._coverage_cache
+
+    @property
+    def early_out(self):
+        """
+        Whether receptions are decided by path loss bounds, never with capture, whose interference sums need the
+        received powers themselves rather than bounds of them.
+        """
+        return self._early_out and self._capture_threshold is None
+
+    @property
+    def error_budget(self):
+        return self._error_budget
+
+    @property
+    def max_level(self):
+        return self._max_level
+
+    @property
+    def horizon_sectors(self):
+        return self._horizon_sectors
+
+    @property
+    def shadowing(self):
+        return self._shadowing
+
+    @property
+    def capture_threshold(self):
+        return self._capture_threshold
+
+    @property
+    def event_driven(self):
+        return self._event_driven
+
+    @property
+    def validate_events(self):
+        return self._validate_events
+
     def config_engine(self, engine):
         """
         Configure dynamics engine of the world.
         """
         self._dynamics_engine = engine
     
+    def config_link_cache(self, capacity, cell_size=None):
+        """
+        Configure a cache of path losses between grid cells, by default the terrain's cells.
+        Positions in the same cell then share path losses, so a capacity of 0 disables it to keep them exact.
+        """
+        if capacity > 0:
+            if cell_size is None:
+                cell_size = self._terrain.resolution
+            self._link_cache = LinkCache(capacity, cell_size, (self._terrain.x_llcorner, self._terrain.y_llcorner))
+        else:
+            self._link_cache = None
+
+    def config_coverage_cache(self, cache):
+        """
+        Configure a cache of coverage maps, answering received powers from transmitters in cells it holds maps of.
+        """
+        self._coverage_cache = cache
+
+    def config_early_out(self, early_out):
+        """
+        Configure whether receptions are decided by path loss bounds when these leave no doubt,
+        instead of always calculating the full path loss. It has no effect with capture configured.
+        """
+        self._early_out = early_out
+
+    def config_multi_resolution(self, error_budget, max_level=4):
+        """
+        Configure sampling the terrain along long paths from a max-pooled pyramid of it, each level 2**level cells
+        wide, keeping the resulting diffraction loss error roughly within a budget in dB, as the height error of
+        each level is estimated from a high percentile of its relief. None samples at full resolution.
+        """
+        self._error_budget = error_budget
+        self._max_level = max_level
+
+    def config_horizon(self, sectors):
+        """
+        Configure classifying paths as clear of the terrain from precomputed horizons of the terrain in a number of
+        azimuth sectors, skipping the terrain profiles of those paths, which have no diffraction loss.
+        None samples the terrain of every path.
+        """
+        self._horizon_sectors = sectors
+
+    def config_shadowing(self, shadowing):
+        """
+        Configure a shadow fading layer adding a random, spatially and time-correlated loss to every link.
+        None keeps the channel deterministic.
+        """
+        self._shadowing = shadowing
+
+    def config_capture(self, threshold):
+        """
+        Configure receiving every packet, once it ends, at every radio not on air meanwhile, when its signal to
+        interference and noise ratio over the packets overlapping it on air reaches a threshold, in dB.
+        None only receives the last packet of each slot, without interference.
+        """
+        self._capture_threshold = threshold
+
+    def config_event_driven(self, event_driven, validate=False):
+        """
+        Configure advancing time straight to the next event, a sample completing or a radio having something to
+        send, while every rover stands still sampling. Validating steps through those time steps anyway, raising
+        EventSkipMismatch if the state reached differs from skipping them.
+        """
+        self._event_driven = event_driven
+        self._validate_events = validate
+
     def config_sample_metric(self, distribution, mu, cov):
         """
         Configure Sampling Metric and it's distribution in the world.
@@ -96,7 +244,8 @@ class World:
         """
         Add a rover to the world given its coordinates.
         """
-        self._rovers.append(Rover(len(self.rovers) + 1, easting, northing, r_path, q_noise, r_noise, num_rovers))
+        self._rovers.append(Rover(len(self.rovers) + 1, easting, northing, r_path, q_noise, r_noise, num_rovers,
+                                  self._swarm))
 
     def rover_completes_task(self):
         """
@@ -104,17 +253,129 @@ class World:
         """
         self._completed_rovers += 1
 
+    def schedule_radios(self):
+        """
+        Schedule the next transmission of every radio afresh, e.g. once radios are configured.
+        The world does so on its own when rovers are added.
+        """
+        self._tx_schedule.clear()
+        for rover in self._rovers:
+            if rover.radio is not None:
+                self.schedule_tx(rover.radio)
+        self._num_scheduled = len(self._rovers)
+
+    def schedule_tx(self, radio):
+        """
+        Schedule the next transmission of a radio. Radios due at the same time step transmit in order of ID.
+        """
+        self._tx_schedule.schedule(radio.next_tx, radio.radio_id, radio)
+
     def add_packet(self, packet):
         """
-        Add a new transmission to the channel.
+        Add a new transmission to the channel, on air for its airtime from now.
         """
+        packet.set_interval(self.time, self.time + packet.tx.airtime())
         self.channel.append(packet)
 
     def clear_channel(self):
         """
-        Empty the channel.
+        Empty the channel, forgetting the packets off air by the next time slot.
         """
         self.channel.clear()
+        self.channel.prune((self._tn + 1) * self._dt)
+
+    def receive_all(self):
+        """
+        Receive every packet which ended by the end of this time slot at every radio not on air meanwhile, against
+        the interference of the packets overlapping it on air. The received powers of the packets sent in this slot
+        are calculated in one batch per packet and recorded, while their reception is deferred until they end, so
+        that the packets sent in later slots while they are still on air count too.
+        """
+        radios = [rover.radio for rover in self._rovers if rover.radio is not None]
+        for packet in self.channel:
+            radios_rx = [radio for radio in radios if radio is not packet.tx]
+            # Every received power is recorded as interference to the packets overlapping, so none is a bound.
+            rx_powers = rx_power_many(packet, radios_rx, self, early_out=self.early_out)
+            self.channel.record_powers(packet, [radio.radio_id for radio in radios_rx], rx_powers)
+            self.channel.defer(packet, dict(zip(radios_rx, rx_powers)))
+        for packet, packet_rx_powers in self.channel.pop_ended((self._tn + 1) * self._dt):
+            on_air = self.channel.transmitting(packet)
+            radios_rx = [radio for radio in radios if radio.radio_id not in on_air and radio in packet_rx_powers]
+            interference = self.channel.interference(packet, [radio.radio_id for radio in radios_rx])
+            for radio, radio_interference in zip(radios_rx, interference):
+                radio.receive(self, packet_rx_powers[radio], packet, radio_interference)
+
+    def quiet_steps(self, limit=None):
+        """
+        Count the time steps from now in which nothing happens but rovers sampling and radios passing their slots
+        with nothing to send, up to a limit. Only steps following a quiet one count, as the swarm has then settled.
+        """
+        if not self._quiet:
+            return 0
+        steps = limit
+        for rover in self._rovers:
+            rover_steps = rover.quiet_steps(self)
+            if rover_steps == 0:
+                return 0
+            if rover.radio is not None and rover.transmit and rover.radio.next_tx >= self._tn:
+                rover_steps = rover.radio.next_tx - self._tn if rover_steps is None else \
+                    min(rover_steps, rover.radio.next_tx - self._tn)
+            if rover_steps is not None:
+                steps = rover_steps if steps is None else min(steps, rover_steps)
+        return 0 if steps is None else steps
+
+    def skip_state(self, steps=0):
+        """
+        Get the state of the swarm as it would be after skipping a number of quiet time steps.
+        """
+        end = self._tn + steps
+        state = [end]
+        for rover in self._rovers:
+            state.append((list(rover.pose), list(rover.control), rover.goal_index, rover.is_sampling,
+                          rover.sampling_steps_passed + (0 if rover.is_mission_terminated() else steps),
+                          rover.num_samples, list(rover.connectivity), rover.transmit, rover.is_mission_terminated()))
+            if rover.radio is not None:
+                radio = rover.radio
+                state.append((radio.next_tx_after(self._tn, end), radio.num_tx, radio.num_rx, radio.num_disc))
+        return state
+
+    def skip(self, steps):
+        """
+        Advance a number of quiet time steps at once, as allowed by quiet_steps().
+        Only the last time step() would have printed is printed.
+        """
+        dt = self._dt
+        end = self._tn + steps
+        printed = np.flatnonzero((dt * np.arange(self._tn, end)) % 100 == 0)
+        if len(printed) > 0:
+            print('Time: {} (s)\n'.format(str(round((self._tn + int(printed[-1])) * dt, 1))))
+        for rover in self._rovers:
+            if not rover.is_mission_terminated():
+                rover.skip_sampling(steps)
+        for due_tn, radio in self._tx_schedule.pop_due(end - 1):
+            if due_tn >= self._tn and due_tn == radio.next_tx:
+                radio.skip_slots(self, end)
+        self._tn = end
+        self.channel.prune(end * dt)
+
+    def advance(self, limit=None):
+        """
+        Step forward one time interval or, if event driven, skip the quiet time steps until the next event at once,
+        up to a limit. Return the number of time steps advanced.
+        """
+        steps = self.quiet_steps(limit) if self._event_driven else 0
+        if steps == 0:
+            self.step()
+            return 1
+        if self._validate_events:
+            expected = self.skip_state(steps)
+            for _ in range(steps):
+                self.step()
+            if self.skip_state() != expected:
+                raise EventSkipMismatch()
+        else:
+            self.skip(steps)
+        return steps
 
     def step(self):
         """
@@ -126,41 +387,51 @@ class World:
             print('Time: {} (s)\n'.format(str(round(tn * dt, 1))))
 
         # Logically, this is the beginning of time slot.
+        if self._num_scheduled != len(self._rovers):
+            self.schedule_radios()
+        step_motion_many(self._rovers, self, dt)
+
+        # Only the radios due to transmit are visited, popped off the schedule in order of ID.
         transmitter = None
         test = 0
-        for rover in self._rovers:
-            rover.step_motion(self, dt)
-            if rover.radio is None:
-                pass
-            else:
-                if(rover.control_policy != 'Goal-driven' or rover.control_policy != 'Independent Adaptive Sampling'):
-                    if tn == rover.radio.next_tx:
-                        if(rover.transmit == True):
-                            transmitter = rover
-                            transmitter.radio.transmit(self)   
-                            rover.reset_transmission_flag()
-                            if(test):
-                                print('hi')
-                            test=1
-                        rover.radio.set_next_tx(self)
+        for due_tn, radio in self._tx_schedule.pop_due(tn):
+            # A radio only transmits at its next_tx, so a transmission missed or rescheduled since is dropped.
+            if due_tn != tn or radio.next_tx != tn:
+                continue
+            rover = radio.rover
+            if(rover.transmit == True):
+                transmitter = rover
+                transmitter.radio.transmit(self)
+                rover.reset_transmission_flag()
+                if(test):
+                    print('hi')
+                test=1
+            radio.set_next_tx(self)
 
         #Slowing down simulation
         #if len(self.channel) > 0:
         #    print('Currently Transmitting: Rover {}\n'.format(self.channel[-1].tx.radio_id))
 
         # Logically, this is the end of time slot.
-        for receiver in self._rovers:
-            if receiver.radio is None:
-                pass
-            elif receiver == transmitter:
-                pass
-            else:
-                if(rover.control_policy != 'Goal-driven' or rover.control_policy != 'Independent Adaptive Sampling'):
-                    receiver.radio.receive(self)
+        # Receivers are only visited if something was sent, their received powers calculated in one batch.
+        if self._capture_threshold is not None:
+            if len(self.channel) > 0 or self.channel.num_undecided > 0:
+                self.receive_all()
+        elif len(self.channel) == 0:
+            pass
+        else:
+            receivers = [receiver.radio for receiver in self._rovers
+                         if receiver.radio is not None and receiver != transmitter]
+            if len(receivers) > 0:
+                rx_powers = rx_power_many(self.channel[-1], receivers, self, early_out=self.early_out)
+                for receiver, rx_power in zip(receivers, rx_powers):
+                    receiver.receive(self, rx_power)
 
+        # Packets still on air are received in a later time step, so this one is not quiet.
+        self._quiet = len(self.channel) == 0 and self.channel.num_undecided == 0
         self.clear_channel()
 
-        for controller in self._rovers:
-            controller.apply_control(self)
+        # Rovers sharing a passive-cooperative policy are controlled together.
+        apply_control_many(self._rovers, self)
 
         self._tn += 1
@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import time
+from multiprocessing import Pool
+import numpy as np
+
+from models.world import *
+from models.radio import ANT_HEIGHT
+from utils.load_map import *
+
+
+user_f = 869.525  # Carrier center frequency, in MHz.
+
+chunk_size = 2048  # Test point pairs evaluated per task.
+
+_worlds = {}  # Worlds of each area already loaded by a worker process, by maps directory and area.
+
+
+def load_world(maps_dir, area, error_budget=None, horizon_sectors=None):
+    """
+    Load the world of an area once per process.
+    """
+    key = (maps_dir, area)
+    if key not in _worlds:
+        catalog = get_catalog(maps_dir)
+        map_terrain = read_asc(catalog.locate(area + '_elevation' + '.asc'), dtype=ELEVATION_DTYPE)
+        map_landcover = read_asc(catalog.locate(area + '_landcover' + '.asc'), dtype=LANDCOVER_DTYPE)
+        _worlds[key] = World(map_terrain, map_landcover)
+    _worlds[key].config_multi_resolution(error_budget)
+    _worlds[key].config_horizon(horizon_sectors)
+    return _worlds[key]
+
+
+def test_points(world, dist, max_rep, rng):
+    """
+    Draw pairs of random points which are on a same horizontal line at a given distance,
+    the second point lying to the left of the first when it would fall off the map.
+    """
+    x_min, y_min = world.terrain.x_llcorner, world.terrain.y_llcorner
+    x_max, y_max = x_min + world.terrain.x_range, y_min + world.terrain.y_range
+    test_x = rng.integers(x_min, x_max - 1, max_rep, endpoint=True)
+    test_y = rng.integers(y_min, y_max - 1, max_rep, endpoint=True)
+    test_x_2 = np.where(test_x + dist >= x_max, test_x - dist, test_x + dist)
+    return np.stack([test_x, test_y], axis=1).astype(np.float64), \
+        np.stack([test_x_2, test_y], axis=1).astype(np.float64)
+
+
+def evaluate(task):
+    """
+    Evaluate the path losses of a chunk of test point pairs, returning them with the time taken.
+    """
+    maps_dir, area, f, error_budget, horizon_sectors, tx_pos, rx_pos = task
+    world = load_world(maps_dir, area, error_budget, horizon_sectors)
+    t_start = time.perf_counter()
+    path_loss = path_loss_pairs(world, tx_pos, rx_pos, f, ANT_HEIGHT, ANT_HEIGHT)
+    return path_loss, time.perf_counter() - t_start
+
+
+def statistics(path_loss):
+    """
+    Summarise a distribution of path losses, in dB.
+    """
+    percentiles = np.percentile(path_loss, [5, 25, 50, 75, 95])
+    return {'mean': float(np.mean(path_loss)), 'std': float(np.std(path_loss)),
+            'min': float(np.min(path_loss)), 'max': float(np.max(path_loss)),
+            'p5': float(percentiles[0]), 'p25': float(percentiles[1]), 'p50': float(percentiles[2]),
+            'p75': float(percentiles[3]), 'p95': float(percentiles[4])}
+
+
+def main():
+    """
+    Benchmark path loss between random points at given distances in given areas, reporting the throughput
+    and the distribution of path losses for each area and distance.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the path loss model on random test points.')
+    parser.add_argument('areas', nargs='*', help='Areas to test, all areas with both maps if none are given.')
+    parser.add_argument('-d', '--dist', type=float, nargs='+', default=[450],
+                        help='Distances between the two points, in meter.')
+    parser.add_argument('-n', '--reps', type=int, default=10000, help='Number of test point pairs per distance.')
+    parser.add_argument('-f', '--freq', type=float, default=user_f, help='Carrier center frequency, in MHz.')
+    parser.add_argument('-b', '--budget', type=float, default=None,
+                        help='Error budget of multi-resolution terrain sampling, in dB, full resolution if not given.')
+    parser.add_argument('-H', '--horizon', type=int, default=None,
+                        help='Azimuth sectors of terrain horizons to skip clear paths by, off if not given.')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help='Number of worker processes.')
+    parser.add_argument('-s', '--seed', type=int, default=None, help='Seed of the random test points.')
+    parser.add_argument('--maps', default=MAPS_DIR, help='Directory of the maps.')
+    parser.add_argument('-o', '--output', default=None, help='JSON file to append the results to.')
+    args = parser.parse_args()
+
+    catalog = get_catalog(args.maps)
+    areas = args.areas if len(args.areas) > 0 else [area for area in catalog.areas() if catalog.is_complete(area)]
+    incomplete = [area for area in areas if not catalog.is_complete(area)]
+    if len(incomplete) > 0 or len(areas) == 0:
+        parser.error('No aligned elevation and land cover maps for area(s): ' + (', '.join(incomplete) or 'any'))
+
+    rng = np.random.default_rng(args.seed)
+    tasks, groups = [], []
+    for area in areas:
+        world = load_world(args.maps, area, args.budget, args.horizon)
+        for dist in args.dist:
+            tx_pos, rx_pos = test_points(world, dist, args.reps, rng)
+            first = len(tasks)
+            for start in range(0, args.reps, chunk_size):
+                tasks.append((args.maps, area, args.freq, args.budget, args.horizon, tx_pos[start:start + chunk_size],
+                              rx_pos[start:start + chunk_size]))
+            groups.append((area, dist, first, len(tasks)))
+
+    t_start = time.perf_counter()
+    with Pool(max(1, min(args.workers, len(tasks)))) as pool:
+        outcomes = pool.map(evaluate, tasks)
+    t_total = time.perf_counter() - t_start
+
+    results = []
+    print('{:<8} {:>8} {:>8} {:>12} {:>8} {:>7} {:>8} {:>8} {:>8} {:>8}'.format(
+        'Area', 'Dist (m)', 'Links', 'Links/sec', 'Mean', 'Std', 'P5', 'P50', 'P95', 'Max'))
+    for area, dist, first, last in groups:
+        path_loss = np.concatenate([outcomes[i][0] for i in range(first, last)])
+        t_eval = sum(outcomes[i][1] for i in range(first, last))
+        result = {'area': area, 'dist': dist, 'links': len(path_loss), 'freq': args.freq,
+                  'links_per_sec': len(path_loss) / t_eval}
+        result.update(statistics(path_loss))
+        results.append(result)
+        print('{:<8} {:>8g} {:>8d} {:>12.0f} {:>8.2f} {:>7.2f} {:>8.2f} {:>8.2f} {:>8.2f} {:>8.2f}'.format(
+            area, dist, result['links'], result['links_per_sec'], result['mean'], result['std'], result['p5'],
+            result['p50'], result['p95'], result['max']))
+    n_links = sum(result['links'] for result in results)
+    print()
+    print('Total: {} links in {} (s) with {} worker(s), {} links/sec (path losses in dB).'.format(
+        str(n_links), str(round(t_total, 2)), str(min(args.workers, len(tasks))), str(round(n_links / t_total))))
+
+    if args.output is not None:
+        # One JSON record per run, so that performance can be tracked over time.
+        record = {'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'seed': args.seed, 'workers': args.workers,
+                  'budget': args.budget, 'horizon': args.horizon, 'total_sec': t_total, 'results': results}
+        with open(args.output, 'a') as file:
+            file.write(json.dumps(record) + '\n')
+
+
+if __name__ == '__main__':
+    main()
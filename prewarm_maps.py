@@ -0,0 +1,88 @@
+import argparse
+import glob
+import os
+import time
+from multiprocessing import Pool
+
+from models.world import *
+from models.slope_physics import *
+from utils.load_map import *
+
+
+def cache_size(map_object):
+    """
+    Sum the sizes of the cache files of a map, in byte.
+    """
+    if map_object.cache_prefix is None:
+        return 0
+    return sum(os.path.getsize(path) for path in glob.glob(glob.escape(map_object.cache_prefix) + '.*'))
+
+
+def prewarm_area(area):
+    """
+    Build the binary caches and derived rasters of an area, returning its timing and cache sizes.
+    """
+    catalog = get_catalog()
+    layers = catalog.layers(area)
+    report = {'area': area, 'layers': layers}
+    t_start = time.time()
+    maps = {}
+    for layer in layers:
+        t_layer = time.time()
+        maps[layer] = read_asc(catalog.locate(area + '_' + layer + '.asc'), dtype=LAYER_DTYPES[layer])
+        report[layer + '_time'] = time.time() - t_layer
+
+    if 'landcover' in maps:
+        t_derived = time.time()
+        maps['landcover'].derived('impassable', build_impassable)
+        maps['landcover'].derived('rgb', build_rgb)
+        report['landcover_derived_time'] = time.time() - t_derived
+    if catalog.is_complete(area):
+        # Slope rasters are built the same way the simulation builds them, so that they are reused.
+        t_derived = time.time()
+        world = World(maps['elevation'], maps['landcover'])
+        SlopePhysics(world)
+        # The terrain pyramid multi-resolution path loss samples, the block maxima of path loss bounds and the
+        # terrain horizons classifying clear paths.
+        for level in range(1, world.max_level + 1):
+            maps['elevation'].pyramid(level)
+        maps['elevation'].pyramid_relief(world.max_level)
+        maps['elevation'].horizon()
+        report['elevation_derived_time'] = time.time() - t_derived
+
+    report['time'] = time.time() - t_start
+    report['size'] = sum(cache_size(map_object) for map_object in maps.values())
+    return report
+
+
+def main():
+    """
+    Make the maps run-ready by building their caches for all or selected areas in parallel.
+    """
+    parser = argparse.ArgumentParser(description='Pre-warm the binary caches and derived rasters of the maps.')
+    parser.add_argument('areas', nargs='*', help='Areas to pre-warm, all areas with maps if none are given.')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help='Number of worker processes.')
+    args = parser.parse_args()
+
+    catalog = get_catalog()
+    areas = args.areas if len(args.areas) > 0 else catalog.areas()
+    unknown = [area for area in areas if len(catalog.layers(area)) == 0]
+    if len(unknown) > 0:
+        parser.error('No maps found for area(s): ' + ', '.join(unknown))
+
+    t_start = time.time()
+    total_size = 0
+    with Pool(min(args.workers, len(areas))) as pool:
+        for report in pool.imap_unordered(prewarm_area, areas):
+            total_size += report['size']
+            timings = ', '.join(key[:-len('_time')] + ' ' + str(round(report[key], 2)) + ' s'
+                                for key in report if key.endswith('_time'))
+            print(report['area'] + ': ' + str(round(report['time'], 2)) + ' s (' + timings + '), '
+                  + str(round(report['size'] / 2 ** 20, 1)) + ' MiB cached'
+                  + ('' if catalog.is_complete(report['area']) else ', no slope rasters (incomplete area)'))
+    print('Pre-warmed ' + str(len(areas)) + ' area(s) in ' + str(round(time.time() - t_start, 2)) + ' s, '
+          + str(round(total_size / 2 ** 20, 1)) + ' MiB cached.')
+
+
+if __name__ == '__main__':
+    main()
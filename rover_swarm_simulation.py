@@ -30,6 +30,9 @@ x_offset = 475      # Offset from left boundary in easting direction, in meter.
 y_offset = 5        # Offset from baseline in northing direction, in meter.
 goal_offset = 5     # Of distance to goal is smaller than offset, goal is assumed reached, in meter.
 max_time = 100    #43200      # Maximum time for mission in seconds
+mmap_maps = False   # Memory-map the maps from their binary cache instead of loading them, e.g. for parallel sweeps.
+mosaic_areas = []   # Adjacent areas stitched together with 'area' into one larger map, e.g. ['SU20NE', 'SU30NW'].
+mosaic_budget = 64 * 2 ** 20    # Memory budget for the loaded tiles of each stitched map, in byte.
 
 t_sampling = 0.12     # Sampling time, in second. 0.12 FOR LS
 
@@ -53,6 +56,19 @@ user_sf = SF[3]                                     # Spreading factor.
 user_cr = CR[3]                                     # Coding rate.
 user_txpw = 14                                      # Transmitting power, in dBm.
 user_dc = 1                                         # Duty cycle in %
+link_cache_size = 0                                 # Links whose path loss is cached by grid cell, 0 to disable.
+link_reuse_dist = 0                                 # Distance rovers move before a link's path loss is recalculated, 0 to disable.
+link_reuse_exact = False                            # Recalculate reusable links anyway, reporting the error of reuse.
+error_budget = None                                 # Diffraction loss error allowed to sample long links from coarser terrain, in dB, None for full resolution.
+horizon_sectors = None                              # Azimuth sectors of terrain horizons to skip the terrain of clear links, None to disable.
+shadow_sigma = 0                                    # Standard deviation of spatially correlated shadow fading, in dB, 0 to disable fading.
+shadow_corr_dist = 50                               # Distance shadow fading decorrelates over, in meter.
+shadow_sigma_t = 0                                  # Standard deviation of time-correlated fading of each link, in dB.
+shadow_corr_time = 10                               # Time the fading of a link decorrelates over, in second.
+shadow_seed = None                                  # Seed of shadow fading, None for a different field every run.
+event_driven = False                                # Skip time steps in which every rover stands still sampling straight to the next event.
+validate_events = False                             # Step through skipped time steps anyway, checking skipping gives the same state.
+capture_threshold = None                            # Signal to interference and noise ratio overlapping packets need, in dB, e.g. 6, None to receive only the last packet of each slot.
 
 # Configure control settings:
 ctrl_policy = '1-2'
@@ -109,15 +125,31 @@ def main():
 
     # Load terrain map and land cover map to create the world.
     # Configure world's dynamics engine.
-    map_terrain = read_asc(locate_map(area + '_elevation' + '.asc'))
-    map_landcover = read_asc(locate_map(area + '_landcover' + '.asc'))
+    if len(mosaic_areas) == 0:
+        map_terrain = read_asc(locate_map(area + '_elevation' + '.asc'), dtype=ELEVATION_DTYPE, mmap=mmap_maps)
+        map_landcover = read_asc(locate_map(area + '_landcover' + '.asc'), dtype=LANDCOVER_DTYPE, mmap=mmap_maps)
+    else:
+        areas = [area] + mosaic_areas
+        map_terrain = read_mosaic([locate_map(a + '_elevation' + '.asc') for a in areas], dtype=ELEVATION_DTYPE,
+                                  memory_budget=mosaic_budget, mmap=mmap_maps)
+        map_landcover = read_mosaic([locate_map(a + '_landcover' + '.asc') for a in areas], dtype=LANDCOVER_DTYPE,
+                                    memory_budget=mosaic_budget, mmap=mmap_maps)
     x_min, x_max = map_terrain.x_llcorner, map_terrain.x_llcorner + map_terrain.x_range
     y_min, y_max = map_terrain.y_llcorner, map_terrain.y_llcorner + map_terrain.y_range
 
 
     world = World(map_terrain, map_landcover, mission, t_sampling)
     world.config_sample_metric(Sampling_Metric(x_min, x_max, y_min, y_max), metric_mean, metric_covariance)
-    world.config_engine(SlopePhysics(world))
+    # Slope rasters cover the whole map, which would load every tile of a mosaic, so mosaics work out slopes per point.
+    world.config_engine(SlopePhysics(world, precompute=len(mosaic_areas) == 0))
+    world.config_link_cache(link_cache_size)
+    world.config_multi_resolution(error_budget)
+    world.config_horizon(horizon_sectors)
+    world.config_capture(capture_threshold)
+    world.config_event_driven(event_driven, validate_events)
+    if shadow_sigma > 0 or shadow_sigma_t > 0:
+        world.config_shadowing(Shadowing(map_terrain, shadow_sigma, shadow_corr_dist, shadow_sigma_t, shadow_corr_time,
+                                         shadow_seed))
 
     init_waypoints = []
     if(load_waypoints):
@@ -143,6 +175,8 @@ def main():
         starter.radio.config_de()
         starter.radio.config_silent_time()
         starter.radio.set_t_slot(t_sampling)
+        if link_reuse_dist > 0:
+            starter.radio.config_link_reuse(link_reuse_dist, link_reuse_exact)
 
         # Configure motion logger.
         starter.config_pose_logger(PoseLogger(starter))
@@ -216,19 +250,21 @@ def main():
     ee = []  # To record formation error.
     step = 0
     while True:
-        world.step()
-        for l in range(N):
-            world.rovers[l].pose_logger.log_pose()
-            world.rovers[l].pose_logger.log_velocity()
-            world.rovers[l].pose_logger.log_connectivity()
-
-        error = 0.0
-        for m in range(N - 1):  # Root mean square formation error
-            error += (world.rovers[m + 1].pose_logger.y_pose[-1]
-                    - world.rovers[m].pose_logger.y_pose[-1]) ** 2
-        ee.append(sqrt(error / (N - 1)))
-            
-        step += 1
+        # Time steps skipped while the swarm is quiet are logged all the same.
+        steps = world.advance(None if max_steps is None else max_steps - step)
+        for _ in range(steps):
+            for l in range(N):
+                world.rovers[l].pose_logger.log_pose()
+                world.rovers[l].pose_logger.log_velocity()
+                world.rovers[l].pose_logger.log_connectivity()
+
+            error = 0.0
+            for m in range(N - 1):  # Root mean square formation error
+                error += (world.rovers[m + 1].pose_logger.y_pose[-1]
+                        - world.rovers[m].pose_logger.y_pose[-1]) ** 2
+            ee.append(sqrt(error / (N - 1)))
+
+        step += steps
 
         invalid_rov_pos = False
         for n in range(N):
@@ -299,6 +335,10 @@ def main():
             print('Transmitted Packets: {}'.format(str(transceiver.num_tx)))
             print('Received Packets: {}'.format(str(transceiver.num_rx)))
             print('Discarded Packets: {}'.format(str(transceiver.num_disc)))
+            print('Packets Decided by Link Margin: {}'.format(str(transceiver.num_skipped)))
+            if transceiver.link_reuse_dist is not None:
+                print('Reused Path Losses: {}'.format(str(transceiver.num_reused)))
+                print('Maximum Reuse Error: {} (dB)'.format(str(round(transceiver.max_reuse_error, 6))))
             try:
                 print('Packet Loss Ratio: {}%'.format(str(round(transceiver.num_disc
                                                                 / (transceiver.num_rx + transceiver.num_disc) * 100, 2))))
@@ -307,6 +347,11 @@ def main():
 
             if(transceiver.airtime() > t_sampling):
                     print('\nWARNING: Airtime ({}) > Sample time ({}), reduces accuracy of simulation.'.format(str(transceiver.airtime()), str(t_sampling)))
+    if world.link_cache is not None:
+        print('-' * 50)
+        print('Link Cache Hits: {}'.format(str(world.link_cache.num_hits)))
+        print('Link Cache Misses: {}'.format(str(world.link_cache.num_misses)))
+        print('Link Cache Evictions: {}'.format(str(world.link_cache.num_evictions)))
     print('=' * 50)
 
     # Print simulation running time.
@@ -0,0 +1,166 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import random as rand
+import time
+
+from models.world import *
+from models.slope_physics import *
+from models.P_controller import *
+from models.pose_logger import *
+from utils.load_map import *
+
+
+MISSIONS = {1: 'LS', 2: 'ALS', 3: 'AS'}
+POLICIES = {(1, 1): 'Goal-driven', (1, 2): 'Simple Passive-cooperative', (1, 3): 'Passive-cooperative',
+            (2, 1): 'Goal-driven', (2, 2): 'Simple Passive-cooperative', (2, 3): 'Passive-cooperative',
+            (3, 1): 'Independent Adaptive Sampling', (3, 2): 'Co-op Adaptive Sampling'}
+
+K_goal = [1e-1, 1e-1]           # Control gain for goal-driven controller.
+K_neighbour = [0, 1e-1]         # Control gain for passive-cooperative controller.
+K_sampler = [0.1, 3.25, 0.75]   # Gains of the adaptive sampler.
+
+
+class PeakMetric:
+    """
+    A sampling metric peaking at its mean, standing in for the simulator's sampling metric.
+    """
+    def __init__(self, spread):
+        self._spread = spread       # Standard deviation of the peak, in meter.
+        self._mu = None
+
+    def config_mean(self, mu):
+        self._mu = mu
+
+    def config_covariance(self, cov):
+        pass
+
+    def config_distribution(self):
+        pass
+
+    def sample(self, x, y):
+        d2 = (x - self._mu[0]) ** 2 + (y - self._mu[1]) ** 2
+        return 1e8 * math.exp(-d2 / (2 * self._spread ** 2)) / (2 * math.pi * self._spread ** 2)
+
+
+def make_world(catalog, area, policy, num_rovers, noise):
+    """
+    Make the world of a mission over the maps of an area, as make_swarm_world() does.
+    """
+    map_terrain = read_asc(catalog.locate(area + '_elevation' + '.asc'), dtype=ELEVATION_DTYPE)
+    map_landcover = read_asc(catalog.locate(area + '_landcover' + '.asc'), dtype=LANDCOVER_DTYPE)
+    return make_swarm_world(map_terrain, map_landcover, policy, num_rovers, noise)
+
+
+def make_swarm_world(map_terrain, map_landcover, policy, num_rovers, noise):
+    """
+    Make the world of a mission over a terrain with a swarm configured as by the simulator, one line of waypoints
+    per rover.
+    """
+    mission = MISSIONS[policy[0]]
+    t_sampling = 0.12 if mission == 'LS' else 1.0
+    x_min, y_min = map_terrain.x_llcorner, map_terrain.y_llcorner
+    x_range, y_range = map_terrain.x_range, map_terrain.y_range
+    world = World(map_terrain, map_landcover, mission, t_sampling)
+    world.config_sample_metric(PeakMetric(x_range / 4), [x_min + 3 * x_range / 4, y_min + 3 * y_range / 4], None)
+    world.config_engine(SlopePhysics(world))
+
+    num_waypoints = 10
+    sep = (x_range - 100) / num_rovers
+    for i in range(num_rovers):
+        x = round(x_min + 50 + sep / 2 + i * sep)
+        waypoints = [[x, round(y_min + 5)]] + [[x, round(y_min + w * y_range / (num_waypoints - 1))]
+                                             for w in range(1, num_waypoints)]
+        world.add_rover(waypoints[0][0], waypoints[0][1], waypoints, q_noise=[0.02, 0.02] if noise else None,
+                        r_noise=[0.5, 0.5] if noise else None, num_rovers=num_rovers)
+    for rover in world.rovers:
+        rover.config_radio(869.525, 125, 9, 4 / 8, 1, 14)
+        rover.radio.set_swarm_size(num_rovers)
+        rover.radio.config_de()
+        rover.radio.config_silent_time()
+        rover.radio.set_t_slot(t_sampling)
+        rover.config_pose_logger(PoseLogger(rover))
+        rover.set_current_goal(rover.waypoints[1])
+        if policy[1] == 1 or mission == 'AS':
+            rover.config_speed_controller(PController(None, K_goal))
+            rover.speed_controller.set_ref(rover.goal)
+        else:
+            rover.config_speed_controller(PController(None, K_neighbour))
+        if policy[1] == 3:
+            rover.config_decay_type('quad')
+            rover.config_decay_zero_crossing(20 * rover.radio.interval)
+        if mission == 'AS':
+            rover.config_adaptive_sampler_gains(K_sampler)
+            rover.config_sample_dist(round(y_range / 19, 3))
+            rover.config_req_sample_steps(math.ceil(600 / t_sampling))
+        rover.config_control_policy(POLICIES[policy])
+    return world
+
+
+def run(world, steps):
+    """
+    Step a world, its output discarded, until a number of steps or the end of its mission, returning the steps
+    taken and the time taken.
+    """
+    taken = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        t_start = time.perf_counter()
+        while taken < steps:
+            world.step()
+            taken += 1
+            if world.completed_rovers == len(world.rovers) or \
+                    any(rover.landcover_termination for rover in world.rovers):
+                break
+        t_run = time.perf_counter() - t_start
+    return taken, t_run
+
+
+def main():
+    """
+    Benchmark stepping seeded simulations of control policies with swarms of given sizes, reporting the time per
+    thousand steps, e.g. to check a change to the simulation loop against the previous commit.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark simulation steps of control policies.')
+    parser.add_argument('policies', nargs='*', default=['1-1', '1-2', '1-3', '2-1', '2-2', '2-3', '3-1', '3-2'],
+                        help='Control policies to run, e.g. 1-2, all of them if none are given.')
+    parser.add_argument('-a', '--area', default='SU20NW', help='Area to run the simulations in.')
+    parser.add_argument('-n', '--rovers', type=int, nargs='+', default=[10], help='Numbers of rovers.')
+    parser.add_argument('-t', '--steps', type=int, default=4000, help='Maximum number of steps of each run.')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='Runs of each simulation, the quickest kept.')
+    parser.add_argument('--noise', action='store_true', help='Add state and measurement noise to the rovers.')
+    parser.add_argument('-s', '--seed', type=int, default=1, help='Seed of the noise.')
+    parser.add_argument('--maps', default=MAPS_DIR, help='Directory of the maps.')
+    parser.add_argument('-o', '--output', default=None, help='JSON file to append the results to.')
+    args = parser.parse_args()
+
+    catalog = get_catalog(args.maps)
+    if not catalog.is_complete(args.area):
+        parser.error('No aligned elevation and land cover maps for area: ' + args.area)
+
+    results = []
+    print('{:<8} {:>8} {:>8} {:>14}'.format('Policy', 'Rovers', 'Steps', 'ms/1000 steps'))
+    for policy in args.policies:
+        for num_rovers in args.rovers:
+            t_best = None
+            for _ in range(args.repeat):
+                rand.seed(args.seed)
+                world = make_world(catalog, args.area, tuple(int(c) for c in policy.split('-')), num_rovers,
+                                   args.noise)
+                taken, t_run = run(world, args.steps)
+                t_best = t_run if t_best is None else min(t_best, t_run)
+            result = {'policy': policy, 'rovers': num_rovers, 'steps': taken, 'ms_per_1000': 1e6 * t_best / taken}
+            results.append(result)
+            print('{:<8} {:>8d} {:>8d} {:>14.1f}'.format(policy, num_rovers, taken, result['ms_per_1000']))
+
+    if args.output is not None:
+        # One JSON record per run, so that performance can be tracked over time.
+        record = {'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'area': args.area, 'seed': args.seed,
+                  'noise': args.noise, 'results': results}
+        with open(args.output, 'a') as file:
+            file.write(json.dumps(record) + '\n')
+
+
+if __name__ == '__main__':
+    main()
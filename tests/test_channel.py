@@ -0,0 +1,47 @@
+import numpy as np
+
+from models.world import *
+from tests.test_path_loss import make_world, add_radios
+
+
+def end_slot(world):
+    """
+    End a time slot of a world with capture as its step() does.
+    """
+    world.receive_all()
+    world.clear_channel()
+    world._tn += 1
+
+
+def test_packets_overlapping_from_later_slots_interfere():
+    rng = np.random.default_rng(5)
+    world = make_world(rng, roughness=0.02)
+    world.config_capture(6)
+    radio_a, radio_b, radio_c = add_radios(world, rng, 3)
+    assert world.dt < radio_a.airtime() < 2 * world.dt
+    decisions = []
+    receive = radio_c.receive
+    def record(world, rx_power=None, packet=None, interference=0):
+        decisions.append((packet.tx, rx_power, interference))
+        receive(world, rx_power, packet, interference)
+    radio_c.receive = record
+    for radio in (radio_a, radio_b):
+        radio.rover.update_tx_buffer(0, 0, 0)
+
+    # A sends first, B a slot later while A is still on air.
+    radio_a.transmit(world)
+    end_slot(world)
+    assert decisions == []
+    radio_b.transmit(world)
+    end_slot(world)
+    while world.channel.num_undecided > 0:
+        end_slot(world)
+
+    rx_powers = {tx: rx_power for tx, rx_power, _ in decisions}
+    assert [tx for tx, _, _ in decisions] == [radio_a, radio_b]
+    for tx, rx_power, interference in decisions:
+        other = radio_b if tx is radio_a else radio_a
+        assert interference == np.power(10, rx_powers[other] / 10) > 0
+    # Neither hears the other, as each is on air during the other's packet.
+    assert radio_a.num_rx == 0 and radio_b.num_rx == 0
+    assert world.channel.in_air == []
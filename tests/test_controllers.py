@@ -0,0 +1,78 @@
+import numpy as np
+
+from models.world import *
+from models.packet import Packet
+from models.P_controller import PController
+from tests.test_path_loss import make_world
+
+POLICIES = ['Passive-cooperative', 'Simple Passive-cooperative']
+
+
+def make_swarm(mission, n=2 * SWARM_CONTROL_MIN_ROVERS, seed=6):
+    """
+    Make a world of a swarm at random poses on lines of waypoints, with goals nearby, alternating between the
+    passive policies.
+    """
+    rng = np.random.default_rng(seed)
+    world = make_world(rng, mission=mission)
+    x_min, y_min = world.terrain.x_llcorner, world.terrain.y_llcorner
+    for i in range(n):
+        x = x_min + 50 + i * 1400 / n
+        waypoints = [[x, y_min + y] for y in range(5, 1000, 100)]
+        world.add_rover(x + rng.uniform(-20, 20), y_min + rng.uniform(500, 950), waypoints, num_rovers=n)
+    for i, rover in enumerate(world.rovers):
+        rover.config_radio(869.525, 125, 9, 4 / 8, 1, 14)
+        rover.radio.set_swarm_size(n)
+        # Goals close enough for the goal-driven control not to saturate, some within a few metres.
+        reach = 4 if i % 4 == 1 else 60
+        rover.set_current_goal([rover.pose[0] + rng.uniform(-1, 1), rover.pose[1] + rng.uniform(-reach, reach)])
+        rover.config_decay_type('quad' if i % 3 else 'exp')
+        rover.config_decay_zero_crossing(rng.integers(5, 50))
+        policy = POLICIES[i % 2]
+        gain = [1e-1, 1e-1] if mission == 'ALS' and policy == POLICIES[1] else [0, 1e-1]
+        rover.config_speed_controller(PController(None, gain))
+        rover.config_control_policy(policy)
+    return world
+
+
+def hear(worlds, rng, tn):
+    """
+    Fill the neighbour registers of the same rovers of worlds with the same random packets.
+    """
+    n = len(worlds[0].rovers)
+    heard = rng.random((n, n)) < 0.3
+    poses = rng.uniform(0, 1000, (n, 2))
+    for world in worlds:
+        x_min, y_min = world.terrain.x_llcorner, world.terrain.y_llcorner
+        for i, j in zip(*np.nonzero(heard)):
+            if i != j:
+                tx = world.rovers[j].radio
+                packet = Packet(tx, [tx.radio_id, tn, x_min + poses[j, 0], y_min + poses[j, 1]])
+                world.rovers[i].radio.neighbour_register[j] = packet
+
+
+def rover_state(rover):
+    return (list(rover.control), rover._all_control.tolist(), rover._steps_control_not_updated.tolist(),
+            rover.goal_index, rover.tx_buffer, list(rover.connectivity), rover._initial_control,
+            rover.speed_controller._ref, rover.transmit)
+
+
+def check_swarm_controllers(mission):
+    per_rover, swarm = make_swarm(mission), make_swarm(mission)
+    rng = np.random.default_rng(7)
+    for tn in range(12):
+        if tn % 4 != 3:
+            hear([per_rover, swarm], rng, tn)
+        for rover in per_rover.rovers:
+            rover.apply_control(per_rover)
+        apply_control_many(swarm.rovers, swarm)
+        for rover, swarm_rover in zip(per_rover.rovers, swarm.rovers):
+            np.testing.assert_equal(rover_state(swarm_rover), rover_state(rover))
+
+
+def test_line_sweep_swarm_controllers_match_per_rover():
+    check_swarm_controllers('LS')
+
+
+def test_advanced_line_sweep_swarm_controllers_match_per_rover():
+    check_swarm_controllers('ALS')
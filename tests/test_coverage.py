@@ -0,0 +1,70 @@
+import numpy as np
+
+from models.coverage import *
+from models.packet import Packet
+from tests.test_path_loss import make_world
+
+
+def make_radios(seed=9):
+    """
+    Make a small world with a transmitter at a cell centre and a receiver, returning the world and their radios.
+    """
+    world = make_world(np.random.default_rng(seed), n_cols=40, n_rows=30)
+    x_min, y_min = world.terrain.x_llcorner, world.terrain.y_llcorner
+    world.add_rover(x_min + 52.5, y_min + 77.5, [[0, 0]], num_rovers=2)
+    world.add_rover(x_min + 100, y_min + 100, [[0, 0]], num_rovers=2)
+    for rover in world.rovers:
+        rover.config_radio(869.525, 125, 9, 4 / 8, 1, 14)
+    return world, world.rovers[0].radio, world.rovers[1].radio
+
+
+def test_coverage_equals_rx_power_at_cell_centres():
+    world, radio_tx, radio_rx = make_radios()
+    terrain = world.terrain
+    coverage = coverage_map(world, radio_tx.pos, radio_tx.f, radio_tx.tx_pw)
+    packet = Packet(radio_tx, [])
+    # Every cell, the first and last columns included, whose coverage is stored wrapped around.
+    for e in range(terrain.n_cols):
+        for n in range(terrain.n_rows):
+            radio_rx.pos[0] = terrain.x_llcorner + (e + 0.5) * terrain.resolution
+            radio_rx.pos[1] = terrain.y_llcorner + (n + 0.5) * terrain.resolution
+            actual = coverage.get_data(radio_rx.pos[0], radio_rx.pos[1])
+            if radio_rx.pos[:2] == radio_tx.pos[:2]:
+                assert np.isnan(actual)
+            else:
+                assert actual == radio_rx.rx_power(packet, world)
+    assert np.isnan(coverage.data).sum() == 1
+
+
+def test_coverage_cache_hits_misses_and_evicts_least_recently_used():
+    world, radio_tx, radio_rx = make_radios()
+    cache = CoverageCache(world, capacity=2)
+    world.config_coverage_cache(cache)
+    packet = Packet(radio_tx, [])
+    tx_pos = list(radio_tx.pos[:2])
+    path_loss = radio_rx.path_loss(radio_tx, world)
+    assert radio_rx.rx_power(packet, world) == radio_tx.tx_pw + radio_tx.ant_gain - path_loss + radio_rx.ant_gain
+    assert (cache.num_hits, cache.num_misses) == (0, 1)
+
+    first = cache.add_radio(radio_tx)
+    # Anywhere in the transmitter's cell is a hit.
+    radio_tx.pos[0] += 2
+    assert radio_rx.rx_power(packet, world) == first.get_data(radio_rx.pos[0], radio_rx.pos[1])
+    assert (cache.num_hits, cache.num_misses) == (1, 1)
+    # Another configuration is a miss.
+    radio_tx._tx_pw = 11
+    assert cache.rx_power(radio_tx, radio_rx) is None
+    assert (cache.num_hits, cache.num_misses) == (1, 2)
+
+    second = cache.add_radio(radio_tx)
+    radio_tx._tx_pw = 14
+    assert cache.add_radio(radio_tx) is first
+    radio_tx.pos[0] += 10
+    third = cache.add_radio(radio_tx)
+    # The least recently used map, the second, is evicted.
+    assert cache.maps == [first, third] and cache.num_evictions == 1
+    radio_tx.pos[0], radio_tx.pos[1] = tx_pos
+    assert cache.rx_power(radio_tx, radio_rx) is not None
+    radio_tx._tx_pw = 11
+    assert cache.rx_power(radio_tx, radio_rx) is None
+    assert second not in cache.maps
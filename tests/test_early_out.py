@@ -0,0 +1,62 @@
+import numpy as np
+
+from models.world import *
+from tests.test_channel import end_slot
+from tests.test_path_loss import make_world, add_radios
+
+
+def test_path_loss_bounds_contain_path_loss():
+    for seed, roughness, sectors in ((1, 0.5, None), (2, 0.02, None), (3, 0.02, 16)):
+        rng = np.random.default_rng(seed)
+        world = make_world(rng, roughness=roughness)
+        assert world.terrain.data.dtype == np.float32
+        world.config_horizon(sectors)
+        radios = add_radios(world, rng, 40)
+        for radio_tx in radios[:8]:
+            rx_pos = [radio.pos for radio in radios if radio is not radio_tx]
+            lower, upper = path_loss_bounds(world, radio_tx.pos, rx_pos, radio_tx.f, ANT_HEIGHT, ANT_HEIGHT)
+            path_losses = path_loss_many(world, radio_tx.pos, rx_pos, radio_tx.f, ANT_HEIGHT, ANT_HEIGHT)
+            assert (lower <= path_losses).all() and (path_losses <= upper).all()
+
+
+def test_early_out_decides_as_full_path_loss():
+    rng = np.random.default_rng(4)
+    world = make_world(rng)
+    radios = add_radios(world, rng, 40)
+    decisions = []
+    for radio_tx in radios[:10]:
+        radios_rx = [radio for radio in radios if radio is not radio_tx]
+        packet = Packet(radio_tx, [])
+        # Low powers too, so that links on either side of the sensitivity are decided by their bounds.
+        for tx_pw in (-40, -20, 14):
+            radio_tx._tx_pw = tx_pw
+            rx_powers = rx_power_many(packet, radios_rx, world)
+            bounded = rx_power_many(packet, radios_rx, world, early_out=True)
+            decisions += [(rx_power >= radio.sensitivity, bound >= radio.sensitivity)
+                          for radio, rx_power, bound in zip(radios_rx, rx_powers, bounded)]
+    assert all(exact == bounded for exact, bounded in decisions)
+    assert {exact for exact, _ in decisions} == {False, True}
+    assert sum(radio.num_skipped for radio in radios) > 0
+
+
+def test_early_out_disabled_with_capture():
+    rng = np.random.default_rng(5)
+    world = make_world(rng)
+    radios = add_radios(world, rng, 6)
+    assert world.early_out
+    world.config_capture(6)
+    assert not world.early_out
+    for radio in radios:
+        radio._tx_pw = -40
+        radio.rover.update_tx_buffer(0, 0, 0)
+    for radio in radios:
+        radio.transmit(world)
+        end_slot(world)
+    while world.channel.num_undecided > 0:
+        end_slot(world)
+    assert sum(radio.num_skipped for radio in radios) == 0
+    # The same packets would be decided by bounds without capture.
+    world.config_capture(None)
+    packet = Packet(radios[0], [])
+    rx_power_many(packet, radios[1:], world, early_out=world.early_out)
+    assert sum(radio.num_skipped for radio in radios) > 0
@@ -0,0 +1,61 @@
+import numpy as np
+
+from models.world import *
+from models.path_loss import *
+from tests.test_path_loss import make_world
+
+
+def test_horizons_bound_slopes_to_cells_in_range():
+    rng = np.random.default_rng(7)
+    terrain = make_world(rng, n_cols=40, n_rows=30, roughness=2).terrain
+    sectors = 8
+    x, y = np.meshgrid(terrain.x_llcorner + (np.arange(terrain.n_cols) + 0.5) * terrain.resolution,
+                       terrain.y_llcorner + (np.arange(terrain.n_rows) + 0.5) * terrain.resolution)
+    x, y = x.ravel(), y.ravel()
+    heights = terrain.get_data_many(x, y).astype(np.float64)
+    for band in range(2):
+        reach = terrain.horizon_range(band)
+        for i in rng.choice(len(x), 60, replace=False):
+            dist = np.hypot(x - x[i], y - y[i])
+            cells = np.flatnonzero((dist >= terrain.resolution) & (dist <= reach))
+            angles = np.arctan2(y[cells] - y[i], x[cells] - x[i])
+            bounds = terrain.get_horizon_many(np.full(len(cells), x[i]), np.full(len(cells), y[i]), angles,
+                                              np.full(len(cells), band), sectors)
+            assert bounds.dtype == np.float16
+            assert (bounds.astype(np.float64) >= (heights[cells] - heights[i]) / dist[cells]).all()
+
+
+def test_links_classified_clear_are_clear_in_full_profiles():
+    num_clear, num_unclear = 0, 0
+    for seed, roughness in ((1, 0.01), (2, 0.03), (3, 0.1)):
+        rng = np.random.default_rng(seed)
+        world = make_world(rng, roughness=roughness)
+        x_min, y_min = world.terrain.x_llcorner, world.terrain.y_llcorner
+        n = 300
+        tx_pos = np.column_stack([x_min + rng.uniform(0, world.terrain.x_range - 1, n),
+                                  y_min + rng.uniform(0, world.terrain.y_range - 1, n)])
+        # Links of every length, within the reach of the horizons' bands.
+        angle = rng.uniform(0, 2 * pi, n)
+        rx_pos = tx_pos + rng.uniform(20, 600, (n, 1)) * np.column_stack([np.cos(angle), np.sin(angle)])
+        inside = (rx_pos[:, 0] > x_min) & (rx_pos[:, 0] < x_min + world.terrain.x_range - 1) & \
+            (rx_pos[:, 1] > y_min) & (rx_pos[:, 1] < y_min + world.terrain.y_range - 1)
+        tx_pos, rx_pos = tx_pos[inside], rx_pos[inside]
+        for pos in np.concatenate([tx_pos, rx_pos]).tolist():
+            world.add_rover(pos[0], pos[1], [pos], num_rovers=2 * len(tx_pos))
+        radios = []
+        for i, rover in enumerate(world.rovers):
+            rover.config_radio(869.525, 125, 9, 4 / 8, 1, 14)
+            rover.radio.ant_height = [0.17, 2, 10][i % len(tx_pos) % 3]
+            radios.append(rover.radio)
+        ant_h = np.array([radio.ant_height for radio in radios[:len(tx_pos)]])
+        d = np.hypot(*(tx_pos - rx_pos).T)
+        h_tx = world.terrain.get_data_many(tx_pos[:, 0], tx_pos[:, 1]).astype(np.float64) + ant_h
+        h_rx = world.terrain.get_data_many(rx_pos[:, 0], rx_pos[:, 1]).astype(np.float64) + ant_h
+        for sectors in (8, 16):
+            clear = line_of_sight_clear(world.terrain, tx_pos, rx_pos, d, h_tx, h_rx, 869.525, sectors)
+            for i in np.flatnonzero(clear):
+                assert PathLoss(radios[i], radios[len(tx_pos) + i], world).diffraction_loss() == 0
+            num_clear += np.count_nonzero(clear)
+            num_unclear += np.count_nonzero(~clear)
+    # Enough links are classified either way for the test to mean something.
+    assert num_clear > 200 and num_unclear > 200
@@ -0,0 +1,57 @@
+import numpy as np
+
+from models.world import *
+from tests.test_path_loss import make_world, add_radios
+
+
+def test_link_keys_quantise_positions_to_cells():
+    cache = LinkCache(cell_size=5, origin=(400000, 100000))
+    key = cache.key((400001, 100001), (400102, 100203), 869.525, 0.17, 0.17)
+    # Anywhere in the same cells, and in either direction.
+    assert cache.key((400004.9, 100000), (400100, 100204.9), 869.525, 0.17, 0.17) == key
+    assert cache.key((400102, 100203), (400001, 100001), 869.525, 0.17, 0.17) == key
+    assert cache.key((400001, 100001), (400102, 100203), 869.525, 0.17, 0.5) == \
+        cache.key((400102, 100203), (400001, 100001), 869.525, 0.5, 0.17)
+    others = [cache.key((400005, 100001), (400102, 100203), 869.525, 0.17, 0.17),
+              cache.key((400001, 100001), (400102, 100199.9), 869.525, 0.17, 0.17),
+              cache.key((400001, 100001), (400102, 100203), 433.175, 0.17, 0.17),
+              cache.key((400001, 100001), (400102, 100203), 869.525, 0.5, 0.17),
+              cache.key((400001, 100001), (400102, 100203), 869.525, 0.17, 0.5),
+              cache.key((400001, 100001), (400102, 100203), 869.525, 0.17, 0.17, max_dist=800)]
+    assert len(set(others + [key])) == len(others) + 1
+
+
+def test_link_cache_evicts_least_recently_used():
+    cache = LinkCache(capacity=2)
+    cache.put('a', 100.0)
+    cache.put('b', 110.0)
+    assert cache.get('a') == 100.0
+    cache.put('c', 120.0)
+    assert cache.get('b') is None and cache.get('a') == 100.0 and cache.get('c') == 120.0
+    assert (cache.num_links, cache.num_hits, cache.num_misses, cache.num_evictions) == (2, 3, 1, 1)
+    cache.clear()
+    assert cache.num_links == 0 and cache.get('a') is None and cache.num_misses == 2
+
+
+def test_link_cache_answers_receptions_from_the_same_cells():
+    rng = np.random.default_rng(6)
+    world = make_world(rng)
+    radios = add_radios(world, rng, 4)
+    world.config_link_cache(64, cell_size=5)
+    packet = Packet(radios[0], [])
+    rx_powers = rx_power_many(packet, radios[1:], world)
+    cache = world.link_cache
+    assert (cache.num_links, cache.num_hits, cache.num_misses) == (3, 0, 3)
+    assert rx_power_many(packet, radios[1:], world) == rx_powers
+    assert (cache.num_hits, cache.num_misses) == (3, 3)
+    # The reverse link, and the scalar path, share the entry.
+    assert radios[0].rx_power(Packet(radios[1], []), world) == rx_powers[0]
+    assert (cache.num_hits, cache.num_misses) == (4, 3)
+    # A receiver moved within its cell is answered from the cache, unlike one moved out of it.
+    cell = cache.cell(radios[1].pos)
+    radios[1].pos[0] = world.terrain.x_llcorner + cell[0] * 5 + 4.5
+    radios[2].pos[0] += 5
+    rx_power_many(packet, radios[1:3], world)
+    assert (cache.num_links, cache.num_hits, cache.num_misses) == (4, 5, 4)
+    world.config_link_cache(0)
+    assert world.link_cache is None
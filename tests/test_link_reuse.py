@@ -0,0 +1,80 @@
+import numpy as np
+
+from models.world import *
+from tests.test_path_loss import make_world, add_radios
+
+
+def rx_power_of(radio_tx, radio_rx, world, early_out=False):
+    """
+    Get the received power of a transmitter's packet at a radio by rx_power_many().
+    """
+    return rx_power_many(Packet(radio_tx, []), [radio_rx], world, early_out=early_out)[0]
+
+
+def exact_rx_power(radio_tx, radio_rx, world):
+    """
+    Get the received power of a transmitter's packet at a radio from the path loss at their current positions.
+    """
+    path_loss = path_loss_many(world, radio_tx.pos, [radio_rx.pos], radio_tx.f, radio_tx.ant_height,
+                               [radio_rx.ant_height])[0]
+    return radio_tx.tx_pw + radio_tx.ant_gain - path_loss + radio_rx.ant_gain - 0
+
+
+def make_link(seed, distance, exact=False):
+    """
+    Make a world with a transmitter and a receiver reusing the path loss of their link up to a distance.
+    """
+    rng = np.random.default_rng(seed)
+    world = make_world(rng)
+    radio_tx, radio_rx = add_radios(world, rng, 2)
+    radio_rx.config_link_reuse(distance, exact)
+    return world, radio_tx, radio_rx
+
+
+def test_reused_link_is_recalculated_once_either_end_moves_too_far():
+    for moving in (0, 1):
+        world, radio_tx, radio_rx = make_link(1, 10)
+        first = rx_power_of(radio_tx, radio_rx, world)
+        assert first == exact_rx_power(radio_tx, radio_rx, world) and radio_rx.num_reused == 0
+        end = (radio_tx, radio_rx)[moving]
+        end.pos[0] += 6
+        assert rx_power_of(radio_tx, radio_rx, world) == first and radio_rx.num_reused == 1
+        # Reuse is judged from where the path loss was calculated, not from the last move.
+        end.pos[0] += 6
+        moved = rx_power_of(radio_tx, radio_rx, world)
+        assert moved == exact_rx_power(radio_tx, radio_rx, world) != first and radio_rx.num_reused == 1
+        end.pos[0] += 6
+        assert rx_power_of(radio_tx, radio_rx, world) == moved and radio_rx.num_reused == 2
+
+
+def test_exact_link_reuse_recalculates_every_time():
+    world, radio_tx, radio_rx = make_link(2, 10, exact=True)
+    first = rx_power_of(radio_tx, radio_rx, world)
+    errors = []
+    for _ in range(4):
+        radio_rx.pos[1] += 2
+        rx_power = rx_power_of(radio_tx, radio_rx, world)
+        assert rx_power == exact_rx_power(radio_tx, radio_rx, world)
+        errors.append(abs(rx_power - first))
+    # Reuse would have kept the first path loss for the moves within the distance.
+    assert radio_rx.num_reused == 4
+    np.testing.assert_allclose(radio_rx.max_reuse_error, max(errors))
+    assert radio_rx.max_reuse_error > 0
+
+
+def test_links_decided_by_bounds_are_not_reused():
+    world, radio_tx, radio_rx = make_link(3, 10)
+    radio_tx._tx_pw = -60
+    first = rx_power_of(radio_tx, radio_rx, world)
+    radio_rx.pos[0] += 20
+    # Decided by its bounds, the link's path loss is not calculated, so it is not remembered either.
+    rx_power_of(radio_tx, radio_rx, world, early_out=True)
+    assert radio_rx.num_skipped == 1 and radio_rx.num_reused == 0
+    radio_rx.pos[0] += 5
+    assert rx_power_of(radio_tx, radio_rx, world) == exact_rx_power(radio_tx, radio_rx, world) != first
+    assert radio_rx.num_reused == 0
+    # The path loss calculated since is the one reused.
+    reused = exact_rx_power(radio_tx, radio_rx, world)
+    radio_rx.pos[0] -= 5
+    assert rx_power_of(radio_tx, radio_rx, world) == reused
+    assert radio_rx.num_reused == 1
@@ -0,0 +1,114 @@
+import os
+import numpy as np
+import pytest
+
+from utils.load_map import *
+
+
+def write_asc(file_path, data, x_llcorner=400000, y_llcorner=100000, resolution=5):
+    """
+    Write a grid as a .asc file.
+    """
+    with open(file_path, 'w') as file:
+        file.write('ncols {}\nnrows {}\nxllcorner {}\nyllcorner {}\ncellsize {}\n'.format(
+            data.shape[1], data.shape[0], x_llcorner, y_llcorner, resolution))
+        for row in data:
+            file.write(' '.join(str(value) for value in row) + '\n')
+
+
+def touch_later(path, seconds=2):
+    """
+    Move the modification time of a path forward, as filesystems with coarse times may not have moved it yet.
+    """
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10 ** 9))
+
+
+def test_cache_is_reused_until_the_source_changes(tmp_path):
+    file_path = str(tmp_path / 'AA00_elevation.asc')
+    data = np.arange(12, dtype=np.float64).reshape(3, 4) / 4
+    write_asc(file_path, data)
+    assert load_cache(file_path, ELEVATION_DTYPE) is None
+    np.testing.assert_array_equal(read_asc(file_path, dtype=ELEVATION_DTYPE).data, data)
+    header, cached = load_cache(file_path, ELEVATION_DTYPE)
+    assert header['n_cols'] == 4 and cached.dtype == ELEVATION_DTYPE
+    np.testing.assert_array_equal(cached, data)
+    # A cache hit reads the cached data, not the source.
+    header_path, data_path = cache_paths(file_path, ELEVATION_DTYPE)
+    np.save(data_path, (data * 2).astype(ELEVATION_DTYPE))
+    np.testing.assert_array_equal(read_asc(file_path, dtype=ELEVATION_DTYPE).data, data * 2)
+
+    # Touched without a change of content, the cache is still valid and its recorded time is updated.
+    touch_later(file_path)
+    assert load_cache(file_path, ELEVATION_DTYPE) is not None
+    assert load_cache(file_path, ELEVATION_DTYPE)[0]['source']['mtime'] == os.stat(file_path).st_mtime_ns
+
+    # The same size with another content is caught by its digest.
+    write_asc(file_path, data[::-1])
+    touch_later(file_path)
+    assert load_cache(file_path, ELEVATION_DTYPE) is None
+    np.testing.assert_array_equal(read_asc(file_path, dtype=ELEVATION_DTYPE).data, data[::-1])
+
+    # Another size is caught without reading the content.
+    write_asc(file_path, data[:2])
+    assert load_cache(file_path, ELEVATION_DTYPE) is None
+    np.testing.assert_array_equal(read_asc(file_path, dtype=ELEVATION_DTYPE).data, data[:2])
+    assert load_cache(file_path, ELEVATION_DTYPE)[1].shape == (2, 4)
+
+
+def test_rebuilding_the_cache_deletes_derived_rasters(tmp_path):
+    file_path = str(tmp_path / 'AA00_elevation.asc')
+    data = np.arange(12, dtype=np.float64).reshape(3, 4)
+    write_asc(file_path, data)
+    map_object = read_asc(file_path, dtype=ELEVATION_DTYPE)
+    map_object.derived('double', lambda values: values * 2)
+    derived_path = os.path.splitext(cache_paths(file_path, ELEVATION_DTYPE)[1])[0] + '.double.npy'
+    assert os.path.exists(derived_path)
+    # Reused while the source is unchanged.
+    np.save(derived_path, data * 3)
+    np.testing.assert_array_equal(read_asc(file_path, dtype=ELEVATION_DTYPE).derived('double', None), data * 3)
+
+    write_asc(file_path, data + 1)
+    map_object = read_asc(file_path, dtype=ELEVATION_DTYPE)
+    assert not os.path.exists(derived_path)
+    np.testing.assert_array_equal(map_object.derived('double', lambda values: values * 2), (data + 1) * 2)
+
+
+def test_grid_values_out_of_range_of_dtype_raise(tmp_path):
+    file_path = str(tmp_path / 'AA00_landcover.asc')
+    write_asc(file_path, np.array([[1.0, 21.0], [255.0, 0.0]]))
+    assert read_asc(file_path, dtype=LANDCOVER_DTYPE, use_cache=False).data.tolist() == [[1, 21], [255, 0]]
+    for value in (-9999.0, 256.0, 2.5, float('nan')):
+        write_asc(file_path, np.array([[1.0, 21.0], [value, 0.0]]))
+        with pytest.raises(GridValueOutOfRange):
+            read_asc(file_path, dtype=LANDCOVER_DTYPE, use_cache=False)
+    # Elevations keep their NODATA value.
+    write_asc(file_path, np.array([[1.5, -9999.0]]))
+    assert read_asc(file_path, dtype=ELEVATION_DTYPE, use_cache=False).data.tolist() == [[1.5, -9999.0]]
+
+
+def test_catalog_is_rescanned_when_a_directory_changes(tmp_path):
+    root_path = str(tmp_path)
+    os.makedirs(os.path.join(root_path, 'tiles'))
+    data = np.ones((3, 4))
+    write_asc(os.path.join(root_path, 'AA00_elevation.asc'), data)
+    catalog = MapCatalog(root_path)
+    assert catalog.areas() == ['AA00'] and not catalog.is_complete('AA00')
+    assert os.path.exists(os.path.join(root_path, CACHE_DIR, CATALOG_FILE))
+    # A persisted catalog still up to date is loaded without scanning.
+    assert MapCatalog(root_path).load()
+
+    tiles_path = os.path.join(root_path, 'tiles')
+    write_asc(os.path.join(tiles_path, 'AA00_landcover.asc'), data)
+    touch_later(tiles_path)
+    assert catalog.is_stale() and not MapCatalog(root_path).is_stale()
+    assert catalog.is_complete('AA00')
+    assert catalog.locate('AA00_landcover.asc') == os.path.join(tiles_path, 'AA00_landcover.asc')
+    assert catalog.header('AA00', 'landcover')['cache'] == \
+        os.path.relpath(cache_paths(catalog.locate('AA00_landcover.asc'), LANDCOVER_DTYPE)[1], root_path)
+
+    os.remove(os.path.join(tiles_path, 'AA00_landcover.asc'))
+    touch_later(tiles_path, 4)
+    with pytest.raises(MapNotFound):
+        catalog.locate('AA00_landcover.asc')
+    assert catalog.layers('AA00') == ['elevation']
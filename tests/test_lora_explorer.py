@@ -0,0 +1,25 @@
+import numpy as np
+
+from models.rover import Rover
+from lora_explorer import *
+
+
+def test_explore_matches_configured_radios():
+    t_slot, dc = 0.12, 1
+    cr = [4 / 5, 4 / 6, 4 / 7, 4 / 8]
+    path_loss = np.array([[[np.nan, 120.0], [120.0, np.nan]]])
+    results = explore(path_loss, BW, SF, cr, TX_PW, dc, t_slot)
+    for i, bw in enumerate(BW):
+        for j, sf in enumerate(SF):
+            for k, coding_rate in enumerate(cr):
+                # Radios are configured as by the simulator.
+                rover = Rover(1, 0, 0, [[0, 0]])
+                rover.config_radio(869.525, bw, sf, coding_rate, dc, 14)
+                rover.radio.config_de()
+                rover.radio.config_silent_time()
+                rover.radio.set_t_slot(t_slot)
+                assert results['airtime'][i, j, k, 0] == rover.radio.airtime()
+                assert results['interval'][i, j, k, 0] == rover.radio.interval
+                assert results['period'][i, j, k, 0] == rover.radio.interval * rover.radio.t_slot
+                assert results['actual_dc'][i, j, k, 0] == rover.radio.actual_dc()
+                assert results['sensitivity'][i, j, k, 0] == rover.radio.sensitivity
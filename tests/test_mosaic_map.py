@@ -0,0 +1,84 @@
+import numpy as np
+
+from models.world import *
+from models.map import Map
+from models.mosaic_map import *
+from models.landcover_spec import *
+from models.shadowing import *
+
+
+def make_mosaic(data, tile_rows, tile_cols, memory_budget=None, x_llcorner=400000, y_llcorner=100000, resolution=5):
+    """
+    Split data into tiles of a mosaic, returning the mosaic and the same data as a single map.
+    """
+    n_rows, n_cols = data.shape
+    tiles = []
+    for tile_row in range(n_rows // tile_rows):
+        for tile_col in range(n_cols // tile_cols):
+            header = {'n_cols': tile_cols, 'n_rows': tile_rows, 'resolution': resolution,
+                      'x_llcorner': x_llcorner + tile_col * tile_cols * resolution,
+                      'y_llcorner': y_llcorner + (n_rows // tile_rows - tile_row - 1) * tile_rows * resolution}
+            tiles.append((header, (header, data[tile_row * tile_rows:(tile_row + 1) * tile_rows,
+                                                tile_col * tile_cols:(tile_col + 1) * tile_cols].copy())))
+    loader = lambda source: Map(source[0]['n_cols'], source[0]['n_rows'], source[0]['x_llcorner'],
+                                source[0]['y_llcorner'], source[0]['resolution'], source[1])
+    return MosaicMap(tiles, loader, memory_budget), Map(n_cols, n_rows, x_llcorner, y_llcorner, resolution, data)
+
+
+def test_derived_raster_reads_like_single_map():
+    rng = np.random.default_rng(1)
+    data = rng.integers(1, len(LCM2015_NAME), (64, 96)).astype(np.float32)
+    mosaic, single = make_mosaic(data, 32, 32, memory_budget=2 * 32 * 32 * 4)
+    impassable = mosaic.derived('impassable', build_impassable)
+    rows, cols = rng.integers(-64, 64, 500), rng.integers(-96, 96, 500)
+    assert (impassable[rows, cols] == build_impassable(data)[rows, cols]).all()
+    assert impassable[3, -5] == build_impassable(data)[3, -5]
+    assert (np.asarray(impassable) == build_impassable(data)).all()
+    assert mosaic.loaded_bytes <= mosaic.memory_budget
+
+
+def test_max_between_matches_single_map():
+    rng = np.random.default_rng(2)
+    data = rng.normal(100, 10, (64, 96)).astype(np.float32)
+    mosaic, single = make_mosaic(data, 32, 32, memory_budget=32 * 32 * 4)
+    for _ in range(200):
+        x = 400000 + np.sort(rng.uniform(-50, 96 * 5, 2))
+        y = 100000 + np.sort(rng.uniform(-50, 64 * 5, 2))
+        assert mosaic.max_between(x[0], x[1], y[0], y[1]) == single.max_between(x[0], x[1], y[0], y[1])
+    # A tile with its block maxima alone exceeds the budget, so only the tile last used stays loaded.
+    assert len(mosaic.loaded_tiles) == 1
+
+
+def test_memory_budget_counts_loaded_tiles():
+    data = np.zeros((20, 30))
+    mosaic, _ = make_mosaic(data, 10, 10, memory_budget=2500)
+    for tile_row in range(2):
+        for tile_col in range(3):
+            mosaic.get_tile(tile_row, tile_col)
+    assert mosaic.loaded_tiles == [(1, 0), (1, 1), (1, 2)]
+    assert mosaic.loaded_bytes == 3 * 800
+    assert mosaic.num_evictions == 3
+
+
+def test_shadowing_only_loads_tiles_read():
+    data = np.zeros((64, 96), dtype=np.float32)
+    mosaic, _ = make_mosaic(data, 32, 32)
+    shadowing = Shadowing(mosaic, 4, 20, seed=3)
+    losses = shadowing.spatial_many((400010, 100010), [[400020, 100030], [400100, 100120]])
+    assert mosaic.loaded_tiles == [(1, 0)]
+    assert np.isfinite(losses).all()
+    # Tiles have fields of their own.
+    assert not (np.asarray(shadowing.field)[:32, :32] == np.asarray(shadowing.field)[:32, 32:64]).all()
+
+
+def test_pyramid_data_matches_single_map():
+    rng = np.random.default_rng(4)
+    data = rng.normal(100, 10, (64, 96)).astype(np.float32)
+    mosaic, single = make_mosaic(data, 32, 32, memory_budget=2 * 32 * 32 * 4)
+    eastings = 400000 + rng.uniform(0, 96 * 5, 500)
+    northings = 100000 + rng.uniform(0, 64 * 5, 500)
+    for level in range(4):
+        assert (mosaic.get_pyramid_data_many(eastings, northings, level) ==
+                single.get_pyramid_data_many(eastings, northings, level)).all()
+    assert mosaic.pyramid_relief(3).shape == single.pyramid_relief(3).shape
+    assert mosaic.loaded_bytes <= mosaic.memory_budget
@@ -0,0 +1,96 @@
+import os
+import numpy as np
+
+from models.world import *
+from models.map import Map
+from models.path_loss import *
+
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'data', 'path_loss_baseline.npz')
+# Path losses of random links calculated by the scalar PathLoss of the baseline commit, before it was vectorised,
+# by map: its seed, elevation dtype and maximum distance.
+BASELINE_CASES = {'float64': (11, np.float64, None), 'float64_d_max': (12, np.float64, 800),
+                  'float32': (13, np.float32, None)}
+FLOAT32_TOLERANCE = 5e-3    # dB, of path losses over float32 elevations, rounded in another order once vectorised.
+
+
+def make_world(rng, n_cols=300, n_rows=200, resolution=5, roughness=0.5, mission='ALS', dtype=np.float32):
+    """
+    Make a world of rough random terrain and random land cover.
+    """
+    elevation = np.cumsum(np.cumsum(rng.normal(0, roughness, (n_rows, n_cols)), axis=0), axis=1) / 20 + 100
+    landcover = rng.integers(1, len(LCM2015_NAME), (n_rows, n_cols)).astype(np.float32)
+    terrain = Map(n_cols, n_rows, 400000, 100000, resolution, elevation.astype(dtype))
+    return World(terrain, Map(n_cols, n_rows, 400000, 100000, resolution, landcover), mission)
+
+
+def add_radios(world, rng, n):
+    """
+    Add rovers with radios at random points of the world, returning their radios.
+    """
+    x_min, y_min = world.terrain.x_llcorner, world.terrain.y_llcorner
+    for _ in range(n):
+        x = x_min + rng.uniform(0, world.terrain.x_range - 1)
+        y = y_min + rng.uniform(0, world.terrain.y_range - 1)
+        world.add_rover(x, y, [[x, y]], num_rovers=n)
+    for rover in world.rovers:
+        rover.config_radio(869.525, 125, 9, 4 / 8, 1, 14)
+    return [rover.radio for rover in world.rovers]
+
+
+def test_path_loss_many_matches_path_loss():
+    rng = np.random.default_rng(1)
+    world = make_world(rng)
+    radios = add_radios(world, rng, 40)
+    for radio_tx in radios[:5]:
+        radios_rx = [radio for radio in radios if radio is not radio_tx]
+        expected = [PathLoss(radio_tx, radio_rx, world).total_loss() for radio_rx in radios_rx]
+        path_losses = path_loss_many(world, radio_tx.pos, [radio_rx.pos for radio_rx in radios_rx], radio_tx.f,
+                                     radio_tx.ant_height, [radio_rx.ant_height for radio_rx in radios_rx])
+        assert path_losses.tolist() == expected
+
+
+def test_path_loss_pairs_matches_path_loss():
+    rng = np.random.default_rng(2)
+    world = make_world(rng)
+    radios = add_radios(world, rng, 60)
+    pairs = [(radios[i], radios[j]) for i, j in rng.integers(0, len(radios), (200, 2)).tolist() if i != j]
+    expected = [PathLoss(radio_tx, radio_rx, world, d_max=800).total_loss() for radio_tx, radio_rx in pairs]
+    path_losses = path_loss_pairs(world, [radio_tx.pos for radio_tx, _ in pairs],
+                                  [radio_rx.pos for _, radio_rx in pairs], radios[0].f, ANT_HEIGHT, ANT_HEIGHT,
+                                  d_max=800)
+    assert path_losses.tolist() == expected
+
+
+def test_path_loss_pairs_with_horizons_matches_path_loss():
+    rng = np.random.default_rng(3)
+    world = make_world(rng, roughness=0.02)
+    radios = add_radios(world, rng, 60)
+    pairs = [(radios[i], radios[j]) for i, j in rng.integers(0, len(radios), (200, 2)).tolist() if i != j]
+    expected = [PathLoss(radio_tx, radio_rx, world).total_loss() for radio_tx, radio_rx in pairs]
+    world.config_horizon(16)
+    path_losses = path_loss_pairs(world, [radio_tx.pos for radio_tx, _ in pairs],
+                                  [radio_rx.pos for _, radio_rx in pairs], radios[0].f, ANT_HEIGHT, ANT_HEIGHT)
+    assert path_losses.tolist() == expected
+
+
+def test_path_losses_match_baseline():
+    baseline = np.load(BASELINE_FILE)
+    for name, (seed, dtype, d_max) in BASELINE_CASES.items():
+        world = make_world(np.random.default_rng(seed), dtype=dtype)
+        tx_pos, rx_pos, expected = (baseline[name + suffix] for suffix in ('_tx', '_rx', '_loss'))
+        for x, y in np.concatenate([tx_pos, rx_pos]).tolist():
+            world.add_rover(x, y, [[x, y]], num_rovers=2 * len(tx_pos))
+        for rover in world.rovers:
+            rover.config_radio(869.525, 125, 9, 4 / 8, 1, 14)
+        radios = [rover.radio for rover in world.rovers]
+        path_losses = np.array([PathLoss(radios[i], radios[len(tx_pos) + i], world, d_max=d_max).total_loss()
+                                for i in range(len(tx_pos))])
+        path_losses_pairs = path_loss_pairs(world, tx_pos, rx_pos, radios[0].f, ANT_HEIGHT, ANT_HEIGHT, d_max=d_max)
+        path_losses_many = np.array([path_loss_many(world, tx_pos[i], rx_pos[i:i + 1], radios[0].f, ANT_HEIGHT,
+                                                    [ANT_HEIGHT], d_max=d_max)[0] for i in range(len(tx_pos))])
+        for actual in (path_losses, path_losses_pairs, path_losses_many):
+            if dtype == np.float64:
+                np.testing.assert_array_equal(actual, expected)
+            else:
+                np.testing.assert_allclose(actual, expected, rtol=0, atol=FLOAT32_TOLERANCE)
@@ -0,0 +1,74 @@
+import contextlib
+import io
+import random as rand
+import numpy as np
+
+from models.map import Map
+from models.scheduler import Scheduler
+from models.world import World
+from swarm_benchmark import make_swarm_world
+from tests.test_path_loss import make_world
+
+
+def test_pop_due_orders_by_time_step_order_key_and_scheduling():
+    scheduler = Scheduler()
+    for tn, order, item in [(5, 2, 'a'), (3, 1, 'b'), (5, 1, 'c'), (3, 1, 'd'), (8, 0, 'e'), (5, 2, 'f')]:
+        scheduler.schedule(tn, order, item)
+    assert len(scheduler) == 6 and scheduler.next_tn == 3
+    assert scheduler.pop_due(2) == []
+    # Ties of time step and order key come out in the order they were scheduled.
+    assert scheduler.pop_due(5) == [(3, 'b'), (3, 'd'), (5, 'c'), (5, 'a'), (5, 'f')]
+    assert len(scheduler) == 1 and scheduler.next_tn == 8
+    scheduler.schedule(6, 9, 'g')
+    assert scheduler.pop_due(100) == [(6, 'g'), (8, 'e')]
+    assert scheduler.next_tn is None
+    scheduler.schedule(1, 0, 'h')
+    scheduler.clear()
+    assert len(scheduler) == 0 and scheduler.pop_due(100) == []
+
+
+def trace(policy, event_driven, steps):
+    """
+    Run a small swarm for a number of time steps, by step() or by advance(), and get its state after each
+    advance, by time step.
+    """
+    terrain = make_world(np.random.default_rng(3), n_cols=60, n_rows=40, roughness=0.01).terrain
+    # Land cover passable everywhere, so that every rover completes its mission.
+    landcover = Map(terrain.n_cols, terrain.n_rows, terrain.x_llcorner, terrain.y_llcorner, terrain.resolution,
+                    np.full((terrain.n_rows, terrain.n_cols), 4, dtype=np.float32))
+    world = make_swarm_world(terrain, landcover, policy, 3, False)
+    for rover in world.rovers:
+        rover.config_req_sample_steps(40)
+    world.config_event_driven(event_driven)
+    rand.seed(2)
+    states = {}
+    skipped = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        while world.tn < steps:
+            advanced = world.advance(steps - world.tn)
+            skipped += advanced - 1
+            states[world.tn] = world.skip_state()
+    return states, skipped
+
+
+def test_event_driven_advance_reproduces_steps():
+    # Line sweeping only skips once the mission is complete, adaptive sampling while every rover samples.
+    steps = 6000
+    for policy in ((1, 1), (3, 1)):
+        stepped, _ = trace(policy, False, steps)
+        advanced, skipped = trace(policy, True, steps)
+        assert skipped > 1000
+        for tn, state in advanced.items():
+            assert state == stepped[tn]
+
+
+def test_skip_prints_only_the_last_time():
+    maps = make_world(np.random.default_rng(4), n_cols=20, n_rows=20)
+    world = World(maps.terrain, maps.landcover, 'AS', 1.0)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        world.skip(250)
+        world.skip(40)
+    # Times 0, 100 and 200 (s) pass in the first skip, none in the second.
+    assert output.getvalue() == 'Time: 200.0 (s)\n\n'
+    assert world.tn == 290
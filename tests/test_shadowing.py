@@ -0,0 +1,46 @@
+import numpy as np
+
+from models.shadowing import *
+from tests.test_path_loss import make_world
+
+
+def test_spatial_shadowing_has_sigma_at_any_link_length():
+    rng = np.random.default_rng(5)
+    terrain = make_world(rng).terrain
+    x_min, y_min = terrain.x_llcorner, terrain.y_llcorner
+    for dist in (0, 10, 40, 400):
+        losses = []
+        for seed in range(4):
+            shadowing = Shadowing(terrain, sigma=4, corr_dist=20, seed=seed)
+            tx_pos = rng.uniform([x_min + 1, y_min + 1], [x_min + terrain.x_range - 401, y_min + terrain.y_range - 1],
+                                 (500, 2))
+            losses += [shadowing.spatial_many(pos, [pos + [dist, 0]])[0] for pos in tx_pos]
+        assert abs(np.std(losses) - 4) < 0.3
+
+
+def test_seeded_shadowing_is_reproducible():
+    terrain = make_world(np.random.default_rng(6)).terrain
+    rx_pos = [[400100, 100100], [400500, 100700], [401200, 100300]]
+    losses = []
+    for _ in range(2):
+        shadowing = Shadowing(terrain, sigma=4, corr_dist=20, sigma_t=2, seed=9)
+        losses.append([shadowing.spatial_many((400300, 100400), rx_pos).tolist()] +
+                      [shadowing.temporal_many(0, [1, 2, 3], time).tolist() for time in (0, 1, 5)])
+    assert losses[0] == losses[1]
+    assert Shadowing(terrain, sigma=4, corr_dist=20, seed=10).spatial_many((400300, 100400), rx_pos).tolist() != \
+        losses[0][0]
+
+
+def test_temporal_shadowing_decorrelates_over_lag():
+    terrain = make_world(np.random.default_rng(7)).terrain
+    shadowing = Shadowing(terrain, sigma=0, sigma_t=2, corr_time=10, seed=4)
+    rx_ids = np.arange(1, 20001)
+    first = shadowing.temporal_many(0, rx_ids, 3.0)
+    # A link and its reverse are the same link.
+    assert shadowing.temporal_many(rx_ids[0], [0], 3.0).tolist() == first[:1].tolist()
+    for lag in (1, 10, 30):
+        shadowing = Shadowing(terrain, sigma=0, sigma_t=2, corr_time=10, seed=4)
+        first = shadowing.temporal_many(0, rx_ids, 3.0)
+        later = shadowing.temporal_many(0, rx_ids, 3.0 + lag)
+        assert abs(np.std(first) - 2) < 0.05 and abs(np.std(later) - 2) < 0.05
+        assert abs(np.corrcoef(first, later)[0, 1] - np.exp(-lag / 10)) < 0.03
@@ -0,0 +1,90 @@
+import contextlib
+import io
+import random as rand
+import numpy as np
+
+from models.world import *
+from models.slope_physics import *
+from tests.test_path_loss import make_world
+
+
+def test_swarm_state_grows_keeping_rows():
+    swarm = SwarmState(1)
+    rovers = [Rover(i + 1, 400000 + i, 100000 + 2 * i, [[0, 0]], swarm=swarm) for i in range(5)]
+    assert swarm.num_rovers == 5 and swarm.capacity >= 5
+    assert [rover.swarm_index for rover in rovers] == list(range(5))
+    index = swarm.gather(rovers[:3])
+    swarm.grow(32)
+    assert swarm.capacity == 32
+    assert swarm.pose[index].tolist() == [[400000 + i, 100000 + 2 * i] for i in range(3)]
+    rovers[4].pose[0] += 1
+    swarm.gather(rovers)
+    assert swarm.pose[4].tolist() == [400005, 100008]
+
+
+def make_swarm_world(n, noise, x_offset=100, y_offset=5):
+    """
+    Make a world of a swarm at the baseline of rough terrain, with slopes and optional noise.
+    """
+    world = make_world(np.random.default_rng(8))
+    world.config_engine(SlopePhysics(world))
+    x_min, y_min = world.terrain.x_llcorner, world.terrain.y_llcorner
+    for i in range(n):
+        x = x_min + x_offset + i * (world.terrain.x_range - 2 * x_offset) / n
+        world.add_rover(x, y_min + y_offset, [[x, y_min + y_offset], [x, y_min + world.terrain.y_range - 5]],
+                        q_noise=[0.5, 0.5] if noise else None, r_noise=[0.5, 0.5] if noise else None, num_rovers=n)
+    return world
+
+
+def test_motion_many_matches_motion():
+    for noise in (False, True):
+        worlds = [make_swarm_world(30, noise), make_swarm_world(30, noise)]
+        outputs = []
+        for world, many in zip(worlds, (False, True)):
+            rand.seed(3)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                for _ in range(50):
+                    if many:
+                        motion_many(world.rovers, world, 1.0)
+                    else:
+                        for rover in world.rovers:
+                            rover.motion(world, 1.0)
+            outputs.append(output.getvalue())
+        for rover, rover_many in zip(*(world.rovers for world in worlds)):
+            assert rover_many.pose == rover.pose and rover_many.control == rover.control
+            assert rover_many.pos_measurement == rover.pos_measurement
+            assert rover_many.landcover_termination == rover.landcover_termination
+        assert outputs[1] == outputs[0]
+
+
+def test_motion_many_clamps_first_boundary_crossed():
+    world = make_swarm_world(2, False, x_offset=1)
+    x_min, y_min = world.terrain.x_llcorner, world.terrain.y_llcorner
+    y_max = y_min + world.terrain.y_range
+    both, right = world.rovers
+    both.pose[0], both.pose[1] = x_min + 1, y_max - 1
+    both.update_speeds(-300, 300)
+    right.pose[0] = x_min + 1
+    right.update_speeds(-300, 0.2)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        motion_many(world.rovers, world, 1.0)
+    # Only the first boundary crossed is clamped, so a rover crossing two is clamped on the upper one alone.
+    assert both.pose[1] == y_max - 1e-6 and both.pose[0] < x_min
+    assert right.pose[0] == x_min
+    assert output.getvalue().splitlines() == ['Cannot move beyond the upper boundary.',
+                                              'Cannot go off right side of map.']
+
+
+def test_measurement_aliases_pose():
+    world = make_swarm_world(1, False)
+    rover = world.rovers[0]
+    assert rover.pos_measurement is rover.pose
+    rover._r_noise = [1.0, 1.0]
+    before = list(rover.pose)
+    rand.seed(4)
+    rover.measure_pos()
+    # Measurement noise is written through the alias, so it displaces the pose too.
+    assert rover.pos_measurement is rover.pose
+    assert rover.pose != before
@@ -1,43 +1,385 @@
 import os
+import json
+import glob
+import hashlib
+from functools import partial
 import numpy as np
 
 from models.map import *
+from models.mosaic_map import *
 from exceptions.map_not_found import *
+from exceptions.grid_value_out_of_range import *
+
+CACHE_DIR = '.cache'            # Name of the sidecar cache directory, created next to the source map files.
+CHUNK_SIZE = 1 << 22            # Characters of grid text parsed at a time.
+ELEVATION_DTYPE = np.float32    # Compact data type for elevation maps, in meter.
+LANDCOVER_DTYPE = np.uint8      # Compact data type for land cover maps, which hold class IDs.
+LAYER_DTYPES = {'elevation': ELEVATION_DTYPE,
+                'landcover': LANDCOVER_DTYPE}
+# Data type each layer is loaded as by the simulation, map files being named '<area>_<layer>.asc'.
+MAPS_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)).split('utils')[0], 'maps')
+CATALOG_FILE = 'catalog.json'   # Name of the map catalog, stored in the cache directory of the maps directory.
+
+_catalogs = {}                  # Catalogs already opened, by maps directory.
 
 
 def locate_map(map_name):
     """
     Get the absolute path of a map file given its full name.
     """
-    root_path = os.path.abspath(os.path.dirname(__file__)).split('utils')[0] + 'maps\\'
-    file_path = None
-    for root, sub, files in os.walk(root_path):
-        for file in files:
-            name = os.path.basename(root + file)
-            if name == map_name:
-                file_path = root + file
-                break
-    if file_path is not None:
-        return file_path
-    else:
-        raise MapNotFound()
+    return get_catalog().locate(map_name)
+
+
+def file_hash(file_path, block_size=1 << 20):
+    """
+    Get the SHA-1 digest of a file's content.
+    """
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_paths(file_path, dtype=np.float64):
+    """
+    Get the paths of the header and data files caching a map file as a given data type.
+    """
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), CACHE_DIR)
+    name = os.path.splitext(os.path.basename(file_path))[0] + '.' + np.dtype(dtype).name
+    return os.path.join(cache_dir, name + '.json'), os.path.join(cache_dir, name + '.npy')
+
+
+def load_cache(file_path, dtype=np.float64, mmap_mode=None):
+    """
+    Load the cached header and data of a map file, optionally memory-mapping the data.
+    Return None if there is no cache or the source file has changed since it was written.
+    """
+    header_path, data_path = cache_paths(file_path, dtype)
+    try:
+        with open(header_path) as file:
+            header = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    stat = os.stat(file_path)
+    source = header['source']
+    if source['size'] != stat.st_size:
+        return None
+    if source['mtime'] != stat.st_mtime_ns:
+        # Same size but touched, e.g. by a fresh checkout, so compare content before rebuilding.
+        if source['sha1'] != file_hash(file_path):
+            return None
+        source['mtime'] = stat.st_mtime_ns
+        write_json(header_path, header)
 
+    try:
+        data = np.load(data_path, mmap_mode=mmap_mode)
+    except (OSError, ValueError):
+        return None
+    if data.shape != (header['n_rows'], header['n_cols']) or data.dtype != np.dtype(dtype):
+        return None
+    return header, data
 
-def read_asc(file_path, header_len=5):
+
+def save_cache(file_path, header, data):
+    """
+    Cache the header and data of a map file, discarding rasters derived from an earlier version.
+    The data is written before the header so that a header never refers to an incomplete data file.
+    """
+    header_path, data_path = cache_paths(file_path, data.dtype)
+    stat = os.stat(file_path)
+    header = dict(header)
+    header['source'] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'sha1': file_hash(file_path)}
+    try:
+        os.makedirs(os.path.dirname(header_path), exist_ok=True)
+        for derived_path in glob.glob(glob.escape(os.path.splitext(data_path)[0]) + '.*.npy'):
+            os.remove(derived_path)
+        temp_path = data_path + '.' + str(os.getpid()) + '.tmp'
+        with open(temp_path, 'wb') as file:
+            np.save(file, data)
+        os.replace(temp_path, data_path)
+        write_json(header_path, header)
+    except OSError:
+        pass    # Caching is an optimisation only, e.g. the maps directory may be read-only.
+
+
+def write_json(file_path, content):
+    """
+    Atomically write a json file.
+    """
+    temp_path = file_path + '.' + str(os.getpid()) + '.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump(content, file)
+    os.replace(temp_path, file_path)
+
+
+def read_asc_header(file, header_len=5):
     """
-    Read a .asc file as a Map object.
+    Read the header of an opened .asc file, leaving the file positioned at the grid.
     """
-    file = open(file_path)
-    line_index = 0
     values = []
-    for line in file:
-        if line_index < header_len:
-            values.append(line.split()[1])
-    n_cols = int(values[0])
-    n_rows = int(values[1])
-    x_llcorner = int(values[2])
-    y_llcorner = int(values[3])
-    resolution = int(values[4])
-    data = np.loadtxt(file_path, skiprows=header_len)
-    file.close()
-    return Map(n_cols, n_rows, x_llcorner, y_llcorner, resolution, data)
+    for _ in range(header_len):
+        values.append(file.readline().split()[1])
+    return {'n_cols': int(values[0]),
+            'n_rows': int(values[1]),
+            'x_llcorner': int(values[2]),
+            'y_llcorner': int(values[3]),
+            'resolution': int(values[4])}
+
+
+def check_grid_values(values, dtype, file_name):
+    """
+    Raise GridValueOutOfRange if a data type cannot hold grid values exactly, e.g. NODATA or fractional values
+    in a land cover map read as integer class IDs, which would otherwise wrap or be truncated silently.
+    """
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        # NaN fails the last comparison too.
+        invalid = (values < info.min) | (values > info.max) | (values != np.trunc(values))
+    else:
+        invalid = np.abs(values) > np.finfo(dtype).max
+    if invalid.any():
+        raise GridValueOutOfRange('Grid value ' + str(values[np.argmax(invalid)]) + ' cannot be held as ' +
+                                  np.dtype(dtype).name + ' in ' + file_name)
+
+
+def read_asc_grid(file, n_rows, n_cols, dtype=np.float64, chunk_size=CHUNK_SIZE):
+    """
+    Read the grid of an opened .asc file in large chunks, straight into an array of the given data type.
+    Values the data type cannot hold raise GridValueOutOfRange.
+    """
+    dtype = np.dtype(dtype)
+    data = np.empty(n_rows * n_cols, dtype=dtype)
+    filled = 0
+    remainder = ''
+    while True:
+        chunk = file.read(chunk_size)
+        text = remainder + chunk
+        if chunk:
+            # Only parse up to the last whitespace, the rest may be a number split across chunks.
+            cut = max(text.rfind(' '), text.rfind('\n'), text.rfind('\t'))
+            if cut < 0:
+                remainder = text
+                continue
+            text, remainder = text[:cut], text[cut:]
+        if text and not text.isspace():     # A blank string would parse as [-1].
+            values = np.fromstring(text, dtype=np.float64, sep=' ')
+            if filled + len(values) > len(data):
+                raise ValueError('More grid values than the header specifies in ' + file.name)
+            if dtype != np.float64:
+                check_grid_values(values, dtype, file.name)
+            data[filled:filled + len(values)] = values
+            filled += len(values)
+        if not chunk:
+            break
+    if filled != len(data):
+        raise ValueError('Fewer grid values than the header specifies in ' + file.name)
+    return data.reshape(n_rows, n_cols)
+
+
+def read_asc(file_path, header_len=5, dtype=np.float64, use_cache=True, mmap=False):
+    """
+    Read a .asc file as a Map object, holding its grid as the given data type.
+    The parsed grid is cached in binary form next to the file and reused until the file changes.
+    With mmap set, a MappedMap over the cache is returned instead of loading the grid into memory.
+    """
+    data_path = cache_paths(file_path, dtype)[1]
+    if use_cache:
+        cached = load_cache(file_path, dtype, 'r' if mmap else None)
+        if cached is not None:
+            header, data = cached
+            if mmap:
+                map_object = MappedMap(header['n_cols'], header['n_rows'], header['x_llcorner'],
+                                       header['y_llcorner'], header['resolution'], data_path)
+            else:
+                map_object = Map(header['n_cols'], header['n_rows'], header['x_llcorner'], header['y_llcorner'],
+                                 header['resolution'], data)
+            map_object.config_cache(os.path.splitext(data_path)[0])
+            return map_object
+
+    with open(file_path) as file:
+        header = read_asc_header(file, header_len)
+        data = read_asc_grid(file, header['n_rows'], header['n_cols'], dtype)
+
+    map_object = Map(header['n_cols'], header['n_rows'], header['x_llcorner'], header['y_llcorner'],
+                     header['resolution'], data)
+    if use_cache:
+        save_cache(file_path, header, data)
+        if load_cache(file_path, dtype, 'r') is not None:
+            if mmap:
+                # Map the cache just written, otherwise fall back to the grid already parsed.
+                map_object = MappedMap(header['n_cols'], header['n_rows'], header['x_llcorner'],
+                                       header['y_llcorner'], header['resolution'], data_path)
+            map_object.config_cache(os.path.splitext(data_path)[0])
+    return map_object
+
+
+def read_mosaic(file_paths, header_len=5, dtype=np.float64, memory_budget=None, mmap=False):
+    """
+    Read adjacent .asc files as one MosaicMap.
+    Only the headers are read here, each tile is read when first accessed.
+    """
+    tiles = []
+    for file_path in file_paths:
+        with open(file_path) as file:
+            tiles.append((read_asc_header(file, header_len), file_path))
+    return MosaicMap(tiles, partial(read_asc, header_len=header_len, dtype=dtype, mmap=mmap), memory_budget)
+
+
+class MapCatalog:
+    """
+    A catalog of the map files in a directory tree, indexed by name and by area and layer,
+    holding each map's header so its specifications are known without opening it.
+    The catalog is persisted in the cache directory and rebuilt whenever a directory in the tree changes.
+    """
+    def __init__(self, root_path=MAPS_DIR, header_len=5):
+        self._root_path = root_path                                 # The maps directory.
+        self._catalog_path = os.path.join(root_path, CACHE_DIR, CATALOG_FILE)
+        self._header_len = header_len
+        self._dirs = {}                                             # Modification time of each directory.
+        self._files = {}                                            # Entry of each map file, by name.
+        self._areas = {}                                            # Names of each area's layers.
+        if not self.load():
+            self.build()
+
+    @property
+    def root_path(self):
+        return self._root_path
+
+    def load(self):
+        """
+        Load the persisted catalog, returning whether it is still up to date.
+        """
+        try:
+            with open(self._catalog_path) as file:
+                content = json.load(file)
+        except (OSError, ValueError):
+            return False
+        self._dirs, self._files = content['dirs'], content['files']
+        self.index_areas()
+        return not self.is_stale()
+
+    def build(self):
+        """
+        Scan the directory tree for map files and persist the catalog.
+        """
+        self._dirs = {}
+        self._files = {}
+        try:
+            # Created up front, as creating it later would change the modification time of the maps directory.
+            os.makedirs(os.path.dirname(self._catalog_path), exist_ok=True)
+        except OSError:
+            pass
+        for root, sub, files in os.walk(self._root_path):
+            sub[:] = [directory for directory in sub if directory not in (CACHE_DIR, '__pycache__')]
+            self._dirs[os.path.relpath(root, self._root_path)] = os.stat(root).st_mtime_ns
+            for name in files:
+                if not name.endswith('.asc') or name in self._files:
+                    continue    # Like a directory walk, the first file found with a given name wins.
+                file_path = os.path.join(root, name)
+                with open(file_path) as file:
+                    entry = read_asc_header(file, self._header_len)
+                entry['path'] = os.path.relpath(file_path, self._root_path)
+                area, layer = self.split_name(name)
+                if layer in LAYER_DTYPES:
+                    entry['cache'] = os.path.relpath(cache_paths(file_path, LAYER_DTYPES[layer])[1], self._root_path)
+                self._files[name] = entry
+        self.index_areas()
+        try:
+            write_json(self._catalog_path, {'dirs': self._dirs, 'files': self._files})
+        except OSError:
+            pass
+
+    def index_areas(self):
+        """
+        Index the map files by area and layer.
+        """
+        self._areas = {}
+        for name in self._files:
+            area, layer = self.split_name(name)
+            if layer is not None:
+                self._areas.setdefault(area, {})[layer] = name
+
+    def split_name(self, name):
+        """
+        Split a map file name into its area and layer, e.g. 'SU20NW_elevation.asc'.
+        """
+        parts = os.path.splitext(name)[0].rsplit('_', 1)
+        if len(parts) == 2:
+            return parts[0], parts[1]
+        return parts[0], None
+
+    def is_stale(self):
+        """
+        See if any directory in the tree has changed since the catalog was built.
+        """
+        for directory, mtime in self._dirs.items():
+            try:
+                if os.stat(os.path.join(self._root_path, directory)).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+        return len(self._dirs) == 0
+
+    def refresh(self):
+        """
+        Rebuild the catalog if the directory tree has changed.
+        """
+        if self.is_stale():
+            self.build()
+
+    def locate(self, map_name):
+        """
+        Get the absolute path of a map file given its full name.
+        """
+        self.refresh()
+        entry = self._files.get(map_name)
+        if entry is None:
+            raise MapNotFound()
+        return os.path.join(self._root_path, entry['path'])
+
+    def areas(self):
+        """
+        Get the codes of all areas with at least one map.
+        """
+        self.refresh()
+        return sorted(self._areas.keys())
+
+    def layers(self, area):
+        """
+        Get the layers available for an area.
+        """
+        self.refresh()
+        return sorted(self._areas.get(area, {}).keys())
+
+    def header(self, area, layer):
+        """
+        Get the header of an area's layer, plus its path and cache path relative to the maps directory.
+        """
+        self.refresh()
+        try:
+            return dict(self._files[self._areas[area][layer]])
+        except KeyError:
+            raise MapNotFound()
+
+    def is_complete(self, area):
+        """
+        See if an area has all the layers the simulation needs, aligned with one another.
+        """
+        self.refresh()
+        layers = self._areas.get(area, {})
+        if any(layer not in layers for layer in LAYER_DTYPES):
+            return False
+        keys = ['n_cols', 'n_rows', 'x_llcorner', 'y_llcorner', 'resolution']
+        specs = [[self._files[name][key] for key in keys] for name in layers.values()]
+        return all(spec == specs[0] for spec in specs)
+
+
+def get_catalog(root_path=MAPS_DIR):
+    """
+    Get the catalog of a maps directory, opened once per process.
+    """
+    if root_path not in _catalogs:
+        _catalogs[root_path] = MapCatalog(root_path)
+    return _catalogs[root_path]
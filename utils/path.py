@@ -8,7 +8,7 @@ from PIL import Image
 import re
 
 sys.path.append(str(os.getcwd()) + '\\models')
-from landcover_spec import LCM2015_COLORMAP
+from landcover_spec import LCM2015_COLORMAP, build_rgb
 
 
 def prep_data(map_object):
@@ -25,23 +25,17 @@ def render_rgb(landcover_map, cmap=LCM2015_COLORMAP):
     """
     Render a land cover map using specified RGB colour scheme.
     """
-    rows, cols = landcover_map.n_rows, landcover_map.n_cols
-    rgb = Image.new('RGB', (rows, cols))
-    for i in range(rows):
-        for j in range(cols):
-            rgb.putpixel((i, j), (cmap[int(landcover_map.data[j, i])][0],
-                                  cmap[int(landcover_map.data[j, i])][1],
-                                  cmap[int(landcover_map.data[j, i])][2]))
-    rgb.save(os.path.abspath(os.path.dirname(__file__)) + '\\temp.png')
-    temp_im = os.path.abspath(os.path.dirname(__file__)) + '\\temp.png'
-    im = mpimg.imread(temp_im)
+    if cmap is LCM2015_COLORMAP:
+        rgb = landcover_map.derived('rgb', build_rgb)  # Cached with the map.
+    else:
+        rgb = build_rgb(landcover_map.data, cmap)
+    im = np.divide(rgb, 255, dtype=np.float32)  # As read back from an RGB image.
     dx = landcover_map.resolution
     dy = landcover_map.resolution
     x_min, y_min = landcover_map.x_llcorner, landcover_map.y_llcorner
     x_max, y_max = x_min + dx * landcover_map.n_cols, \
                    y_min + dy * landcover_map.n_rows
     ax_range = (x_min, x_max, y_min, y_max)
-    os.remove(temp_im)
 
     return im, ax_range
 
@@ -162,7 +156,7 @@ def show_rgb_waypoints(im, ax_range, waypoints, load, mission, x_offset, y_offse
 if __name__ == '__main__':
     sys.path.append(os.getcwd())
     from utils.load_map import *
-    la_map = read_asc(locate_map('SU20NE_landcover.asc'))
+    la_map = read_asc(locate_map('SU20NE_landcover.asc'), dtype=LANDCOVER_DTYPE)
     image, axis_range = render_rgb(la_map)
     waypoints = []
     N = 10
@@ -7,7 +7,7 @@ import matplotlib.image as mpimg
 from PIL import Image
 
 sys.path.append(str(os.getcwd()) + '\\models')
-from landcover_spec import LCM2015_COLORMAP
+from landcover_spec import LCM2015_COLORMAP, build_rgb
 
 
 def prep_data(map_object):
@@ -74,25 +74,40 @@ def render_rgb(landcover_map, cmap=LCM2015_COLORMAP):
     """
     Render a land cover map using specified RGB colour scheme.
     """
-    rows, cols = landcover_map.n_rows, landcover_map.n_cols
-    rgb = Image.new('RGB', (rows, cols))
-    for i in range(rows):
-        for j in range(cols):
-            rgb.putpixel((i, j), (cmap[int(landcover_map.data[j, i])][0],
-                                  cmap[int(landcover_map.data[j, i])][1],
-                                  cmap[int(landcover_map.data[j, i])][2]))
-    rgb.save(os.path.abspath(os.path.dirname(__file__)) + '\\temp.png')
-    temp_im = os.path.abspath(os.path.dirname(__file__)) + '\\temp.png'
-    im = mpimg.imread(temp_im)
+    if cmap is LCM2015_COLORMAP:
+        rgb = landcover_map.derived('rgb', build_rgb)  # Cached with the map.
+    else:
+        rgb = build_rgb(landcover_map.data, cmap)
+    im = np.divide(rgb, 255, dtype=np.float32)  # As read back from an RGB image.
     dx = landcover_map.resolution
     dy = landcover_map.resolution
     x_min, y_min = landcover_map.x_llcorner, landcover_map.y_llcorner
     x_max, y_max = x_min + dx * landcover_map.n_cols, \
                    y_min + dy * landcover_map.n_rows
     ax_range = (x_min, x_max, y_min, y_max)
-    os.remove(temp_im)
     return im, ax_range
 
+def render_coverage(coverage, cmap='viridis', window_size=(8, 8)):
+    """
+    Render a coverage map as an image of received power, outlining where it reaches the sensitivity.
+    """
+    x_min, y_min = coverage.x_llcorner, coverage.y_llcorner
+    x_max, y_max = x_min + coverage.x_range, y_min + coverage.y_range
+    # Column c of the data holds easting index c + 1, so roll the western-most column back to the left.
+    data = np.roll(coverage.data, 1, axis=1)
+    fig, ax = plt.subplots(figsize=window_size)
+    im = ax.imshow(data, extent=(x_min, x_max, y_min, y_max), cmap=plt.get_cmap(cmap))
+    plt.colorbar(im, label='Received Power (dBm)')
+    if coverage.sensitivity is not None:
+        ax.contour(np.flipud(data >= coverage.sensitivity), levels=[0.5], colors='white',
+                   extent=(x_min, x_max, y_min, y_max))
+    ax.plot(coverage.tx_pos[0], coverage.tx_pos[1], marker='^', color='red')
+    ax.set_xlabel('Easting (m)')
+    ax.set_ylabel('Northing (m)')
+    plt.tight_layout()
+    plt.show()
+
+
 def show_rgb(im, ax_range):
     plt.imshow(im, extent=ax_range)
     plt.xlabel('Easting (m)')
@@ -104,8 +119,8 @@ if __name__ == '__main__':
     sys.path.append(os.getcwd())
     from utils.load_map import *
     map_name = 'SP46NE'
-    t_map = read_asc(locate_map(map_name + '_elevation.asc'))
-    la_map = read_asc(locate_map(map_name + '_landcover.asc'))
+    t_map = read_asc(locate_map(map_name + '_elevation.asc'), dtype=ELEVATION_DTYPE)
+    la_map = read_asc(locate_map(map_name + '_landcover.asc'), dtype=LANDCOVER_DTYPE)
     render2d(t_map)
     #image, axis_range = render_rgb(la_map)
     #show_rgb(image, axis_range)